@@ -1 +1,8 @@
-# This file is intentionally left empty to mark this directory as a Python package.
+# Imported first so the startup timer's clock starts before anything heavy;
+# app.main records the ``import`` phase against it
+from .startup import startup_timer  # noqa: F401
+
+# Load .env once, before any module reads its settings from the environment
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,153 @@
+"""
+Bounded in-process caches for resolved GraphQL objects.
+
+Every cache created here is registered so that the populator can drop them
+all with ``invalidate_caches()`` whenever it writes to the dataset. Caches of
+things that don't depend on the data opt out with ``invalidate=False``.
+"""
+import os
+import time
+import typing
+from collections import OrderedDict
+
+MISSING = object()
+
+_caches: typing.List["LRUCache"] = []
+_invalidation_listeners: typing.List[typing.Callable[[], None]] = []
+
+
+class LRUCache:
+    """A least-recently-used cache with an optional per-entry TTL.
+
+    ``generation`` increases on every ``clear()``. Callers that load a value
+    from the database can pass the generation they started with to ``set``,
+    so a result read before an invalidation is never stored after it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: typing.Optional[float] = None,
+        invalidate: bool = True,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.invalidate = invalidate
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[typing.Hashable, typing.Tuple[float, typing.Any]]" = OrderedDict()
+        _caches.append(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: typing.Hashable) -> typing.Any:
+        """Return the cached value or ``MISSING``."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at and expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return MISSING
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: typing.Hashable, value: typing.Any, generation: typing.Optional[int] = None) -> None:
+        if generation is not None and generation != self.generation:
+            return
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.generation += 1
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def invalidate_caches() -> None:
+    """Drop every registered cache; call after any write to the dataset."""
+    for cache in _caches:
+        if cache.invalidate:
+            cache.clear()
+    for listener in _invalidation_listeners:
+        listener()
+
+
+def on_invalidate(listener: typing.Callable[[], None]) -> typing.Callable[[], None]:
+    """Register ``listener`` to be called by ``invalidate_caches()``, for
+    derived state that isn't an ``LRUCache``."""
+    _invalidation_listeners.append(listener)
+    return listener
+
+
+def cache_stats() -> typing.List[typing.Dict[str, typing.Any]]:
+    return [cache.stats() for cache in _caches]
+
+
+def _ttl_from_env(name: str, default: str) -> typing.Optional[float]:
+    ttl = float(os.getenv(name, default))
+    return ttl if ttl > 0 else None
+
+
+# PokemonRecord objects, keyed by ("id", id) and ("name", name)
+pokemon_detail_cache = LRUCache(
+    "pokemon_detail",
+    maxsize=int(os.getenv("POKEMON_DETAIL_CACHE_SIZE", "2048")),
+    ttl=_ttl_from_env("POKEMON_DETAIL_CACHE_TTL", "3600"),
+)
+
+# Tuples of TypeRecord, keyed by Pokémon id
+pokemon_types_cache = LRUCache(
+    "pokemon_types",
+    maxsize=int(os.getenv("POKEMON_DETAIL_CACHE_SIZE", "2048")),
+    ttl=_ttl_from_env("POKEMON_DETAIL_CACHE_TTL", "3600"),
+)
+
+# Ability data: ("data", pokemon_id) for a Pokémon's ability slots and cry,
+# ("name", name) for an ability and ("pokemon", (ability_id, offset, limit))
+# for a page of the Pokémon that have it
+ability_cache = LRUCache(
+    "abilities",
+    maxsize=int(os.getenv("POKEMON_DETAIL_CACHE_SIZE", "2048")),
+    ttl=_ttl_from_env("POKEMON_DETAIL_CACHE_TTL", "3600"),
+)
+
+# Evolution stages: ("chain", species_id) for a species' whole chain,
+# ("before", species_id) and ("after", species_id) for its earlier and later
+# stages
+evolution_cache = LRUCache(
+    "evolutions",
+    maxsize=int(os.getenv("POKEMON_DETAIL_CACHE_SIZE", "2048")),
+    ttl=_ttl_from_env("POKEMON_DETAIL_CACHE_TTL", "3600"),
+)
+
+# Dataset-wide derived values, such as the ordered list of Pokémon ids
+dataset_cache = LRUCache("dataset", maxsize=16)
@@ -1,11 +1,11 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+import json
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import typing
 
 # Use SQLite database
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pokemon.db")
@@ -15,30 +15,214 @@ ASYNC_DATABASE_URL = DATABASE_URL
 if DATABASE_URL.startswith("sqlite:///"):
     ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
 
-# Synchronous engine and session (for scripts and sync operations)
-connect_args = {}
-if DATABASE_URL.startswith("sqlite:"):
-    connect_args = {"check_same_thread": False}
-    
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+IS_SQLITE = ASYNC_DATABASE_URL.startswith("sqlite")
+IS_MEMORY = IS_SQLITE and ":memory:" in ASYNC_DATABASE_URL
+
+# Pool sizing. The write pool serves the populator; resolvers read through
+# their own pool so they never queue behind a long ingestion transaction.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+
+# SQLite tuning, applied to every new connection. WAL lets readers keep
+# going while the populator writes.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB, so 64 MiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+
+
+def sqlite_pragmas(read_only: bool = False) -> typing.List[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT}",
+        f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    elif not IS_MEMORY:
+        # The journal mode is stored in the database file, so the writer
+        # sets it once for everyone
+        pragmas.insert(0, f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def apply_sqlite_pragmas(sync_engine: Engine, read_only: bool = False) -> None:
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection: typing.Any, connection_record: typing.Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _pool_args(pool_size: int, max_overflow: int) -> typing.Dict[str, typing.Any]:
+    if IS_MEMORY:
+        # In-memory SQLite uses a single static connection
+        return {}
+    # aiosqlite defaults to NullPool for files, which reconnects (and re-runs
+    # the pragmas) on every checkout; keep connections around instead
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": POOL_TIMEOUT,
+    }
+
+
+SEPARATE_READ_ENGINE = IS_SQLITE and not IS_MEMORY
+
+# Engines are created on first use rather than at import, so importing the
+# app stays cheap; the lifespan warms them before taking traffic
+_engines: typing.Dict[str, AsyncEngine] = {}
+_engine_hooks: typing.List[typing.Callable[[AsyncEngine, str], None]] = []
+
+
+def on_engine_created(hook: typing.Callable[[AsyncEngine, str], None]) -> typing.Callable[[AsyncEngine, str], None]:
+    """Call ``hook(engine, name)`` for every engine, as it is created
+    ("write" or "read"), and for those that already exist."""
+    _engine_hooks.append(hook)
+    for name, engine in list(_engines.items()):
+        hook(engine, name)
+    return hook
+
+
+def _create_engine(name: str) -> AsyncEngine:
+    if name == "read":
+        engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args(READ_POOL_SIZE, READ_MAX_OVERFLOW))
+    else:
+        engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args(POOL_SIZE, MAX_OVERFLOW))
+    if IS_SQLITE:
+        apply_sqlite_pragmas(engine.sync_engine, read_only=name == "read")
+    _engines[name] = engine
+    for hook in _engine_hooks:
+        hook(engine, name)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """The engine writes go through."""
+    engine = _engines.get("write")
+    return engine if engine is not None else _create_engine("write")
+
+
+def get_read_engine() -> AsyncEngine:
+    """The read-only engine for the GraphQL resolvers. In-memory and
+    non-SQLite databases share the write engine."""
+    if not SEPARATE_READ_ENGINE:
+        return get_engine()
+    engine = _engines.get("read")
+    return engine if engine is not None else _create_engine("read")
+
+
+def engines() -> typing.Dict[str, AsyncEngine]:
+    """The engines created so far, by name."""
+    return dict(_engines)
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    return AsyncSession(get_engine(), expire_on_commit=False)
+
+
+def ReadSessionLocal() -> AsyncSession:
+    return AsyncSession(get_read_engine(), expire_on_commit=False)
+
+
+async def warm_engines() -> None:
+    """Open a connection on each engine so pragmas (and WAL) are in place
+    before the first request."""
+    async with get_engine().connect():
+        pass
+    if SEPARATE_READ_ENGINE:
+        async with get_read_engine().connect():
+            pass
+
+
+async def dispose_engines() -> None:
+    """Close the pools. The engines are created again if used afterwards."""
+    while _engines:
+        _, engine = _engines.popitem()
+        await engine.dispose()
+
+
+def pool_status() -> typing.Dict[str, str]:
+    return {
+        "write": get_engine().pool.status(),
+        "read": get_read_engine().pool.status(),
+    }
 
-# Async engine and session (for FastAPI)
-async_engine = create_async_engine(ASYNC_DATABASE_URL)
-AsyncSessionLocal = sessionmaker(
-    async_engine, class_=AsyncSession, expire_on_commit=False
-)
 
 # Base for models
 Base = declarative_base()
 
-# Dependency for FastAPI (sync)
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+def create_schema(connection: Connection) -> None:
+    """Create missing tables, and indexes added to tables that already exist
+    (``create_all`` alone skips those), then move data out of columns that
+    have been replaced by tables."""
+    Base.metadata.create_all(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    backfill_legacy_columns(connection)
+
+
+def backfill_legacy_columns(connection: Connection) -> None:
+    """Databases created before abilities and cries had their own tables keep
+    them in ``pokemons.abilities`` (a JSON list of names) and
+    ``pokemons.cries`` (the latest cry URL). Copy them into ``ability``,
+    ``pokemon_ability`` and ``cry`` for Pokémon that have no rows there yet.
+    The old columns didn't record hidden abilities, so none are marked
+    hidden until ``--refresh`` fetches them again."""
+    columns = {column["name"] for column in inspect(connection).get_columns("pokemons")}
+    ability, pokemon_ability = Base.metadata.tables["ability"], Base.metadata.tables["pokemon_ability"]
+
+    if "abilities" in columns:
+        rows = connection.execute(
+            text(
+                "SELECT id, abilities FROM pokemons WHERE abilities IS NOT NULL"
+                " AND id NOT IN (SELECT pokemon_id FROM pokemon_ability)"
+            )
+        ).all()
+        names_by_pokemon: typing.Dict[int, typing.List[str]] = {}
+        for pokemon_id, abilities in rows:
+            try:
+                names = json.loads(abilities) if isinstance(abilities, str) else abilities
+            except ValueError:
+                continue
+            if names:
+                # A name listed twice would collide on the primary key
+                names_by_pokemon[pokemon_id] = list(dict.fromkeys(str(name) for name in names))
+
+        names = {name for pokemon_names in names_by_pokemon.values() for name in pokemon_names}
+        if names:
+            stored = select(ability.c.name, ability.c.id).where(ability.c.name.in_(names))
+            ability_ids: typing.Dict[str, int] = {row.name: row.id for row in connection.execute(stored)}
+            missing = sorted(names - ability_ids.keys())
+            if missing:
+                connection.execute(insert(ability), [{"name": name} for name in missing])
+                ability_ids = {row.name: row.id for row in connection.execute(stored)}
+            links = [
+                {"pokemon_id": pokemon_id, "ability_id": ability_ids[name], "slot": slot, "is_hidden": False}
+                for pokemon_id, pokemon_names in names_by_pokemon.items()
+                for slot, name in enumerate(pokemon_names, start=1)
+            ]
+            connection.execute(insert(pokemon_ability), links)
+
+    if "cries" in columns:
+        connection.execute(
+            text(
+                "INSERT INTO cry (pokemon_id, latest) SELECT id, cries FROM pokemons"
+                " WHERE cries IS NOT NULL AND cries != '' AND id NOT IN (SELECT pokemon_id FROM cry)"
+            )
+        )
+
 
 # Dependency for FastAPI (async)
 async def get_async_db():
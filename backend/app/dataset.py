@@ -0,0 +1,105 @@
+"""
+The dataset version: a counter bumped by every write to the Pokémon data.
+
+Writers call ``bump_dataset_version`` inside their transaction, so the version
+changes exactly when the committed data does. Readers get it through
+``get_dataset_version``, which is cached in-process until the next
+``invalidate_caches()``, which also announces the new version to
+``datasetVersionChanged`` subscribers.
+"""
+import asyncio
+import datetime
+import typing
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .cache import MISSING, dataset_cache, on_invalidate
+from .database import ReadSessionLocal
+from .models.dataset import DatasetVersion
+from .models.pokemon import Pokemon
+from .pubsub import dataset_version_changed
+
+VERSION_ROW_ID = 1
+
+
+async def bump_dataset_version(conn: AsyncConnection) -> None:
+    now = datetime.datetime.utcnow()
+    result = await conn.execute(
+        update(DatasetVersion)
+        .where(DatasetVersion.id == VERSION_ROW_ID)
+        .values(version=DatasetVersion.version + 1, updated_at=now)
+    )
+    if not result.rowcount:
+        await conn.execute(
+            insert(DatasetVersion).values(id=VERSION_ROW_ID, version=1, updated_at=now)
+        )
+
+
+async def get_dataset_version() -> int:
+    cached = dataset_cache.get("version")
+    if cached is not MISSING:
+        return typing.cast(int, cached)
+
+    generation = dataset_cache.generation
+    async with ReadSessionLocal() as session:
+        try:
+            version = (
+                await session.execute(
+                    select(DatasetVersion.version).where(DatasetVersion.id == VERSION_ROW_ID)
+                )
+            ).scalar_one_or_none()
+        except OperationalError:
+            # The schema hasn't been created yet
+            version = None
+    version = version or 0
+    dataset_cache.set("version", version, generation)
+    return version
+
+
+async def get_pokemon_count() -> int:
+    """How many Pokémon are stored, cached like the version."""
+    cached = dataset_cache.get("count")
+    if cached is not MISSING:
+        return typing.cast(int, cached)
+
+    generation = dataset_cache.generation
+    async with ReadSessionLocal() as session:
+        try:
+            count = (await session.execute(select(func.count(Pokemon.id)))).scalar_one()
+        except OperationalError:
+            count = 0
+    dataset_cache.set("count", count, generation)
+    return count
+
+
+_announced: typing.Optional[int] = None
+_announcing: typing.Set[asyncio.Task] = set()
+
+
+async def _announce_version() -> None:
+    global _announced
+    try:
+        version = await get_dataset_version()
+    except SQLAlchemyError as e:
+        print(f"Unable to read the dataset version: {e}")
+        return
+    # Several writes may land before this runs; announce each version once
+    if version != _announced:
+        _announced = version
+        dataset_version_changed.publish(version)
+
+
+@on_invalidate
+def _version_may_have_changed() -> None:
+    if not dataset_version_changed.subscribers:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_announce_version())
+    # Hold a reference until it's done, or it may be garbage collected
+    _announcing.add(task)
+    task.add_done_callback(_announcing.discard)
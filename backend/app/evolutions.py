@@ -0,0 +1,89 @@
+"""
+Evolution chains, read from tables the populator precomputes.
+
+``species`` stores each chain flattened depth first, so a whole chain is one
+range scan of ``ix_species_chain_id_position``. ``evolution_closure`` pairs
+every species with each of its later stages, so the earlier or later stages
+of a species are one index lookup whatever the chain's depth, with no
+recursive query. Results are cached per species until the dataset changes.
+
+Pokémon are looked up by the species they share their id with. Alternate
+forms (ids above 10000) have no chain of their own.
+"""
+import typing
+
+from sqlalchemy import select
+
+from .cache import MISSING, evolution_cache
+from .database import ReadSessionLocal
+from .models.pokemon import Species, evolution_closure
+from .records import EvolutionChainRecord, EvolutionStageRecord
+
+STAGE_COLUMNS = (
+    Species.id,
+    Species.name,
+    Species.stage,
+    Species.evolves_from_id,
+    Species.trigger,
+    Species.min_level,
+    Species.item,
+)
+
+
+T = typing.TypeVar("T")
+
+
+async def _through_cache(
+    kind: str, species_id: int, query: typing.Any, build: typing.Callable[[typing.Sequence[typing.Any]], T]
+) -> T:
+    cached = evolution_cache.get((kind, species_id))
+    if cached is not MISSING:
+        return typing.cast(T, cached)
+
+    generation = evolution_cache.generation
+    async with ReadSessionLocal() as session:
+        rows = (await session.execute(query)).all()
+    value = build(rows)
+    evolution_cache.set((kind, species_id), value, generation)
+    return value
+
+
+def _stages(rows: typing.Sequence[typing.Any]) -> typing.Tuple[EvolutionStageRecord, ...]:
+    return tuple(EvolutionStageRecord(*row) for row in rows)
+
+
+def _chain(rows: typing.Sequence[typing.Any]) -> typing.Optional[EvolutionChainRecord]:
+    if not rows:
+        return None
+    return EvolutionChainRecord(rows[0][0], _stages([row[1:] for row in rows]))
+
+
+async def get_evolution_chain(pokemon_id: int) -> typing.Optional[EvolutionChainRecord]:
+    """The chain ``pokemon_id`` belongs to, base species first."""
+    chain_id = select(Species.chain_id).where(Species.id == pokemon_id).scalar_subquery()
+    query = select(Species.chain_id, *STAGE_COLUMNS).where(Species.chain_id == chain_id).order_by(Species.position)
+    return await _through_cache("chain", pokemon_id, query, _chain)
+
+
+async def get_pre_evolutions(pokemon_id: int) -> typing.Sequence[EvolutionStageRecord]:
+    """The species ``pokemon_id`` evolves from, base species first."""
+    query = (
+        select(*STAGE_COLUMNS)
+        .join(evolution_closure, evolution_closure.c.ancestor_id == Species.id)
+        .where(evolution_closure.c.descendant_id == pokemon_id)
+        .order_by(Species.stage)
+    )
+    return await _through_cache("before", pokemon_id, query, _stages)
+
+
+async def get_evolutions(pokemon_id: int) -> typing.Sequence[EvolutionStageRecord]:
+    """The species ``pokemon_id`` evolves into, directly or later, in chain
+    order. Direct evolutions are those whose ``evolvesFromId`` is
+    ``pokemon_id``."""
+    query = (
+        select(*STAGE_COLUMNS)
+        .join(evolution_closure, evolution_closure.c.descendant_id == Species.id)
+        .where(evolution_closure.c.ancestor_id == pokemon_id)
+        .order_by(Species.position)
+    )
+    return await _through_cache("after", pokemon_id, query, _stages)
@@ -1,12 +1,38 @@
+import base64
+import enum
+import os
 import typing
 import strawberry
+from strawberry.extensions import ParserCache, ValidationCache
+from strawberry.types import Info
 from sqlalchemy.future import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import func
 
-from .database import AsyncSessionLocal
-from .models.pokemon import Pokemon, Type
+from .cache import MISSING, dataset_cache
+from .database import ReadSessionLocal
+from .dataset import get_dataset_version
+from .evolutions import get_evolution_chain, get_evolutions, get_pre_evolutions
+from .images import image_path
+from .limits import MAX_LOOKUP_KEYS, clamp_page_size, limit_extensions
+from .loaders import Loaders, PokemonEvent, get_loaders
+from .matchups import MAX_COUNTERS, best_counters, type_matchup
+from .metrics import TracingExtension
+from .models.pokemon import Pokemon
+from .projection import pokemon_columns, selected_field_names
+from .pubsub import dataset_version_changed, pokemon_added, population_progress
+from .read_model import current_read_model
+from .readiness import population
+from .records import (
+    AbilityRecord,
+    CryRecord,
+    EvolutionChainRecord,
+    EvolutionStageRecord,
+    PokemonAbilityRecord,
+    PokemonRecord,
+    TypeRecord,
+)
+from .search import SearchFilters, search_pokemon
+from .startup import startup_timer
+from .stats import MAX_HISTOGRAM_BUCKETS, PERCENTILES, DatasetStats, get_dataset_stats
 
 
 @strawberry.type
@@ -15,14 +41,90 @@ class TypeType:
     name: str
 
 
+# Resolvers return the records in app.records. Strawberry reads the GraphQL
+# type from the field's annotation, or from ``graphql_type`` where the Python
+# return type is a record.
+
+
+async def resolve_types(root: typing.Any, info: Info) -> typing.Sequence[TypeRecord]:
+    # Only runs when the selection asks for types, batched across the operation
+    return await get_loaders(info).types_by_pokemon_id.load(root.id)
+
+
+async def resolve_ability_pokemon(
+    root: typing.Any, info: Info, page: int = 1, perPage: int = 15
+) -> typing.Sequence[PokemonRecord]:
+    perPage = clamp_page_size(perPage)
+    offset = (max(page, 1) - 1) * perPage
+    return await get_loaders(info).pokemon_by_ability_id.load((root.id, offset, perPage))
+
+
+@strawberry.type
+class AbilityType:
+    id: int
+    name: str
+    pokemon: typing.List["PokemonType"] = strawberry.field(resolver=resolve_ability_pokemon)
+
+
+@strawberry.type
+class PokemonAbilityType:
+    ability: AbilityType
+    slot: int
+    isHidden: bool
+
+
+@strawberry.type
+class CryType:
+    latest: typing.Optional[str]
+    legacy: typing.Optional[str]
+
+
+async def resolve_ability_slots(root: typing.Any, info: Info) -> typing.Sequence[PokemonAbilityRecord]:
+    slots, _ = await get_loaders(info).ability_data_by_pokemon_id.load(root.id)
+    return slots
+
+
+async def resolve_cry(root: typing.Any, info: Info) -> typing.Optional[CryRecord]:
+    _, cry = await get_loaders(info).ability_data_by_pokemon_id.load(root.id)
+    return cry
+
+
+async def resolve_ability_names(root: typing.Any, info: Info) -> typing.List[str]:
+    slots, _ = await get_loaders(info).ability_data_by_pokemon_id.load(root.id)
+    return [slot.ability.name for slot in slots]
+
+
+async def resolve_cries(root: typing.Any, info: Info) -> str:
+    _, cry = await get_loaders(info).ability_data_by_pokemon_id.load(root.id)
+    return (cry.latest if cry else None) or ""
+
+
+@strawberry.enum
+class ImageSize(enum.Enum):
+    THUMB = "thumb"
+    SMALL = "small"
+    LARGE = "large"
+    ORIGINAL = "original"
+
+
+def resolve_image_url(root: typing.Any, size: typing.Optional[ImageSize] = None) -> str:
+    # Without a size, the upstream artwork URL as stored; with one, the
+    # cached copy served by /images
+    if size is None:
+        return typing.cast(str, root.imageUrl)
+    return image_path(root.id, size.value)
+
+
 @strawberry.type
 class PokemonType:
     id: int
     name: str
     height: int
     weight: int
-    imageUrl: str
-    types: typing.List[TypeType]
+    imageUrl: str = strawberry.field(resolver=resolve_image_url)
+    types: typing.List[TypeType] = strawberry.field(resolver=resolve_types)
+    abilitySlots: typing.List[PokemonAbilityType] = strawberry.field(resolver=resolve_ability_slots)
+    cry: typing.Optional[CryType] = strawberry.field(resolver=resolve_cry)
 
 
 @strawberry.type
@@ -31,10 +133,114 @@ class PokemonDetailType:
     name: str
     height: int
     weight: int
-    imageUrl: str
-    types: typing.List[TypeType]
-    abilities: typing.List[str]
-    cries: str
+    imageUrl: str = strawberry.field(resolver=resolve_image_url)
+    types: typing.List[TypeType] = strawberry.field(resolver=resolve_types)
+    abilitySlots: typing.List[PokemonAbilityType] = strawberry.field(resolver=resolve_ability_slots)
+    cry: typing.Optional[CryType] = strawberry.field(resolver=resolve_cry)
+    # Ability names and the latest cry URL, as the detail page reads them
+    abilities: typing.List[str] = strawberry.field(resolver=resolve_ability_names)
+    cries: str = strawberry.field(resolver=resolve_cries)
+
+
+async def resolve_stage_pokemon(root: typing.Any, info: Info) -> typing.Optional[PokemonRecord]:
+    # The species' default Pokémon, when it is stored
+    return await get_loaders(info).pokemon_by_id.load(root.id)
+
+
+@strawberry.type
+class EvolutionStageType:
+    """A species in an evolution chain. ``stage`` is 0 for the chain's base
+    species; ``trigger``, ``minLevel`` and ``item`` say how it is reached
+    from ``evolvesFromId``."""
+    id: int
+    name: str
+    stage: int
+    evolvesFromId: typing.Optional[int]
+    trigger: typing.Optional[str]
+    minLevel: typing.Optional[int]
+    item: typing.Optional[str]
+    pokemon: typing.Optional[PokemonType] = strawberry.field(resolver=resolve_stage_pokemon)
+
+
+@strawberry.type
+class EvolutionChainType:
+    id: int
+    stages: typing.List[EvolutionStageType]
+
+
+@strawberry.type
+class TypeMatchupType:
+    attacker: str
+    defenders: typing.List[str]
+    multiplier: float
+
+
+@strawberry.type
+class CounterType:
+    pokemon: PokemonRecord = strawberry.field(graphql_type=PokemonType)
+    score: float
+    offense: float
+    defense: float
+
+
+@strawberry.type
+class PercentileType:
+    percentile: int
+    value: float
+
+
+@strawberry.type
+class HistogramBucketType:
+    lower: float
+    upper: float
+    count: int
+
+
+def resolve_percentiles(root: typing.Any) -> typing.List[PercentileType]:
+    if not root.values:
+        return []
+    return [PercentileType(percentile=p, value=root.percentile(p)) for p in PERCENTILES]
+
+
+def resolve_histogram(root: typing.Any, buckets: int = 10) -> typing.List[HistogramBucketType]:
+    buckets = max(1, min(buckets, MAX_HISTOGRAM_BUCKETS))
+    return [
+        HistogramBucketType(lower=lower, upper=upper, count=count)
+        for lower, upper, count in root.histogram(buckets)
+    ]
+
+
+@strawberry.type
+class DistributionType:
+    count: int
+    min: typing.Optional[float]
+    max: typing.Optional[float]
+    mean: typing.Optional[float]
+    percentiles: typing.List[PercentileType] = strawberry.field(resolver=resolve_percentiles)
+    histogram: typing.List[HistogramBucketType] = strawberry.field(resolver=resolve_histogram)
+
+
+@strawberry.type
+class TypeStatsType:
+    type: str
+    count: int
+    height: DistributionType
+    weight: DistributionType
+
+
+@strawberry.type
+class TypeCombinationType:
+    types: typing.List[str]
+    count: int
+
+
+@strawberry.type
+class PokemonStatsType:
+    total: int
+    height: DistributionType
+    weight: DistributionType
+    byType: typing.List[TypeStatsType]
+    typeCombinations: typing.List[TypeCombinationType]
 
 
 @strawberry.type
@@ -49,126 +255,424 @@ class PageInfo:
 
 @strawberry.type
 class PokemonConnection:
-    items: typing.List[PokemonType]
+    items: typing.List[PokemonRecord] = strawberry.field(graphql_type=typing.List[PokemonType])
     pageInfo: PageInfo
 
 
+@strawberry.enum
+class PokemonSortField(enum.Enum):
+    ID = "id"
+    NAME = "name"
+    HEIGHT = "height"
+    WEIGHT = "weight"
+
+
+@strawberry.type
+class PokemonEdge:
+    cursor: str
+    node: PokemonRecord = strawberry.field(graphql_type=PokemonType)
+
+
+@strawberry.type
+class CursorPageInfo:
+    hasNextPage: bool
+    hasPreviousPage: bool
+    startCursor: typing.Optional[str]
+    endCursor: typing.Optional[str]
+
+
+@strawberry.type
+class PokemonCursorConnection:
+    edges: typing.List[PokemonEdge]
+    pageInfo: CursorPageInfo
+    totalCount: int
+
+
+CURSOR_PREFIX = "pokemon:"
+
+
+def encode_cursor(pokemon_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{pokemon_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(cursor)
+        return int(value[len(CURSOR_PREFIX):])
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def get_pokemon_ids() -> typing.Sequence[int]:
+    """All Pokémon ids in order, cached until the next write.
+
+    Its length is the total count, and it maps a page number to the id the
+    page starts at, so pages are fetched by seeking on the primary key
+    instead of scanning past ``OFFSET`` rows.
+    """
+    model = current_read_model()
+    if model is not None:
+        return model.ids
+
+    cached = dataset_cache.get("pokemon_ids")
+    if cached is not MISSING:
+        return typing.cast(typing.Sequence[int], cached)
+
+    generation = dataset_cache.generation
+    async with ReadSessionLocal() as session:
+        result = await session.execute(select(Pokemon.id).order_by(Pokemon.id))
+        ids = tuple(result.scalars().all())
+    dataset_cache.set("pokemon_ids", ids, generation)
+    return ids
+
+
+async def fetch_after(
+    columns: typing.Sequence[typing.Any],
+    after_id: typing.Optional[int],
+    limit: int,
+    inclusive: bool = False,
+) -> typing.List[PokemonRecord]:
+    model = current_read_model()
+    if model is not None:
+        # Records in the model are complete, whatever the columns
+        return model.after(after_id, limit, inclusive)
+
+    query = select(*columns).order_by(Pokemon.id).limit(limit)
+    if after_id is not None:
+        query = query.where(Pokemon.id >= after_id if inclusive else Pokemon.id > after_id)
+    async with ReadSessionLocal() as session:
+        result = await session.execute(query)
+        return [PokemonRecord(**row._mapping) for row in result]
+
+
+async def fetch_page(
+    columns: typing.Sequence[typing.Any],
+    ids: typing.Sequence[int],
+    offset: int,
+    limit: int,
+) -> typing.List[PokemonRecord]:
+    if offset < 0 or offset >= len(ids) or limit <= 0:
+        return []
+    return await fetch_after(columns, ids[offset], limit, inclusive=True)
+
+
+def check_lookup_keys(argument: str, keys: typing.Sequence[typing.Any]) -> None:
+    if len(keys) > MAX_LOOKUP_KEYS:
+        raise ValueError(f"{argument} may list at most {MAX_LOOKUP_KEYS} keys, not {len(keys)}")
+
+
 @strawberry.type
 class Query:
-    @strawberry.field
+    @strawberry.field(graphql_type=typing.List[PokemonType])
     async def pokemons(
         self, 
+        info: Info,
         page: int = 1, 
         perPage: int = 15
-    ) -> typing.List[PokemonType]:
-        async with AsyncSessionLocal() as session:
-            offset = (page - 1) * perPage
-            query = select(Pokemon).options(selectinload(Pokemon.types)).offset(offset).limit(perPage)
-            result = await session.execute(query)
-            pokemons = result.scalars().all()
-            
-            return [
-                PokemonType(
-                    id=pokemon.id,
-                    name=pokemon.name,
-                    height=pokemon.height,
-                    weight=pokemon.weight,
-                    imageUrl=pokemon.image_url,
-                    types=[TypeType(id=t.id, name=t.name) for t in pokemon.types]
-                )
-                for pokemon in pokemons
-            ]
+    ) -> typing.List[PokemonRecord]:
+        perPage = clamp_page_size(perPage)
+        columns = pokemon_columns(selected_field_names(info))
+        ids = await get_pokemon_ids()
+        return await fetch_page(columns, ids, (page - 1) * perPage, perPage)
 
     @strawberry.field
     async def pokemonsPage(
         self, 
+        info: Info,
         page: int = 1, 
         perPage: int = 15
     ) -> PokemonConnection:
-        async with AsyncSessionLocal() as session:
-            # Obtener el total de Pokémon
-            count_query = select(Pokemon)
-            count_result = await session.execute(count_query)
-            total = len(count_result.scalars().all())
-            
-            # Calcular información de paginación
-            last_page = (total + perPage - 1) // perPage
-            has_next_page = page < last_page
-            has_previous_page = page > 1
-            
-            # Obtener los Pokémon de la página actual
-            offset = (page - 1) * perPage
-            query = select(Pokemon).options(selectinload(Pokemon.types)).offset(offset).limit(perPage)
-            result = await session.execute(query)
-            pokemons = result.scalars().all()
-            
-            return PokemonConnection(
-                items=[
-                    PokemonType(
-                        id=pokemon.id,
-                        name=pokemon.name,
-                        height=pokemon.height,
-                        weight=pokemon.weight,
-                        imageUrl=pokemon.image_url,
-                        types=[TypeType(id=t.id, name=t.name) for t in pokemon.types]
-                    )
-                    for pokemon in pokemons
-                ],
-                pageInfo=PageInfo(
-                    total=total,
-                    perPage=perPage,
-                    currentPage=page,
-                    lastPage=last_page,
-                    hasNextPage=has_next_page,
-                    hasPreviousPage=has_previous_page
-                )
+        perPage = clamp_page_size(perPage)
+        columns = pokemon_columns(selected_field_names(info, "items"))
+        ids = await get_pokemon_ids()
+        total = len(ids)
+
+        # Calcular información de paginación
+        last_page = (total + perPage - 1) // perPage
+        has_next_page = page < last_page
+        has_previous_page = page > 1
+
+        return PokemonConnection(
+            items=await fetch_page(columns, ids, (page - 1) * perPage, perPage),
+            pageInfo=PageInfo(
+                total=total,
+                perPage=perPage,
+                currentPage=page,
+                lastPage=last_page,
+                hasNextPage=has_next_page,
+                hasPreviousPage=has_previous_page
             )
+        )
+
+    @strawberry.field
+    async def pokemonsConnection(
+        self,
+        info: Info,
+        first: int = 15,
+        after: typing.Optional[str] = None
+    ) -> PokemonCursorConnection:
+        first = clamp_page_size(first, minimum=0)
+        after_id = decode_cursor(after) if after else None
+        columns = pokemon_columns(selected_field_names(info, "edges", "node"))
+        # Fetch one extra row to know whether there is a next page
+        pokemons = await fetch_after(columns, after_id, first + 1)
+        has_next_page = len(pokemons) > first
+        pokemons = pokemons[:first]
+
+        edges = [PokemonEdge(cursor=encode_cursor(p.id), node=p) for p in pokemons]
+        return PokemonCursorConnection(
+            edges=edges,
+            pageInfo=CursorPageInfo(
+                hasNextPage=has_next_page,
+                hasPreviousPage=after_id is not None,
+                startCursor=edges[0].cursor if edges else None,
+                endCursor=edges[-1].cursor if edges else None,
+            ),
+            totalCount=len(await get_pokemon_ids()),
+        )
 
     @strawberry.field
+    async def searchPokemons(
+        self,
+        info: Info,
+        name: typing.Optional[str] = None,
+        fuzzy: bool = False,
+        types: typing.Optional[typing.List[str]] = None,
+        matchAllTypes: bool = False,
+        minHeight: typing.Optional[int] = None,
+        maxHeight: typing.Optional[int] = None,
+        minWeight: typing.Optional[int] = None,
+        maxWeight: typing.Optional[int] = None,
+        sortBy: typing.Optional[PokemonSortField] = None,
+        descending: bool = False,
+        page: int = 1,
+        perPage: int = 15
+    ) -> PokemonConnection:
+        """Name prefix (or typo-tolerant with ``fuzzy``), type and size filters.
+
+        Fuzzy searches are ordered by similarity unless ``sortBy`` is given.
+        ``types`` matches Pokémon with any of them, or all with ``matchAllTypes``.
+        """
+        perPage = clamp_page_size(perPage)
+        filters = SearchFilters(
+            name=name,
+            fuzzy=fuzzy,
+            types=types,
+            match_all_types=matchAllTypes,
+            min_height=minHeight,
+            max_height=maxHeight,
+            min_weight=minWeight,
+            max_weight=maxWeight,
+        )
+        columns = pokemon_columns(selected_field_names(info, "items"))
+        total, items = await search_pokemon(
+            filters,
+            columns,
+            sort_by=sortBy.value if sortBy else None,
+            descending=descending,
+            offset=(page - 1) * perPage,
+            limit=perPage,
+        )
+
+        last_page = (total + perPage - 1) // perPage
+        return PokemonConnection(
+            items=items,
+            pageInfo=PageInfo(
+                total=total,
+                perPage=perPage,
+                currentPage=page,
+                lastPage=last_page,
+                hasNextPage=page < last_page,
+                hasPreviousPage=page > 1
+            )
+        )
+
+    @strawberry.field(graphql_type=typing.Optional[PokemonDetailType])
     async def pokemonById(
         self, 
+        info: Info,
         pokemonId: int = 1
-    ) -> typing.Optional[PokemonDetailType]:
-        async with AsyncSessionLocal() as session:
-            query = select(Pokemon).options(selectinload(Pokemon.types)).where(Pokemon.id == pokemonId)
-            result = await session.execute(query)
-            pokemon = result.scalar_one_or_none()
-            
-            if pokemon:
-                return PokemonDetailType(
-                    id=pokemon.id,
-                    name=pokemon.name,
-                    height=pokemon.height,
-                    weight=pokemon.weight,
-                    imageUrl=pokemon.image_url,
-                    types=[TypeType(id=t.id, name=t.name) for t in pokemon.types],
-                    abilities=pokemon.abilities or [],
-                    cries=pokemon.cries or ""
-                )
-            return None
+    ) -> typing.Optional[PokemonRecord]:
+        return await get_loaders(info).pokemon_by_id.load(pokemonId)
 
-    @strawberry.field
+    @strawberry.field(graphql_type=typing.Optional[PokemonDetailType])
     async def pokemonByName(
         self, 
+        info: Info,
         pokemonName: str
-    ) -> typing.Optional[PokemonDetailType]:
-        async with AsyncSessionLocal() as session:
-            query = select(Pokemon).options(selectinload(Pokemon.types)).where(Pokemon.name == pokemonName)
-            result = await session.execute(query)
-            pokemon = result.scalar_one_or_none()
-            
-            if pokemon:
-                return PokemonDetailType(
-                    id=pokemon.id,
-                    name=pokemon.name,
-                    height=pokemon.height,
-                    weight=pokemon.weight,
-                    imageUrl=pokemon.image_url,
-                    types=[TypeType(id=t.id, name=t.name) for t in pokemon.types],
-                    abilities=pokemon.abilities or [],
-                    cries=pokemon.cries or ""
-                )
-            return None
-
-
-schema = strawberry.Schema(Query)
+    ) -> typing.Optional[PokemonRecord]:
+        return await get_loaders(info).pokemon_by_name.load(pokemonName)
+
+    @strawberry.field(graphql_type=typing.List[typing.Optional[PokemonDetailType]])
+    async def pokemonsByIds(
+        self,
+        info: Info,
+        ids: typing.List[int]
+    ) -> typing.List[typing.Optional[PokemonRecord]]:
+        """The Pokémon with each of ``ids``, in the same order, null where
+        there is none. Repeated ids are looked up once."""
+        check_lookup_keys("ids", ids)
+        return await get_loaders(info).pokemon_by_id.load_many(ids)
+
+    @strawberry.field(graphql_type=typing.List[typing.Optional[PokemonDetailType]])
+    async def pokemonsByNames(
+        self,
+        info: Info,
+        names: typing.List[str]
+    ) -> typing.List[typing.Optional[PokemonRecord]]:
+        """The Pokémon named each of ``names``, like ``pokemonsByIds``."""
+        check_lookup_keys("names", names)
+        return await get_loaders(info).pokemon_by_name.load_many(names)
+
+    @strawberry.field(graphql_type=PokemonStatsType)
+    async def pokemonStats(self) -> DatasetStats:
+        """Height and weight distributions, overall and per type, and how
+        many Pokémon have each pair of types. Computed once per dataset
+        version."""
+        return await get_dataset_stats()
+
+    @strawberry.field
+    async def typeMatchup(
+        self,
+        attacker: str,
+        defenders: typing.List[str]
+    ) -> TypeMatchupType:
+        """Damage multiplier of an ``attacker`` type move against a Pokémon
+        of the ``defenders`` types."""
+        return TypeMatchupType(
+            attacker=attacker,
+            defenders=defenders,
+            multiplier=await type_matchup(attacker, defenders),
+        )
+
+    @strawberry.field
+    async def bestCountersFor(
+        self,
+        info: Info,
+        pokemonId: int,
+        limit: int = 10
+    ) -> typing.List[CounterType]:
+        """Stored Pokémon ranked by how well their types fare against
+        ``pokemonId``: ``offense`` is the best multiplier their types deal
+        to it, ``defense`` the worst its types deal back, and ``score`` the
+        ratio of the two."""
+        counters = await best_counters(pokemonId, max(0, min(limit, MAX_COUNTERS)))
+        records = await get_loaders(info).pokemon_by_id.load_many([c.pokemon_id for c in counters])
+        return [
+            CounterType(pokemon=record, score=c.score, offense=c.offense, defense=c.defense)
+            for c, record in zip(counters, records)
+            if record is not None
+        ]
+
+    @strawberry.field(graphql_type=typing.Optional[EvolutionChainType])
+    async def evolutionChain(self, pokemonId: int) -> typing.Optional[EvolutionChainRecord]:
+        """The evolution chain ``pokemonId`` belongs to, depth first from
+        its base species."""
+        return await get_evolution_chain(pokemonId)
+
+    @strawberry.field(graphql_type=typing.List[EvolutionStageType])
+    async def preEvolutions(self, pokemonId: int) -> typing.Sequence[EvolutionStageRecord]:
+        """The species ``pokemonId`` evolves from, base species first."""
+        return await get_pre_evolutions(pokemonId)
+
+    @strawberry.field(graphql_type=typing.List[EvolutionStageType])
+    async def evolvesTo(self, pokemonId: int) -> typing.Sequence[EvolutionStageRecord]:
+        """Every species ``pokemonId`` evolves into, directly or through
+        others, in chain order."""
+        return await get_evolutions(pokemonId)
+
+    @strawberry.field(graphql_type=typing.Optional[AbilityType])
+    async def abilityByName(
+        self,
+        info: Info,
+        abilityName: str
+    ) -> typing.Optional[AbilityRecord]:
+        """An ability; its ``pokemon`` pages through the Pokémon that have it."""
+        return await get_loaders(info).ability_by_name.load(abilityName)
+
+
+@strawberry.type
+class PopulationProgressType:
+    state: str
+    total: int
+    processed: int
+    written: int
+    failed: int
+    recordsPerSecond: float
+    etaSeconds: typing.Optional[float]
+    datasetVersion: int
+
+
+async def current_progress() -> PopulationProgressType:
+    progress = population.progress() or {}
+    return PopulationProgressType(
+        state=population.state,
+        total=progress.get("total", 0),
+        processed=progress.get("processed", 0),
+        written=progress.get("written", 0),
+        failed=progress.get("failed", 0),
+        recordsPerSecond=progress.get("records_per_second", 0.0),
+        etaSeconds=progress.get("eta_seconds"),
+        datasetVersion=await get_dataset_version(),
+    )
+
+
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def populationProgress(self) -> typing.AsyncGenerator[PopulationProgressType, None]:
+        """The startup population's progress now and after every batch it
+        writes, ending once it has finished."""
+        # Only the latest progress matters, so one buffered event is enough
+        async with population_progress.subscribe(maxsize=1) as events:
+            progress = await current_progress()
+            yield progress
+            while progress.state == "running":
+                await events.__anext__()
+                progress = await current_progress()
+                yield progress
+
+    @strawberry.subscription(graphql_type=PokemonType)
+    async def pokemonAdded(self) -> typing.AsyncGenerator[PokemonRecord, None]:
+        """Each Pokémon the populator inserts from now on."""
+        async with pokemon_added.subscribe() as events:
+            async for ids in events:
+                # Each batch gets its own loaders, passed down with its records,
+                # so they don't grow for as long as the socket is open
+                loaders = Loaders()
+                for record in await loaders.pokemon_by_id.load_many(list(ids)):
+                    if record is not None:
+                        yield PokemonEvent(record, loaders)
+
+    @strawberry.subscription
+    async def datasetVersionChanged(self) -> typing.AsyncGenerator[int, None]:
+        """The dataset version after each write."""
+        async with dataset_version_changed.subscribe() as events:
+            async for version in events:
+                yield version
+
+
+async def get_context() -> typing.Dict[str, typing.Any]:
+    # Fresh loaders per request, so batching never leaks data across requests
+    return {"loaders": Loaders()}
+
+
+# Parsed and validated documents, keyed by query text. Clients send the same
+# few operations, so nearly every request skips both steps.
+DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "256"))
+
+with startup_timer.phase("schema"):
+    schema = strawberry.Schema(
+        Query,
+        subscription=Subscription,
+        extensions=[
+            # First, so its parse and validate timings include the caches' hits
+            TracingExtension,
+            ParserCache(maxsize=DOCUMENT_CACHE_SIZE),
+            ValidationCache(maxsize=DOCUMENT_CACHE_SIZE),
+            # Depth, alias and cost limits, checked once per cached document
+            *limit_extensions(),
+        ],
+    )
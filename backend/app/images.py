@@ -0,0 +1,318 @@
+"""
+Artwork proxy: ``/images/{pokemon_id}/{size}``.
+
+Each upstream artwork is fetched once and kept in a content-addressed disk
+cache. Blobs are stored under the SHA-256 of their bytes, and a small ref
+file maps an artwork URL and size to its blob, so identical images are stored
+once. Files are written under a temporary name and renamed into place:
+workers sharing ``POKEMON_IMAGE_CACHE_DIR`` never see a partial file, and
+within a process concurrent requests for the same image share one fetch.
+
+Sizes other than ``original`` are WebP thumbnails made with Pillow, which
+``requirements.txt`` installs. It's imported on the first resize, off the
+startup path. Without it every size serves the original artwork.
+
+Files are streamed from disk. Servers that support the ASGI zero-copy send
+extension are handed the open file so the kernel copies it to the socket.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import typing
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.types import Receive, Scope, Send
+from sqlalchemy import select
+
+from .database import ReadSessionLocal
+from .loaders import load_pokemon_by_id
+from .models.pokemon import Pokemon
+
+if typing.TYPE_CHECKING:
+    # Imported on the first upstream fetch, off the startup path
+    import httpx
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "images"
+)
+IMAGE_CACHE_DIR = os.getenv("POKEMON_IMAGE_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+# Prefix for the URLs imageUrl(size:) returns, e.g. https://api.example.com
+# when the frontend is served from another origin
+IMAGE_BASE_URL = os.getenv("POKEMON_IMAGE_BASE_URL", "").rstrip("/")
+
+# Seconds browsers and CDNs may reuse an image before revalidating its ETag
+IMAGE_MAX_AGE = int(os.getenv("POKEMON_IMAGE_MAX_AGE", "86400"))
+
+# Longest edge of each variant in pixels; None keeps the original
+SIZES: typing.Dict[str, typing.Optional[int]] = {
+    "thumb": 96,
+    "small": 240,
+    "large": 475,
+    "original": None,
+}
+
+WEBP_QUALITY = 80
+
+# Upstream artwork is a few hundred KiB; refuse anything much larger
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+PREWARM_CONCURRENCY = int(os.getenv("POKEMON_PREWARM_CONCURRENCY", "8"))
+
+
+def parse_sizes(value: str) -> typing.List[str]:
+    if value.strip() == "all":
+        return list(SIZES)
+    sizes = [size.strip() for size in value.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        raise ValueError(f"Unknown image sizes: {', '.join(unknown)}")
+    return sizes
+
+
+# Sizes to fetch and resize for every Pokémon once population finishes
+PREWARM_SIZES = parse_sizes(os.getenv("POKEMON_PREWARM_IMAGES", ""))
+
+
+class ImageError(Exception):
+    """The upstream artwork couldn't be fetched or isn't an image."""
+
+
+class Blob(typing.NamedTuple):
+    digest: str
+    media_type: str
+    path: str
+
+
+def image_path(pokemon_id: int, size: str) -> str:
+    return f"{IMAGE_BASE_URL}/images/{pokemon_id}/{size}"
+
+
+def pillow_image() -> typing.Any:
+    """Pillow's ``Image`` module, or ``None`` without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def resize(data: bytes, edge: int) -> typing.Optional[bytes]:
+    """``data`` scaled to fit ``edge`` × ``edge``, as WebP; ``None`` without
+    Pillow."""
+    Image = pillow_image()
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        output = io.BytesIO()
+        image.save(output, "WEBP", quality=WEBP_QUALITY)
+    return output.getvalue()
+
+
+class ImageStore:
+    """Content-addressed image cache under ``root``::
+
+        blobs/ab/abcdef...        image bytes, named by their SHA-256
+        refs/12/1234...-thumb     "<sha256> <media type>" for a URL and size
+    """
+
+    def __init__(
+        self,
+        root: str = IMAGE_CACHE_DIR,
+        timeout: float = 30.0,
+        client: typing.Optional["httpx.AsyncClient"] = None,
+    ):
+        self.root = root
+        self.timeout = timeout
+        # Upstream fetches, for tests and logs
+        self.fetched = 0
+        self._client = client
+        # (url, size) -> the task producing it, so concurrent requests share it
+        self._inflight: typing.Dict[typing.Tuple[str, str], asyncio.Task] = {}
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _ref_path(self, url: str, size: str) -> str:
+        key = hashlib.sha256(url.encode()).hexdigest()[:32]
+        return os.path.join(self.root, "refs", key[:2], f"{key}-{size}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as file:
+            file.write(data)
+        os.replace(file.name, path)
+
+    def lookup(self, url: str, size: str) -> typing.Optional[Blob]:
+        """The cached blob for ``url`` at ``size``, without fetching."""
+        try:
+            with open(self._ref_path(url, size)) as file:
+                digest, media_type = file.read().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        path = self._blob_path(digest)
+        return Blob(digest, media_type, path) if os.path.exists(path) else None
+
+    def _store(self, url: str, size: str, data: bytes, media_type: str) -> Blob:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            self._write(path, data)
+        self._write(self._ref_path(url, size), f"{digest} {media_type}".encode())
+        return Blob(digest, media_type, path)
+
+    async def get(self, url: str, size: str = "original") -> Blob:
+        """The blob for ``url`` at ``size``, fetched and resized on first use."""
+        blob = self.lookup(url, size)
+        if blob is not None:
+            return blob
+        key = (url, size)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._produce(url, size))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A client hanging up doesn't abandon the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _produce(self, url: str, size: str) -> Blob:
+        edge = SIZES[size]
+        if edge is None:
+            data, media_type = await self._fetch(url)
+            return await asyncio.to_thread(self._store, url, size, data, media_type)
+
+        original = await self.get(url, "original")
+        with open(original.path, "rb") as file:
+            data = file.read()
+        try:
+            resized = await asyncio.to_thread(resize, data, edge)
+        except (OSError, ValueError) as e:
+            raise ImageError(f"Can't resize {url}: {e}") from e
+        if resized is None:
+            # No Pillow: the variant is the original, stored once
+            return await asyncio.to_thread(self._store, url, size, data, original.media_type)
+        return await asyncio.to_thread(self._store, url, size, resized, "image/webp")
+
+    async def _fetch(self, url: str) -> typing.Tuple[bytes, str]:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        try:
+            response = await self._client.get(url)
+        except httpx.HTTPError as e:
+            raise ImageError(f"Fetching {url} failed: {e}") from e
+        if response.status_code != 200:
+            raise ImageError(f"Fetching {url} returned {response.status_code}")
+        media_type = response.headers.get("content-type", "").split(";")[0].strip()
+        if not media_type.startswith("image/"):
+            raise ImageError(f"{url} is not an image ({media_type or 'no content type'})")
+        if len(response.content) > MAX_IMAGE_BYTES:
+            raise ImageError(f"{url} is larger than {MAX_IMAGE_BYTES} bytes")
+        self.fetched += 1
+        return response.content, media_type
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+store = ImageStore()
+
+
+async def prewarm(sizes: typing.Sequence[str] = PREWARM_SIZES, image_store: typing.Optional[ImageStore] = None) -> int:
+    """Fetch and resize every stored Pokémon's artwork ahead of requests.
+    Returns how many images failed."""
+    image_store = image_store or store
+    async with ReadSessionLocal() as session:
+        urls = (
+            await session.execute(select(Pokemon.image_url).where(Pokemon.image_url.is_not(None)))
+        ).scalars().all()
+
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+    failed = 0
+
+    async def warm(url: str, size: str) -> None:
+        nonlocal failed
+        async with semaphore:
+            try:
+                await image_store.get(url, size)
+            except ImageError as e:
+                failed += 1
+                print(f"Prewarming {size} image failed: {e}")
+
+    await asyncio.gather(*(warm(url, size) for url in urls for size in sizes))
+    print(f"Prewarmed {len(urls)} images at {', '.join(sizes)} ({failed} failed)")
+    return failed
+
+
+_prewarm_task: typing.Optional[asyncio.Task] = None
+
+
+def start_prewarm() -> None:
+    """Prewarm ``PREWARM_SIZES`` in the background, if any are configured."""
+    global _prewarm_task
+    if PREWARM_SIZES and (_prewarm_task is None or _prewarm_task.done()):
+        _prewarm_task = asyncio.create_task(prewarm())
+
+
+async def close_images() -> None:
+    global _prewarm_task
+    if _prewarm_task is not None and not _prewarm_task.done():
+        _prewarm_task.cancel()
+        try:
+            await _prewarm_task
+        except asyncio.CancelledError:
+            pass
+    _prewarm_task = None
+    await store.close()
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """A ``FileResponse`` that passes the open file to servers supporting
+    the ASGI ``http.response.zerocopysend`` extension (``sendfile``), and
+    streams it in chunks otherwise."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.send_header_only or "http.response.zerocopysend" not in scope.get("extensions", {}):
+            await super().__call__(scope, receive, send)
+            return
+        with open(self.path, "rb") as file:
+            stat_result = os.fstat(file.fileno())
+            if self.stat_result is None:
+                self.set_stat_headers(stat_result)
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.zerocopysend", "file": file, "count": stat_result.st_size})
+        if self.background is not None:
+            await self.background()
+
+
+router = APIRouter()
+
+
+@router.api_route("/images/{pokemon_id}/{size}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_image(pokemon_id: int, size: str, request: Request) -> Response:
+    if size not in SIZES:
+        return JSONResponse({"detail": f"Unknown size; use one of {', '.join(SIZES)}"}, status_code=404)
+    (record,) = await load_pokemon_by_id([pokemon_id])
+    if record is None or not record.imageUrl:
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+    try:
+        blob = await store.get(record.imageUrl, size)
+    except ImageError as e:
+        print(e)
+        return JSONResponse({"detail": "Upstream image unavailable"}, status_code=502)
+
+    # Blobs never change, but a Pokémon's artwork can, so revalidate by digest
+    etag = f'"{blob.digest}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={IMAGE_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return ZeroCopyFileResponse(blob.path, media_type=blob.media_type, headers=headers, method=request.method)
@@ -0,0 +1,642 @@
+"""
+Concurrent ingestion of PokeAPI data into the local database.
+
+Pokémon are fetched through a single pooled ``httpx.AsyncClient`` by a fixed
+number of workers, retried with exponential backoff on transient failures and
+written to ``pokemons``, ``type``/``pokemon_type``, ``ability``/
+``pokemon_ability`` and ``cry`` in batched bulk inserts. The type chart
+(``type_effectiveness``) is fetched when it's missing or on refresh.
+Evolution chains are fetched for stored Pokémon whose species has none yet,
+or all again on refresh. Each chain is flattened into ``species`` rows and
+``evolution_closure`` pairs, so reads never walk the chain.
+
+Runs are incremental: IDs already stored are skipped, and every batch commits
+its ``pokemon_source`` rows together with the data, so an interrupted run
+picks up where it stopped. With ``refresh=True`` stored Pokémon are
+revalidated with ``If-None-Match`` and only rewritten when their content hash
+changes.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import random
+import time
+import typing
+from dataclasses import dataclass
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from .cache import invalidate_caches
+from .dataset import bump_dataset_version
+from .models.pokemon import (
+    Ability,
+    Cry,
+    Pokemon,
+    PokemonSource,
+    Species,
+    Type,
+    TypeEffectiveness,
+    evolution_closure,
+    pokemon_ability,
+    pokemon_type,
+)
+from .pubsub import pokemon_added, population_progress
+
+if typing.TYPE_CHECKING:
+    # Imported when a run starts; the app imports this module for its stats
+    import httpx
+
+# PokeAPI URL
+POKE_API_URL = "https://pokeapi.co/api/v2/"
+
+# Status codes worth retrying: rate limiting and upstream hiccups
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class IngestError(Exception):
+    """Raised when a PokeAPI resource cannot be fetched after all retries."""
+
+
+@dataclass
+class IngestStats:
+    fetched: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    failed: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    # Pokémon this run has to fetch (those not skipped)
+    total: int = 0
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    @property
+    def processed(self) -> int:
+        return self.written + self.unchanged + self.failed
+
+    @property
+    def records_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.written / self.elapsed
+
+    def __str__(self) -> str:
+        return (
+            f"{self.inserted} inserted, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.skipped} skipped, "
+            f"{self.failed} failed, {self.retries} retries "
+            f"in {self.elapsed:.2f}s ({self.records_per_second:.1f} records/sec)"
+        )
+
+
+@dataclass
+class SourceState:
+    etag: typing.Optional[str]
+    content_hash: typing.Optional[str]
+
+
+# (parsed record, pokemon_source row, whether the Pokémon was already stored)
+FetchedPokemon = typing.Tuple[dict, dict, bool]
+
+# Stats of the running or most recent ingestion in this process, for /metrics
+latest_stats: typing.Optional[IngestStats] = None
+
+
+# Keys of a parsed record that are ``pokemons`` columns
+POKEMON_FIELDS = ("id", "name", "height", "weight", "image_url")
+
+
+def parse_pokemon(pokemon_data: dict) -> dict:
+    """Map a PokeAPI ``pokemon`` resource to the data we store."""
+    cries = pokemon_data.get("cries") or {}
+    return {
+        "id": pokemon_data["id"],
+        "name": pokemon_data["name"],
+        "height": pokemon_data["height"],
+        "weight": pokemon_data["weight"],
+        "image_url": pokemon_data["sprites"]["other"]["official-artwork"]["front_default"],
+        "abilities": [
+            {
+                "name": ability["ability"]["name"],
+                "slot": ability.get("slot", index),
+                "is_hidden": bool(ability.get("is_hidden")),
+            }
+            for index, ability in enumerate(pokemon_data["abilities"], start=1)
+        ],
+        "cries": {"latest": cries.get("latest"), "legacy": cries.get("legacy")},
+        "types": [type_data["type"]["name"] for type_data in pokemon_data["types"]],
+    }
+
+
+# PokeAPI damage relation -> multiplier, from the attacking type's side
+DAMAGE_RELATIONS = {"double_damage_to": 2.0, "half_damage_to": 0.5, "no_damage_to": 0.0}
+
+
+def parse_type(type_data: dict) -> typing.Tuple[str, typing.Dict[str, float]]:
+    """Map a PokeAPI ``type`` resource to its name and the multipliers it
+    deals to the defending types that aren't hit normally."""
+    relations = type_data.get("damage_relations") or {}
+    multipliers = {}
+    for relation, multiplier in DAMAGE_RELATIONS.items():
+        for defender in relations.get(relation) or ():
+            multipliers[defender["name"]] = multiplier
+    return type_data["name"], multipliers
+
+
+def table_rows(
+    records: typing.Sequence[dict],
+    type_ids: typing.Mapping[str, int],
+    ability_ids: typing.Mapping[str, int],
+) -> typing.List[typing.Tuple[typing.Any, typing.List[dict]]]:
+    """Split parsed records into rows per table, in foreign key order."""
+    pokemon_rows: typing.List[dict] = []
+    type_links: typing.List[dict] = []
+    ability_links: typing.List[dict] = []
+    cries: typing.List[dict] = []
+    for record in records:
+        pokemon_rows.append({field: record[field] for field in POKEMON_FIELDS})
+        type_links.extend({"pokemon_id": record["id"], "type_id": type_ids[name]} for name in record["types"])
+        ability_links.extend(
+            {
+                "pokemon_id": record["id"],
+                "ability_id": ability_ids[ability["name"]],
+                "slot": ability["slot"],
+                "is_hidden": ability["is_hidden"],
+            }
+            for ability in record["abilities"]
+        )
+        if any(record["cries"].values()):
+            cries.append({"pokemon_id": record["id"], **record["cries"]})
+    return [
+        (Pokemon.__table__, pokemon_rows),
+        (pokemon_type, type_links),
+        (pokemon_ability, ability_links),
+        (Cry.__table__, cries),
+    ]
+
+
+def content_hash(record: dict) -> str:
+    """Hash of the fields we store, so upstream noise doesn't trigger rewrites."""
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+def resource_id(url: str) -> int:
+    # PokeAPI resource URLs look like .../api/v2/pokemon/25/
+    return int(url.rstrip("/").rsplit("/", 1)[1])
+
+
+# PokeAPI numbers alternate forms (megas, regional forms) from 10001. Every
+# other Pokémon shares its id with its species.
+MAX_SPECIES_ID = 10000
+
+
+def parse_evolution_chain(chain_data: dict) -> typing.Tuple[typing.List[dict], typing.List[dict]]:
+    """Flatten a PokeAPI ``evolution-chain`` resource into ``species`` rows,
+    depth first, and ``evolution_closure`` rows pairing every species with
+    each of its later stages."""
+    chain_id = chain_data["id"]
+    species_rows: typing.List[dict] = []
+    closure_rows: typing.List[dict] = []
+
+    def visit(link: dict, ancestors: typing.List[int]) -> None:
+        species_id = resource_id(link["species"]["url"])
+        # Some species evolve in several ways; the first is the usual one
+        details = (link.get("evolution_details") or [{}])[0]
+        species_rows.append(
+            {
+                "id": species_id,
+                "name": link["species"]["name"],
+                "chain_id": chain_id,
+                "position": len(species_rows),
+                "stage": len(ancestors),
+                "evolves_from_id": ancestors[-1] if ancestors else None,
+                "trigger": (details.get("trigger") or {}).get("name"),
+                "min_level": details.get("min_level"),
+                "item": (details.get("item") or {}).get("name"),
+            }
+        )
+        closure_rows.extend(
+            {"ancestor_id": ancestor, "descendant_id": species_id, "distance": len(ancestors) - index}
+            for index, ancestor in enumerate(ancestors)
+        )
+        for child in link.get("evolves_to") or ():
+            visit(child, ancestors + [species_id])
+
+    visit(chain_data["chain"], [])
+    return species_rows, closure_rows
+
+
+class PokemonIngester:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        base_url: str = POKE_API_URL,
+        concurrency: int = 16,
+        batch_size: int = 50,
+        max_retries: int = 4,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+    ):
+        self.engine = engine
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.stats = IngestStats()
+        self._started = time.perf_counter()
+        self._type_ids: typing.Dict[str, int] = {}
+        self._ability_ids: typing.Dict[str, int] = {}
+
+    def _make_client(self) -> "httpx.AsyncClient":
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+        )
+        return httpx.AsyncClient(
+            base_url=self.base_url, limits=limits, timeout=self.timeout
+        )
+
+    async def get(
+        self,
+        client: "httpx.AsyncClient",
+        url: str,
+        headers: typing.Optional[typing.Dict[str, str]] = None,
+    ) -> "httpx.Response":
+        """GET ``url``, retrying transient failures with backoff."""
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
+                error: Exception = IngestError(
+                    f"{url} answered {response.status_code}"
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt == self.max_retries:
+                raise IngestError(f"Giving up on {url}: {error}") from error
+
+            self.stats.retries += 1
+            delay = self.backoff * (2 ** attempt)
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+        raise AssertionError("unreachable")
+
+    async def fetch_json(self, client: "httpx.AsyncClient", url: str) -> dict:
+        return typing.cast(dict, (await self.get(client, url)).json())
+
+    async def list_pokemon_urls(
+        self, client: "httpx.AsyncClient", limit: int
+    ) -> typing.List[str]:
+        data = await self.fetch_json(client, f"pokemon?limit={limit}")
+        return [entry["url"] for entry in data["results"]]
+
+    async def load_sources(self) -> typing.Dict[int, SourceState]:
+        """Stored Pokémon IDs with whatever upstream state we recorded for them."""
+        query = select(
+            Pokemon.id, PokemonSource.etag, PokemonSource.content_hash
+        ).outerjoin(PokemonSource, PokemonSource.pokemon_id == Pokemon.id)
+        async with self.engine.connect() as conn:
+            result = await conn.execute(query)
+            return {row.id: SourceState(row.etag, row.content_hash) for row in result}
+
+    async def run(self, limit: int = 500, refresh: bool = False) -> IngestStats:
+        """Bring the first ``limit`` Pokémon up to date.
+
+        Missing Pokémon are fetched and inserted. Stored ones are skipped, or
+        revalidated against upstream when ``refresh`` is set.
+        """
+        global latest_stats
+        self.stats = latest_stats = IngestStats()
+        started = self._started = time.perf_counter()
+
+        async with self._make_client() as client:
+            known = await self.load_sources()
+            if not refresh and len(known) >= limit and await self.has_type_chart():
+                # Nothing to add, e.g. another worker just populated: don't
+                # ask PokeAPI for the listing
+                urls = []
+                self.stats.skipped = len(known)
+            else:
+                urls = await self.list_pokemon_urls(client, limit)
+
+            work = []
+            for url in urls:
+                source = known.get(resource_id(url))
+                if source is not None and not refresh:
+                    self.stats.skipped += 1
+                    continue
+                work.append((url, source))
+            self.stats.total = len(work)
+            population_progress.publish(self.stats)
+
+            if work:
+                await self.ingest(client, work)
+
+            await self.ingest_reference_data(client, refresh)
+
+        self.stats.elapsed = time.perf_counter() - started
+        population_progress.publish(self.stats)
+        return self.stats
+
+    async def ingest_reference_data(self, client: "httpx.AsyncClient", refresh: bool = False) -> None:
+        """Fetch the type chart and the evolution chains of stored Pokémon
+        when they're missing, or again on refresh. Failures are logged;
+        Pokémon are stored either way and the next run tries again."""
+        if refresh or not await self.has_type_chart():
+            try:
+                await self.ingest_type_chart(client)
+            except (IngestError, SQLAlchemyError) as e:
+                print(f"Error ingesting the type chart: {e}")
+                self._type_ids.clear()
+
+        species_ids = await self.species_without_chains(refresh)
+        if species_ids:
+            try:
+                await self.ingest_evolution_chains(client, species_ids)
+            except SQLAlchemyError as e:
+                print(f"Error storing evolution chains: {e}")
+
+    async def complete(self) -> None:
+        """Fetch reference data a database seeded from an older snapshot
+        lacks, without touching its Pokémon."""
+        async with self._make_client() as client:
+            await self.ingest_reference_data(client)
+
+    async def has_type_chart(self) -> bool:
+        async with self.engine.connect() as conn:
+            return (await conn.execute(select(TypeEffectiveness.attacker_id).limit(1))).first() is not None
+
+    async def ingest_type_chart(self, client: "httpx.AsyncClient") -> int:
+        """Replace the stored type chart with PokeAPI's damage relations;
+        returns the number of types that have any."""
+        listing = await self.fetch_json(client, "type?limit=100")
+        resources = await asyncio.gather(
+            *(self.fetch_json(client, entry["url"]) for entry in listing["results"])
+        )
+        # Placeholder types ("unknown", "shadow") have no relations
+        chart = dict(parsed for parsed in map(parse_type, resources) if parsed[1])
+
+        names = set(chart) | {defender for multipliers in chart.values() for defender in multipliers}
+        async with self.engine.begin() as conn:
+            await self._ensure_names(conn, Type, self._type_ids, names)
+            await conn.execute(delete(TypeEffectiveness))
+            rows = [
+                {
+                    "attacker_id": self._type_ids[attacker],
+                    "defender_id": self._type_ids[defender],
+                    "multiplier": multiplier,
+                }
+                for attacker, multipliers in chart.items()
+                for defender, multiplier in multipliers.items()
+            ]
+            if rows:
+                await conn.execute(insert(TypeEffectiveness), rows)
+            await bump_dataset_version(conn)
+        invalidate_caches()
+        print(f"Stored the type chart for {len(chart)} types")
+        return len(chart)
+
+    async def species_without_chains(self, refresh: bool = False) -> typing.List[int]:
+        """Species of the stored Pokémon with no evolution chain stored, or
+        all of them on refresh. Alternate forms are left out."""
+        query = select(Pokemon.id).where(Pokemon.id <= MAX_SPECIES_ID).order_by(Pokemon.id)
+        if not refresh:
+            query = query.outerjoin(Species, Species.id == Pokemon.id).where(Species.id.is_(None))
+        async with self.engine.connect() as conn:
+            return list((await conn.execute(query)).scalars())
+
+    async def ingest_evolution_chains(self, client: "httpx.AsyncClient", species_ids: typing.Sequence[int]) -> int:
+        """Fetch the evolution chains of ``species_ids`` and replace them in
+        ``species`` and ``evolution_closure``; returns the number of chains
+        stored.
+
+        A species is only fetched to find its chain's URL, so species that
+        belong to a chain fetched earlier in the run are skipped. Species
+        whose chain can't be fetched are left for the next run.
+        """
+        import httpx
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for species_id in species_ids:
+            pending.put_nowait(species_id)
+        chains: typing.Dict[int, typing.Tuple[typing.List[dict], typing.List[dict]]] = {}
+        chain_urls: typing.Set[str] = set()
+        covered: typing.Set[int] = set()
+
+        async def fetcher() -> None:
+            while True:
+                try:
+                    species_id = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                if species_id in covered:
+                    continue
+                try:
+                    species = await self.fetch_json(client, f"pokemon-species/{species_id}/")
+                    url = species["evolution_chain"]["url"]
+                    # Another fetcher has this chain
+                    if url in chain_urls:
+                        continue
+                    chain_urls.add(url)
+                    chain_data = await self.fetch_json(client, url)
+                    chain = parse_evolution_chain(chain_data)
+                except (IngestError, httpx.HTTPError, KeyError, TypeError, ValueError) as e:
+                    print(f"Error fetching the evolution chain of species {species_id}: {e}")
+                    continue
+                chains[chain_data["id"]] = chain
+                covered.update(row["id"] for row in chain[0])
+
+        workers = max(1, min(self.concurrency, len(species_ids)))
+        await asyncio.gather(*(fetcher() for _ in range(workers)))
+        if not chains:
+            return 0
+
+        species_rows = [row for rows, _ in chains.values() for row in rows]
+        closure_rows = [row for _, rows in chains.values() for row in rows]
+        ids = [row["id"] for row in species_rows]
+        async with self.engine.begin() as conn:
+            # Replace the chains wholesale, dropping species they no longer have
+            stale = select(Species.id).where(Species.id.in_(ids) | Species.chain_id.in_(list(chains)))
+            await conn.execute(
+                delete(evolution_closure).where(
+                    evolution_closure.c.ancestor_id.in_(stale) | evolution_closure.c.descendant_id.in_(stale)
+                )
+            )
+            await conn.execute(delete(Species).where(Species.id.in_(ids) | Species.chain_id.in_(list(chains))))
+            await conn.execute(insert(Species), species_rows)
+            if closure_rows:
+                await conn.execute(insert(evolution_closure), closure_rows)
+            await bump_dataset_version(conn)
+        invalidate_caches()
+        print(f"Stored {len(chains)} evolution chains")
+        return len(chains)
+
+    async def fetch_pokemon(
+        self,
+        client: "httpx.AsyncClient",
+        url: str,
+        source: typing.Optional[SourceState],
+    ) -> typing.Optional[FetchedPokemon]:
+        """Fetch one Pokémon; ``None`` when upstream content hasn't changed."""
+        headers = {"If-None-Match": source.etag} if source and source.etag else None
+        response = await self.get(client, url, headers=headers)
+        if response.status_code == 304:
+            return None
+
+        record = parse_pokemon(response.json())
+        digest = content_hash(record)
+        if source is not None and source.content_hash == digest:
+            return None
+
+        source_row = {
+            "pokemon_id": record["id"],
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "content_hash": digest,
+            "fetched_at": datetime.datetime.utcnow(),
+        }
+        return record, source_row, source is not None
+
+    async def ingest(
+        self,
+        client: "httpx.AsyncClient",
+        work: typing.Sequence[typing.Tuple[str, typing.Optional[SourceState]]],
+    ) -> None:
+        import httpx
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for item in work:
+            pending.put_nowait(item)
+
+        # Bounded so that fetchers wait for the writer instead of buffering
+        # the whole dataset in memory.
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * 2)
+
+        async def fetcher() -> None:
+            while True:
+                try:
+                    url, source = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    fetched = await self.fetch_pokemon(client, url, source)
+                except (IngestError, httpx.HTTPError, KeyError, TypeError, ValueError) as e:
+                    print(f"Error fetching {url}: {e}")
+                    self.stats.failed += 1
+                    continue
+                self.stats.fetched += 1
+                if fetched is None:
+                    self.stats.unchanged += 1
+                    continue
+                await results.put(fetched)
+
+        async def writer() -> None:
+            batch: typing.List[FetchedPokemon] = []
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    await self._flush(batch)
+                    batch = []
+            if batch:
+                await self._flush(batch)
+
+        workers = max(1, min(self.concurrency, len(work)))
+        fetchers = asyncio.gather(*(fetcher() for _ in range(workers)))
+        writer_task = asyncio.create_task(writer())
+        try:
+            # The writer only returns after the sentinel below, so finishing
+            # first means it crashed; don't leave fetchers blocked on a full queue.
+            running: typing.Set["asyncio.Future[typing.Any]"] = {fetchers, writer_task}
+            await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            if writer_task.done():
+                writer_task.result()
+            await fetchers
+            await results.put(None)
+            await writer_task
+        finally:
+            fetchers.cancel()
+            writer_task.cancel()
+
+    async def _ensure_names(
+        self, conn: AsyncConnection, model: typing.Any, ids: typing.Dict[str, int], names: typing.Set[str]
+    ) -> None:
+        """Resolve ``names`` of a lookup table (types, abilities) to ids in
+        ``ids``, inserting the ones not stored yet."""
+        missing = names - ids.keys()
+        if not missing:
+            return
+        result = await conn.execute(
+            select(model.id, model.name).where(model.name.in_(missing))
+        )
+        ids.update({name: row_id for row_id, name in result})
+        new_names = sorted(missing - ids.keys())
+        if new_names:
+            await conn.execute(insert(model), [{"name": name} for name in new_names])
+            result = await conn.execute(
+                select(model.id, model.name).where(model.name.in_(new_names))
+            )
+            ids.update({name: row_id for row_id, name in result})
+
+    async def _flush(self, batch: typing.List[FetchedPokemon]) -> None:
+        try:
+            await self.write_batch(batch)
+        except SQLAlchemyError as e:
+            print(f"Error writing batch of {len(batch)} Pokemon: {e}")
+            self.stats.failed += len(batch)
+            # Ids resolved inside the rolled back transaction may not exist
+            self._type_ids.clear()
+            self._ability_ids.clear()
+
+    async def write_batch(self, batch: typing.List[FetchedPokemon]) -> None:
+        """Write fetched Pokémon and their checkpoints in one transaction."""
+        records = [record for record, _, _ in batch]
+        ids = [record["id"] for record in records]
+        updated = sum(1 for _, _, existed in batch if existed)
+
+        async with self.engine.begin() as conn:
+            await self._ensure_names(conn, Type, self._type_ids, {t for r in records for t in r["types"]})
+            await self._ensure_names(
+                conn, Ability, self._ability_ids, {a["name"] for r in records for a in r["abilities"]}
+            )
+            if updated:
+                # Replace changed rows wholesale; cheaper than diffing columns
+                await conn.execute(delete(pokemon_type).where(pokemon_type.c.pokemon_id.in_(ids)))
+                await conn.execute(delete(pokemon_ability).where(pokemon_ability.c.pokemon_id.in_(ids)))
+                await conn.execute(delete(Cry).where(Cry.pokemon_id.in_(ids)))
+                await conn.execute(delete(PokemonSource).where(PokemonSource.pokemon_id.in_(ids)))
+                await conn.execute(delete(Pokemon).where(Pokemon.id.in_(ids)))
+            for table, rows in table_rows(records, self._type_ids, self._ability_ids):
+                if rows:
+                    await conn.execute(insert(table), rows)
+            await conn.execute(insert(PokemonSource), [source for _, source, _ in batch])
+            await bump_dataset_version(conn)
+        invalidate_caches()
+
+        self.stats.inserted += len(batch) - updated
+        self.stats.updated += updated
+        self.stats.elapsed = time.perf_counter() - self._started
+        print(f"Wrote {self.stats.written} Pokemon so far")
+        inserted = tuple(record["id"] for record, _, existed in batch if not existed)
+        if inserted:
+            pokemon_added.publish(inserted)
+        population_progress.publish(self.stats)
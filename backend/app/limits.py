@@ -0,0 +1,242 @@
+"""
+Limits on what one request, and one client, may ask of the server.
+
+Every operation is validated against a maximum depth, a maximum number of
+aliases and a maximum cost before it runs. An operation's cost is the sum of
+its fields' costs. Plain scalar fields cost nothing and other fields cost 1,
+unless ``FIELD_COSTS`` says otherwise. A field that takes a page size
+(``perPage``, ``first``, ``limit``) multiplies the cost of its selection by
+that size, and a batch lookup by the number of keys it lists. Sizes given as
+variables count as the maximum, because validation results are cached per
+document whatever the variables. Resolvers clamp page sizes to
+``MAX_PAGE_SIZE`` and refuse more than ``MAX_LOOKUP_KEYS`` keys anyway.
+
+With ``GRAPHQL_RATE_LIMIT`` set, each client gets a token bucket of
+``GRAPHQL_RATE_BURST`` requests, refilled at that many per second. A client
+with an empty bucket is answered ``429`` with ``Retry-After`` before its
+query is even parsed. Clients are told apart by address. Behind a proxy
+every request comes from the proxy's address, so rate limiting is off by
+default and needs ``GRAPHQL_TRUST_FORWARDED_FOR`` there.
+"""
+import collections
+import math
+import os
+import time
+import typing
+
+from fastapi.requests import HTTPConnection
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    ListValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    is_leaf_type,
+)
+from graphql.validation import ValidationRule
+from strawberry.extensions import AddValidationRules, MaxAliasesLimiter, QueryDepthLimiter
+
+MAX_PAGE_SIZE = int(os.getenv("GRAPHQL_MAX_PAGE_SIZE", "100"))
+# Most keys one batch lookup (pokemonsByIds, pokemonsByNames) may list
+MAX_LOOKUP_KEYS = int(os.getenv("GRAPHQL_MAX_LOOKUP_KEYS", "100"))
+MAX_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "10"))
+MAX_ALIASES = int(os.getenv("GRAPHQL_MAX_ALIASES", "30"))
+MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", "1000"))
+
+# Requests per second per client, and how many may come in a burst; 0 (the
+# default) turns rate limiting off
+RATE_LIMIT = float(os.getenv("GRAPHQL_RATE_LIMIT", "0"))
+RATE_BURST = int(os.getenv("GRAPHQL_RATE_BURST", "40"))
+# Key clients by the first X-Forwarded-For address, when behind a proxy
+TRUST_FORWARDED_FOR = os.getenv("GRAPHQL_TRUST_FORWARDED_FOR", "").lower() in ("1", "true", "yes")
+
+# Arguments that say how many items a field returns
+PAGE_ARGUMENTS = ("perPage", "first", "limit")
+# List arguments with one item returned per entry
+KEY_ARGUMENTS = ("ids", "names")
+
+# Cost of a field itself, before what it selects, as "Type.field"
+FIELD_COSTS = {
+    "Query.searchPokemons": 5,
+    "Query.bestCountersFor": 5,
+}
+
+
+def clamp_page_size(per_page: int, minimum: int = 1) -> int:
+    return max(minimum, min(per_page, MAX_PAGE_SIZE))
+
+
+def _argument(node: FieldNode, name: str) -> typing.Any:
+    return next((argument.value for argument in node.arguments if argument.name.value == name), None)
+
+
+class QueryCostRule(ValidationRule):
+    """Rejects operations whose cost exceeds ``max_cost``."""
+
+    max_cost = MAX_COST
+
+    def enter_operation_definition(self, node: OperationDefinitionNode, *args: typing.Any) -> None:
+        root = self.context.schema.get_root_type(node.operation)
+        if root is None:
+            return
+        fragments = {
+            definition.name.value: definition
+            for definition in self.context.document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        cost = self.selection_cost(node.selection_set, root, fragments, set())
+        if cost > self.max_cost:
+            name = node.name.value if node.name else "anonymous"
+            self.report_error(
+                GraphQLError(
+                    f"'{name}' has a cost of {cost}, over the maximum of {self.max_cost}",
+                    node,
+                    extensions={"code": "QUERY_TOO_COMPLEX", "cost": cost, "maxCost": self.max_cost},
+                )
+            )
+
+    def selection_cost(
+        self,
+        selection_set: typing.Optional[SelectionSetNode],
+        parent: typing.Any,
+        fragments: typing.Mapping[str, FragmentDefinitionNode],
+        spread: typing.Set[str],
+    ) -> int:
+        if selection_set is None:
+            return 0
+        fields = getattr(parent, "fields", {})
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field = fields.get(selection.name.value)
+                if field is None:
+                    # Introspection, or unknown fields left to other rules
+                    continue
+                named = get_named_type(field.type)
+                key = f"{parent.name}.{selection.name.value}"
+                own = FIELD_COSTS.get(key, 0 if is_leaf_type(named) else 1)
+                below = self.selection_cost(selection.selection_set, named, fragments, spread)
+                cost += (own + below) * self.multiplier(key, field, selection)
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                target = self.context.schema.get_type(condition.name.value) if condition else parent
+                cost += self.selection_cost(selection.selection_set, target, fragments, spread)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                # Fragment cycles are reported by NoFragmentCycles
+                if name in spread or name not in fragments:
+                    continue
+                fragment = fragments[name]
+                target = self.context.schema.get_type(fragment.type_condition.name.value)
+                cost += self.selection_cost(fragment.selection_set, target, fragments, spread | {name})
+        return cost
+
+    def multiplier(self, key: str, field: typing.Any, node: FieldNode) -> int:
+        for name in PAGE_ARGUMENTS:
+            if name not in field.args:
+                continue
+            given = _argument(node, name)
+            if given is None:
+                default = field.args[name].default_value
+                size = default if isinstance(default, int) else MAX_PAGE_SIZE
+            elif isinstance(given, IntValueNode):
+                size = int(given.value)
+            else:
+                # A variable: assume the largest page
+                size = MAX_PAGE_SIZE
+            return max(1, min(size, MAX_PAGE_SIZE))
+        for name in KEY_ARGUMENTS:
+            if name not in field.args:
+                continue
+            given = _argument(node, name)
+            if isinstance(given, ListValueNode):
+                return max(1, min(len(given.values), MAX_LOOKUP_KEYS))
+            return MAX_LOOKUP_KEYS
+        return 1
+
+
+class QueryCostLimiter(AddValidationRules):
+    def __init__(self, max_cost: int = MAX_COST):
+        rule = type("QueryCostRule", (QueryCostRule,), {"max_cost": max_cost})
+        super().__init__([rule])
+
+
+def limit_extensions() -> typing.List[typing.Any]:
+    """Schema extensions enforcing depth, alias and cost limits."""
+    return [
+        QueryDepthLimiter(max_depth=MAX_DEPTH),
+        MaxAliasesLimiter(max_alias_count=MAX_ALIASES),
+        QueryCostLimiter(max_cost=MAX_COST),
+    ]
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Token buckets per client key. The least recently seen buckets are
+    dropped past ``max_clients``, and a client seen again starts full."""
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        burst: int = RATE_BURST,
+        max_clients: int = 10000,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self.clock = clock
+        self.buckets: "collections.OrderedDict[str, TokenBucket]" = collections.OrderedDict()
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, tokens: float = 1.0) -> float:
+        """Take ``tokens`` from ``key``'s bucket. Returns 0 if they were
+        taken, or the seconds until they will be available."""
+        if not self.enabled:
+            return 0.0
+        now = self.clock()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(float(self.burst), now)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket.tokens = min(float(self.burst), bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= tokens:
+            bucket.tokens -= tokens
+            return 0.0
+        self.limited += 1
+        return (tokens - bucket.tokens) / self.rate
+
+    def reset(self) -> None:
+        self.buckets.clear()
+
+
+def client_key(request: HTTPConnection) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
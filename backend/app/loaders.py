@@ -0,0 +1,273 @@
+"""
+Per-request DataLoaders for Pokémon, their types, abilities and cries.
+
+Loads requested by sibling fields of one operation (aliased ``pokemonById``
+lookups, ``types`` on every item of a page) are coalesced into a single
+``IN (...)`` query. Loaders read through the in-process caches first, so only
+keys that miss reach the database.
+"""
+import typing
+
+from sqlalchemy import func, null, select, union_all
+from strawberry.dataloader import DataLoader
+from strawberry.types import Info
+
+from .cache import MISSING, LRUCache, ability_cache, pokemon_detail_cache, pokemon_types_cache
+from .database import ReadSessionLocal
+from .models.pokemon import Ability, Cry, Pokemon, Type, pokemon_ability, pokemon_type
+from .read_model import current_read_model
+from .records import AbilityRecord, CryRecord, PokemonAbilityRecord, PokemonRecord, TypeRecord
+
+# Largest IN (...) list a single batch will issue
+MAX_BATCH_SIZE = 500
+
+POKEMON_COLUMNS = (
+    Pokemon.id,
+    Pokemon.name,
+    Pokemon.height,
+    Pokemon.weight,
+    Pokemon.image_url,
+)
+
+
+async def _load_pokemon(
+    key: str, column: typing.Any, values: typing.List[typing.Any]
+) -> typing.List[typing.Optional[PokemonRecord]]:
+    model = current_read_model()
+    if model is not None:
+        index = model.by_id if key == "id" else model.by_name
+        return [index.get(value) for value in values]
+
+    found: typing.Dict[typing.Any, PokemonRecord] = {}
+    missing = []
+    for value in values:
+        cached = pokemon_detail_cache.get((key, value))
+        if cached is MISSING:
+            missing.append(value)
+        else:
+            found[value] = cached
+
+    if missing:
+        generation = pokemon_detail_cache.generation
+        async with ReadSessionLocal() as session:
+            result = await session.execute(select(*POKEMON_COLUMNS).where(column.in_(missing)))
+            rows = result.all()
+
+        for row in rows:
+            record = PokemonRecord(*row)
+            found[getattr(record, key)] = record
+            # Cache under both keys so either lookup hits afterwards
+            pokemon_detail_cache.set(("id", record.id), record, generation)
+            pokemon_detail_cache.set(("name", record.name), record, generation)
+
+    return [found.get(value) for value in values]
+
+
+async def load_pokemon_by_id(ids: typing.List[int]) -> typing.List[typing.Optional[PokemonRecord]]:
+    return await _load_pokemon("id", Pokemon.id, ids)
+
+
+async def load_pokemon_by_name(names: typing.List[str]) -> typing.List[typing.Optional[PokemonRecord]]:
+    return await _load_pokemon("name", Pokemon.name, names)
+
+
+async def load_types_by_pokemon_id(ids: typing.List[int]) -> typing.List[typing.Sequence[TypeRecord]]:
+    model = current_read_model()
+    if model is not None:
+        return [model.types_of.get(pokemon_id, ()) for pokemon_id in ids]
+
+    found: typing.Dict[int, typing.Sequence[TypeRecord]] = {}
+    missing = []
+    for pokemon_id in ids:
+        cached = pokemon_types_cache.get(pokemon_id)
+        if cached is MISSING:
+            missing.append(pokemon_id)
+        else:
+            found[pokemon_id] = cached
+
+    if missing:
+        generation = pokemon_types_cache.generation
+        query = (
+            select(pokemon_type.c.pokemon_id, Type.id, Type.name)
+            .join(Type, Type.id == pokemon_type.c.type_id)
+            .where(pokemon_type.c.pokemon_id.in_(missing))
+            .order_by(pokemon_type.c.pokemon_id, Type.id)
+        )
+        async with ReadSessionLocal() as session:
+            rows = (await session.execute(query)).all()
+
+        grouped: typing.Dict[int, typing.List[TypeRecord]] = {pokemon_id: [] for pokemon_id in missing}
+        for pokemon_id, type_id, type_name in rows:
+            grouped[pokemon_id].append(TypeRecord(type_id, type_name))
+        for pokemon_id, types in grouped.items():
+            found[pokemon_id] = tuple(types)
+            pokemon_types_cache.set(pokemon_id, found[pokemon_id], generation)
+
+    return [found[pokemon_id] for pokemon_id in ids]
+
+
+async def _through_cache(
+    cache: LRUCache,
+    kind: str,
+    keys: typing.List[typing.Any],
+    fetch: typing.Callable[[typing.List[typing.Any]], typing.Awaitable[typing.Dict[typing.Any, typing.Any]]],
+    default: typing.Any = None,
+) -> typing.List[typing.Any]:
+    """Look ``keys`` up in ``cache`` under ``(kind, key)`` and ``fetch`` the
+    misses in one call; keys it returns nothing for get ``default``."""
+    found: typing.Dict[typing.Any, typing.Any] = {}
+    missing = []
+    for key in keys:
+        cached = cache.get((kind, key))
+        if cached is MISSING:
+            missing.append(key)
+        else:
+            found[key] = cached
+
+    if missing:
+        generation = cache.generation
+        fetched = await fetch(missing)
+        for key in missing:
+            found[key] = fetched.get(key, default)
+            cache.set((kind, key), found[key], generation)
+
+    return [found[key] for key in keys]
+
+
+AbilityData = typing.Tuple[typing.Sequence[PokemonAbilityRecord], typing.Optional[CryRecord]]
+
+
+async def _fetch_ability_data(ids: typing.List[int]) -> typing.Dict[int, AbilityData]:
+    # One statement for both tables: on a cold lookup each statement costs
+    # more than the rows it returns. Cry rows have no ability.
+    slots_query = (
+        select(
+            pokemon_ability.c.pokemon_id.label("pokemon_id"),
+            Ability.id.label("ability_id"),
+            Ability.name,
+            pokemon_ability.c.slot.label("slot"),
+            pokemon_ability.c.is_hidden,
+            null().label("latest"),
+            null().label("legacy"),
+        )
+        .join(Ability, Ability.id == pokemon_ability.c.ability_id)
+        .where(pokemon_ability.c.pokemon_id.in_(ids))
+    )
+    cries_query = select(Cry.pokemon_id, null(), null(), null(), null(), Cry.latest, Cry.legacy).where(
+        Cry.pokemon_id.in_(ids)
+    )
+    query = union_all(slots_query, cries_query).order_by("pokemon_id", "slot")
+    async with ReadSessionLocal() as session:
+        rows = (await session.execute(query)).all()
+
+    slots: typing.Dict[int, typing.List[PokemonAbilityRecord]] = {}
+    cries: typing.Dict[int, CryRecord] = {}
+    for pokemon_id, ability_id, name, slot, is_hidden, latest, legacy in rows:
+        if ability_id is None:
+            cries[pokemon_id] = CryRecord(latest, legacy)
+        else:
+            slots.setdefault(pokemon_id, []).append(PokemonAbilityRecord(AbilityRecord(ability_id, name), slot, is_hidden))
+    return {pokemon_id: (tuple(slots.get(pokemon_id, ())), cries.get(pokemon_id)) for pokemon_id in ids}
+
+
+async def load_ability_data_by_pokemon_id(ids: typing.List[int]) -> typing.List[AbilityData]:
+    """A Pokémon's ability slots and cry, loaded together so that selecting
+    both costs one statement."""
+    return await _through_cache(ability_cache, "data", ids, _fetch_ability_data, default=((), None))
+
+
+async def _fetch_abilities(names: typing.List[str]) -> typing.Dict[str, AbilityRecord]:
+    async with ReadSessionLocal() as session:
+        rows = (await session.execute(select(Ability.id, Ability.name).where(Ability.name.in_(names)))).all()
+    return {name: AbilityRecord(ability_id, name) for ability_id, name in rows}
+
+
+async def load_ability_by_name(names: typing.List[str]) -> typing.List[typing.Optional[AbilityRecord]]:
+    return await _through_cache(ability_cache, "name", names, _fetch_abilities)
+
+
+# A page of one ability's Pokémon: (ability_id, offset, limit)
+AbilityPage = typing.Tuple[int, int, int]
+
+
+async def _fetch_pokemon_with_abilities(pages: typing.List[AbilityPage]) -> typing.Dict[AbilityPage, typing.Sequence[PokemonRecord]]:
+    # Pages of one size and offset share a statement, numbering each ability's
+    # Pokémon so only the requested rows leave the database
+    by_window: typing.Dict[typing.Tuple[int, int], typing.List[int]] = {}
+    for ability_id, offset, limit in pages:
+        by_window.setdefault((offset, limit), []).append(ability_id)
+
+    pages_found: typing.Dict[AbilityPage, typing.Sequence[PokemonRecord]] = {}
+    async with ReadSessionLocal() as session:
+        for (offset, limit), ability_ids in by_window.items():
+            # Walks ix_pokemon_ability_ability_id_pokemon_id
+            numbered = (
+                select(
+                    pokemon_ability.c.ability_id,
+                    pokemon_ability.c.pokemon_id,
+                    func.row_number()
+                    .over(partition_by=pokemon_ability.c.ability_id, order_by=pokemon_ability.c.pokemon_id)
+                    .label("position"),
+                )
+                .where(pokemon_ability.c.ability_id.in_(ability_ids))
+                .subquery()
+            )
+            query = (
+                select(numbered.c.ability_id, *POKEMON_COLUMNS)
+                .join(Pokemon, Pokemon.id == numbered.c.pokemon_id)
+                .where(numbered.c.position > offset, numbered.c.position <= offset + limit)
+                .order_by(numbered.c.ability_id, numbered.c.position)
+            )
+            grouped: typing.Dict[int, typing.List[PokemonRecord]] = {}
+            for ability_id, *columns in (await session.execute(query)).all():
+                grouped.setdefault(ability_id, []).append(PokemonRecord(*columns))
+            for ability_id, records in grouped.items():
+                pages_found[(ability_id, offset, limit)] = tuple(records)
+    return pages_found
+
+
+async def load_pokemon_by_ability_id(pages: typing.List[AbilityPage]) -> typing.List[typing.Sequence[PokemonRecord]]:
+    return await _through_cache(ability_cache, "pokemon", pages, _fetch_pokemon_with_abilities, default=())
+
+
+class Loaders:
+    def __init__(self) -> None:
+        self.pokemon_by_id = DataLoader(load_fn=load_pokemon_by_id, max_batch_size=MAX_BATCH_SIZE)
+        self.pokemon_by_name = DataLoader(load_fn=load_pokemon_by_name, max_batch_size=MAX_BATCH_SIZE)
+        self.types_by_pokemon_id = DataLoader(load_fn=load_types_by_pokemon_id, max_batch_size=MAX_BATCH_SIZE)
+        # Its statement binds the ids twice
+        self.ability_data_by_pokemon_id = DataLoader(
+            load_fn=load_ability_data_by_pokemon_id, max_batch_size=MAX_BATCH_SIZE // 2
+        )
+        self.ability_by_name = DataLoader(load_fn=load_ability_by_name, max_batch_size=MAX_BATCH_SIZE)
+        self.pokemon_by_ability_id = DataLoader(load_fn=load_pokemon_by_ability_id, max_batch_size=MAX_BATCH_SIZE)
+
+
+class PokemonEvent(PokemonRecord):
+    """A Pokémon yielded by a subscription, with the loaders its fields are
+    resolved with. A subscription's context lives as long as its socket and
+    is shared by every operation on it, so each event brings its own."""
+
+    __slots__ = ("loaders",)
+
+    def __init__(self, record: PokemonRecord, loaders: Loaders):
+        super().__init__(record.id, record.name, record.height, record.weight, record.imageUrl)
+        self.loaders = loaders
+
+
+def get_loaders(info: Info) -> Loaders:
+    """The loaders of the current request, or subscription event.
+
+    Falls back to fresh, unshared loaders when the schema is executed without
+    a dict context (e.g. ``schema.execute`` in scripts).
+    """
+    # A subscription event is the root value its fields are resolved under
+    if isinstance(info.root_value, PokemonEvent):
+        return info.root_value.loaders
+    context = info.context
+    if isinstance(context, dict):
+        loaders = context.get("loaders")
+        if loaders is None:
+            loaders = context["loaders"] = Loaders()
+        return loaders
+    return Loaders()
@@ -1,20 +1,57 @@
-import os
+import typing
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from strawberry.fastapi import GraphQLRouter
-from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import images, read_model
+from .graphql_schema import get_context, schema
+from .database import dispose_engines, warm_engines
+from .metrics import render_metrics
+from .readiness import population
+from .router import PokemonGraphQLRouter
+from .startup import startup_timer
+from .workers import version_poller
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> typing.AsyncIterator[None]:
+    # Open the pools (and switch SQLite to WAL) before taking traffic, then
+    # seed an empty database from a snapshot if one is provided, or fetch
+    # whatever Pokémon aren't stored yet, in the background so the server
+    # starts answering right away; /readyz says when it's worth routing to
+    from .populate_db import ensure_populated
 
-from .graphql_schema import schema
-from .database import Base  # Remove engine from import to avoid conflicts
+    with startup_timer.phase("database"):
+        await warm_engines()
+    if read_model.READ_MODEL_ENABLED:
+        with startup_timer.phase("read_model"):
+            try:
+                await read_model.refresh_read_model()
+            except SQLAlchemyError as e:
+                # No schema yet; the populator's first write triggers a load
+                print(f"Read model not loaded at startup: {e}")
+    print(f"Startup: {startup_timer.summary()}")
+    # Other workers (or app.populate_db) may write; drop caches when they do
+    await version_poller.start()
+    population.start(ensure_populated)
+    try:
+        yield
+    finally:
+        await population.stop()
+        await version_poller.stop()
+        await images.close_images()
+        await read_model.close_read_model()
+        await dispose_engines()
 
-# Load environment variables
-load_dotenv()
 
 # Create FastAPI app
 app = FastAPI(
     title="Pokemon GraphQL API",
     description="A GraphQL API for Pokemon data",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Set up CORS - Ensure all origins are allowed including Vercel
@@ -31,106 +68,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# Set up GraphQL route
-graphql_app = GraphQLRouter(schema)
+# Set up GraphQL route; GET queries are served with ETag and Cache-Control
+graphql_app = PokemonGraphQLRouter(schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
 
+# Cached, resized Pokémon artwork
+app.include_router(images.router)
+
+startup_timer.record_since_start("import")
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Pokemon GraphQL API. Go to /graphql for the GraphQL playground."}
 
-@app.on_event("startup")
-async def startup_event():
-    # Create database tables if they don't exist and populate if empty
-    # Using synchronous approach to avoid greenlet issues
-    import threading
-    
-    def setup_db():
-        from sqlalchemy import create_engine, inspect
-        from sqlalchemy.orm import sessionmaker
-        import requests
-        
-        # Use synchronous SQLAlchemy to avoid greenlet issues
-        from .models.pokemon import Pokemon, Type
-        
-        # Database setup - Use synchronous SQLAlchemy
-        DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pokemon.db")
-        if DATABASE_URL.startswith("sqlite+aiosqlite:"):
-            DATABASE_URL = DATABASE_URL.replace("sqlite+aiosqlite:", "sqlite:")
-        
-        # Create engine and session
-        engine = create_engine(DATABASE_URL)
-        Session = sessionmaker(bind=engine)
-        
-        # Create tables if they don't exist
-        Base.metadata.create_all(engine)
-        
-        # Check if there are any Pokemon in the database
-        session = Session()
-        try:
-            pokemon_count = session.query(Pokemon).count()
-            if pokemon_count == 0:
-                print("No Pokemon found in database. Populating database with Pokemon data...")
-                
-                # Populate with more Pokemon (first 250 for a good variety)
-                pokemon_limit = 500  # Increased from 50 to 250
-                
-                # Fetch Pokemon list from PokeAPI
-                response = requests.get(f"https://pokeapi.co/api/v2/pokemon?limit={pokemon_limit}")
-                pokemon_list = response.json()["results"]
-                
-                print(f"Fetched {len(pokemon_list)} Pokemon. Now adding to database...")
-                
-                for i, pokemon_entry in enumerate(pokemon_list):
-                    print(f"Processing Pokemon {i+1}/{len(pokemon_list)}: {pokemon_entry['name']}")
-                    
-                    pokemon_url = pokemon_entry["url"]
-                    try:
-                        pokemon_data = requests.get(pokemon_url).json()
-                        
-                        # Extract Pokemon details
-                        pokemon = Pokemon(
-                            id=pokemon_data["id"],
-                            name=pokemon_data["name"],
-                            height=pokemon_data["height"],
-                            weight=pokemon_data["weight"],
-                            image_url=pokemon_data["sprites"]["other"]["official-artwork"]["front_default"]
-                        )
-                        
-                        session.add(pokemon)
-                        
-                        # Add types
-                        for type_data in pokemon_data["types"]:
-                            type_name = type_data["type"]["name"]
-                            # Check if type exists
-                            type_obj = session.query(Type).filter_by(name=type_name).first()
-                            
-                            if not type_obj:
-                                type_obj = Type(name=type_name)
-                                session.add(type_obj)
-                                session.flush()
-                            
-                            pokemon.types.append(type_obj)
-                        
-                        # Commit after each Pokemon
-                        session.commit()
-                        print(f"Added Pokemon: {pokemon.name} (ID: {pokemon.id})")
-                        
-                    except Exception as e:
-                        print(f"Error adding Pokemon {pokemon_entry['name']}: {e}")
-                        session.rollback()
-                
-                print("Finished populating database!")
-            else:
-                print(f"Database already has {pokemon_count} Pokemon.")
-        finally:
-            session.close()
-    
-    # Run database setup in a separate thread to not block the main event loop
-    db_thread = threading.Thread(target=setup_db)
-    db_thread.start()
-    
-    # Optional: Wait for the thread to complete if you want to ensure DB is ready before serving requests
-    # db_thread.join()
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz() -> typing.Dict[str, str]:
+    # Liveness only: the process is up and its event loop is responsive
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz() -> JSONResponse:
+    report = await population.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
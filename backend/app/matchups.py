@@ -0,0 +1,206 @@
+"""
+Type effectiveness: the damage multiplier chart and matchup rankings.
+
+The populator stores PokeAPI's damage relations in ``type_effectiveness``.
+``TypeChart`` expands them into a dense attacker × defender matrix (18×18 for
+the main series types), loaded once per dataset version.
+
+Ranking every Pokémon against a target doesn't score Pokémon one by one.
+Pokémon are grouped by their type combination, of which 18 types allow at
+most 171. Each combination is scored once against the target with whole
+matrix rows and columns, and the Pokémon are then read off the groups in
+score order.
+"""
+import heapq
+import itertools
+import typing
+from array import array
+
+from sqlalchemy import select
+
+from .cache import MISSING, dataset_cache
+from .database import ReadSessionLocal
+from .models.pokemon import Type, TypeEffectiveness, pokemon_type
+from .read_model import current_read_model
+
+# A Pokémon has one or two types
+MAX_DEFENDERS = 2
+
+# Most counters one query may ask for
+MAX_COUNTERS = 100
+
+# Floor for the damage a counter takes, so immunities rank above resistances
+# without dividing by zero
+MIN_DEFENSE = 0.125
+
+TypeCombo = typing.Tuple[int, ...]
+
+
+class TypeChart:
+    """``rows[a][d]`` is the multiplier attacking type ``a`` deals to
+    defending type ``d``, both by position in ``names``."""
+
+    __slots__ = ("names", "position", "index", "rows")
+
+    def __init__(
+        self,
+        types: typing.Sequence[typing.Tuple[int, str]],
+        multipliers: typing.Iterable[typing.Tuple[int, int, float]],
+    ):
+        self.names = tuple(name for _, name in types)
+        self.position = {type_id: index for index, (type_id, _) in enumerate(types)}
+        self.index = {name: index for index, name in enumerate(self.names)}
+        size = len(types)
+        rows = [array("d", [1.0]) * size for _ in range(size)]
+        for attacker_id, defender_id, multiplier in multipliers:
+            if attacker_id in self.position and defender_id in self.position:
+                rows[self.position[attacker_id]][self.position[defender_id]] = multiplier
+        self.rows = tuple(rows)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, names: typing.Iterable[str]) -> TypeCombo:
+        positions = []
+        for name in names:
+            if name not in self.index:
+                raise ValueError(f"Unknown type: {name}")
+            positions.append(self.index[name])
+        return tuple(positions)
+
+    def multiplier(self, attacker: int, defenders: TypeCombo) -> float:
+        row = self.rows[attacker]
+        result = 1.0
+        for defender in defenders:
+            result *= row[defender]
+        return result
+
+    def taken(self, defenders: TypeCombo) -> typing.List[float]:
+        """What every attacking type deals to ``defenders``: the product of
+        their columns."""
+        vector = [1.0] * len(self.rows)
+        for defender in defenders:
+            vector = [value * row[defender] for value, row in zip(vector, self.rows)]
+        return vector
+
+
+class TypeGroups:
+    """Pokémon grouped by type combination (type ids, in id order)."""
+
+    __slots__ = ("combo_of", "members")
+
+    def __init__(self, links: typing.Iterable[typing.Tuple[int, int]]):
+        types_of: typing.Dict[int, typing.List[int]] = {}
+        for pokemon_id, type_id in sorted(links):
+            types_of.setdefault(pokemon_id, []).append(type_id)
+        self.combo_of = {pokemon_id: tuple(type_ids) for pokemon_id, type_ids in types_of.items()}
+        members: typing.Dict[TypeCombo, array] = {}
+        for pokemon_id, combo in self.combo_of.items():
+            members.setdefault(combo, array("i")).append(pokemon_id)
+        self.members = members
+
+
+class Counter(typing.NamedTuple):
+    pokemon_id: int
+    score: float
+    # Best multiplier the counter's types deal to the target
+    offense: float
+    # Worst multiplier the target's types deal to the counter
+    defense: float
+
+
+async def get_type_chart() -> TypeChart:
+    cached = dataset_cache.get("type_chart")
+    if cached is not MISSING:
+        return typing.cast(TypeChart, cached)
+
+    generation = dataset_cache.generation
+    async with ReadSessionLocal() as session:
+        types = (await session.execute(select(Type.id, Type.name).order_by(Type.id))).all()
+        multipliers = (
+            await session.execute(
+                select(TypeEffectiveness.attacker_id, TypeEffectiveness.defender_id, TypeEffectiveness.multiplier)
+            )
+        ).all()
+    chart = TypeChart(
+        [(type_id, name) for type_id, name in types],
+        [(attacker, defender, multiplier) for attacker, defender, multiplier in multipliers],
+    )
+    dataset_cache.set("type_chart", chart, generation)
+    return chart
+
+
+async def get_type_groups() -> TypeGroups:
+    cached = dataset_cache.get("type_groups")
+    if cached is not MISSING:
+        return typing.cast(TypeGroups, cached)
+
+    generation = dataset_cache.generation
+    model = current_read_model()
+    links: typing.List[typing.Tuple[int, int]]
+    if model is not None:
+        links = [
+            (pokemon_id, type_record.id)
+            for pokemon_id, types in model.types_of.items()
+            for type_record in types
+        ]
+    else:
+        async with ReadSessionLocal() as session:
+            result = await session.execute(select(pokemon_type.c.pokemon_id, pokemon_type.c.type_id))
+            links = [(pokemon_id, type_id) for pokemon_id, type_id in result]
+    groups = TypeGroups(links)
+    dataset_cache.set("type_groups", groups, generation)
+    return groups
+
+
+async def type_matchup(attacker: str, defenders: typing.Sequence[str]) -> float:
+    if not 1 <= len(defenders) <= MAX_DEFENDERS:
+        raise ValueError(f"defenders must list 1 to {MAX_DEFENDERS} types")
+    chart = await get_type_chart()
+    (attacker_position,) = chart.lookup([attacker])
+    return chart.multiplier(attacker_position, chart.lookup(defenders))
+
+
+def rank_counters(chart: TypeChart, groups: TypeGroups, pokemon_id: int, limit: int) -> typing.List[Counter]:
+    """The ``limit`` Pokémon that fare best against ``pokemon_id``.
+
+    A counter scores the best multiplier among its own types against the
+    target, divided by the worst the target's types deal back to it. Ties
+    are broken by id.
+    """
+    target_types = groups.combo_of.get(pokemon_id)
+    if target_types is None or limit <= 0:
+        return []
+
+    def positions(combo: TypeCombo) -> TypeCombo:
+        # Types missing from the chart deal and take normal damage
+        return tuple(chart.position[type_id] for type_id in combo if type_id in chart.position)
+
+    target = positions(target_types)
+    taken = chart.taken(target)
+    scored = []
+    for combo, members in groups.members.items():
+        counter = positions(combo)
+        offense = max((taken[attacker] for attacker in counter), default=1.0)
+        defense = max((chart.multiplier(attacker, counter) for attacker in target), default=1.0)
+        scored.append((offense / max(defense, MIN_DEFENSE), offense, defense, members))
+    scored.sort(key=lambda entry: entry[0], reverse=True)
+
+    ranked: typing.List[Counter] = []
+    # Groups that tie are merged so their Pokémon come out in id order
+    for score, tied in itertools.groupby(scored, key=lambda entry: entry[0]):
+        streams = [
+            zip(members, itertools.repeat(offense), itertools.repeat(defense))
+            for _, offense, defense, members in tied
+        ]
+        for member, offense, defense in heapq.merge(*streams):
+            if member == pokemon_id:
+                continue
+            ranked.append(Counter(member, score, offense, defense))
+            if len(ranked) == limit:
+                return ranked
+    return ranked
+
+
+async def best_counters(pokemon_id: int, limit: int) -> typing.List[Counter]:
+    return rank_counters(await get_type_chart(), await get_type_groups(), pokemon_id, limit)
@@ -0,0 +1,301 @@
+"""
+Tracing and Prometheus metrics.
+
+``TracingExtension`` times parse, validate and execute for each GraphQL
+operation, times every resolver that awaits something (plain attribute
+fields are skipped, so they cost nothing), and counts the SQL statements each
+operation issued. ``render_metrics()`` renders those together with
+pool, cache and populator gauges in the Prometheus text format, served on
+``/metrics``.
+
+Only a ``GRAPHQL_TRACE_SAMPLE_RATE`` fraction of operations (default: all)
+get resolver and SQL detail; every operation is counted and timed.
+"""
+import contextvars
+import inspect
+import os
+import random
+import re
+import time
+import typing
+
+from sqlalchemy import event
+from strawberry.extensions import SchemaExtension
+
+from . import ingest
+from .readiness import population
+from .cache import cache_stats
+from .pubsub import topic_stats
+from .startup import startup_timer
+from .database import engines, on_engine_created
+
+TRACE_SAMPLE_RATE = float(os.getenv("GRAPHQL_TRACE_SAMPLE_RATE", "1.0"))
+
+# Seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+# Operation names come from clients; cap how many label values they can mint
+MAX_OPERATION_NAMES = 100
+
+LabelValues = typing.Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: typing.Sequence[str], values: typing.Sequence[typing.Any]) -> str:
+    if not names:
+        return ""
+    return "{%s}" % ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: typing.Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: typing.Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> typing.List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        # labels -> [count per bucket..., sum]
+        self.values: typing.Dict[LabelValues, typing.List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * len(self.buckets) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-1] += value
+
+    def render(self) -> typing.List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, series in sorted(self.values.items()):
+            cumulative: float = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    samples: typing.Iterable[typing.Tuple[typing.Sequence[typing.Any], float]],
+    labelnames: typing.Sequence[str] = (),
+) -> typing.List[str]:
+    """Lines for a gauge whose values are read at scrape time."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+    return lines
+
+
+operations_total = Counter(
+    "graphql_operations_total", "GraphQL operations executed.", ("operation", "status")
+)
+operation_seconds = Histogram(
+    "graphql_operation_duration_seconds", "Time to run a GraphQL operation.", ("operation",)
+)
+phase_seconds = Histogram(
+    "graphql_phase_duration_seconds", "Time spent parsing, validating and executing.", ("phase",)
+)
+resolver_seconds = Histogram(
+    "graphql_resolver_duration_seconds", "Time spent in asynchronous resolvers.", ("field",)
+)
+sql_queries = Histogram(
+    "graphql_sql_queries", "SQL statements issued per sampled operation.", ("operation",), COUNT_BUCKETS
+)
+sql_statements_total = Counter("sql_statements_total", "SQL statements executed.", ("engine",))
+
+COLLECTORS: typing.List[typing.Union[Counter, Histogram]] = [
+    operations_total,
+    operation_seconds,
+    phase_seconds,
+    resolver_seconds,
+    sql_queries,
+    sql_statements_total,
+]
+
+
+class QueryCounter:
+    __slots__ = ("queries",)
+
+    def __init__(self) -> None:
+        self.queries = 0
+
+
+# The sampled operation the current task is working for. DataLoader batches
+# run in tasks spawned during the operation, so they inherit it.
+_current_counter: contextvars.ContextVar[typing.Optional[QueryCounter]] = contextvars.ContextVar(
+    "sql_query_counter", default=None
+)
+
+
+@on_engine_created
+def _instrument_engine(engine: typing.Any, label: str) -> None:
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def count_statement(
+        conn: typing.Any,
+        cursor: typing.Any,
+        statement: str,
+        parameters: typing.Any,
+        context: typing.Any,
+        executemany: bool,
+    ) -> None:
+        sql_statements_total.inc(label)
+        counter = _current_counter.get()
+        if counter is None:
+            return
+        counter.queries += 1
+
+
+_OPERATION_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+_operation_names: typing.Set[str] = set()
+
+
+def operation_label(name: typing.Optional[str]) -> str:
+    if not name or not _OPERATION_NAME.match(name):
+        return "anonymous"
+    if name not in _operation_names:
+        if len(_operation_names) >= MAX_OPERATION_NAMES:
+            return "other"
+        _operation_names.add(name)
+    return name
+
+
+class TracingExtension(SchemaExtension):
+    def on_operation(self) -> typing.Iterator[None]:
+        self.sampled = TRACE_SAMPLE_RATE >= 1 or random.random() < TRACE_SAMPLE_RATE
+        counter = QueryCounter() if self.sampled else None
+        token = _current_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_counter.reset(token)
+            elapsed = time.perf_counter() - started
+            context = self.execution_context
+            operation = operation_label(context.operation_name)
+            failed = context.errors or (context.result is not None and context.result.errors)
+            operations_total.inc(operation, "error" if failed else "ok")
+            operation_seconds.observe(elapsed, operation)
+            if counter is not None:
+                sql_queries.observe(counter.queries, operation)
+
+    def _phase(self, phase: str) -> typing.Iterator[None]:
+        started = time.perf_counter()
+        yield
+        phase_seconds.observe(time.perf_counter() - started, phase)
+
+    def on_parse(self) -> typing.Iterator[None]:
+        yield from self._phase("parse")
+
+    def on_validate(self) -> typing.Iterator[None]:
+        yield from self._phase("validate")
+
+    def on_execute(self) -> typing.Iterator[None]:
+        yield from self._phase("execute")
+
+    def resolve(
+        self, _next: typing.Callable[..., typing.Any], root: typing.Any, info: typing.Any, *args: typing.Any, **kwargs: typing.Any
+    ) -> typing.Any:
+        result = _next(root, info, *args, **kwargs)
+        if self.sampled and inspect.isawaitable(result):
+            return self._timed(result, f"{info.parent_type.name}.{info.field_name}")
+        return result
+
+    async def _timed(self, awaitable: typing.Awaitable[typing.Any], field: str) -> typing.Any:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            resolver_seconds.observe(time.perf_counter() - started, field)
+
+
+def _pool_samples() -> typing.Iterator[typing.Tuple[typing.Tuple[str, str], float]]:
+    # Engines not created yet have no connections to report
+    for name, engine in engines().items():
+        pool = engine.pool
+        # Only queue pools keep these counts; static pools have nothing to report
+        for state, method in (("checked_out", "checkedout"), ("checked_in", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, method):
+                yield (name, state), getattr(pool, method)()
+
+
+def render_metrics() -> str:
+    lines: typing.List[str] = []
+    for collector in COLLECTORS:
+        lines.extend(collector.render())
+
+    lines.extend(gauge("db_pool_connections", "Connections per pool and state.", _pool_samples(), ("pool", "state")))
+
+    caches = cache_stats()
+    for key, kind, documentation in (
+        ("hits", "counter", "Cache hits."),
+        ("misses", "counter", "Cache misses."),
+        ("evictions", "counter", "Entries evicted to stay under maxsize."),
+    ):
+        name = f"cache_{key}_total"
+        lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"])
+        lines.extend(f'{name}{{cache="{stats["name"]}"}} {stats[key]}' for stats in caches)
+    lines.extend(gauge("cache_entries", "Entries held per cache.", (((s["name"],), s["size"]) for s in caches), ("cache",)))
+    lines.extend(gauge("cache_hit_ratio", "Hits over lookups per cache.", (((s["name"],), s["hit_rate"]) for s in caches), ("cache",)))
+
+    topics = topic_stats()
+    lines.extend(gauge("subscription_subscribers", "Open subscriptions per topic.", (((t["name"],), t["subscribers"]) for t in topics), ("topic",)))
+    for key, documentation in (("published", "Events published."), ("dropped", "Events dropped from full subscriber buffers.")):
+        name = f"subscription_events_{key}_total"
+        lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} counter"])
+        lines.extend(f'{name}{{topic="{t["name"]}"}} {t[key]}' for t in topics)
+
+    states = ("idle", "running", "done", "failed", "cancelled")
+    samples = [((state,), int(population.state == state)) for state in states]
+    lines.extend(gauge("population_state", "1 for the startup population task's current state.", samples, ("state",)))
+    phases = [((phase,), seconds) for phase, seconds in startup_timer.phases.items()]
+    lines.extend(gauge("startup_phase_seconds", "Seconds spent in each startup phase.", phases, ("phase",)))
+    if population.ready_after is not None:
+        lines.extend(gauge("startup_ready_seconds", "Seconds from startup until the instance was ready.", [((), population.ready_after)]))
+
+    stats = ingest.latest_stats
+    if stats is not None:
+        fields = ("fetched", "inserted", "updated", "unchanged", "skipped", "failed", "retries")
+        samples = [((field,), getattr(stats, field)) for field in fields]
+        lines.extend(gauge("populator_pokemon", "Pokemon handled by the latest populator run.", samples, ("result",)))
+        lines.extend(gauge("populator_elapsed_seconds", "Duration of the latest populator run.", [((), stats.elapsed)]))
+        lines.extend(gauge("populator_records_per_second", "Throughput of the latest populator run.", [((), stats.records_per_second)]))
+    return "\n".join(lines) + "\n"
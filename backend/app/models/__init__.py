@@ -1 +1,2 @@
-from .pokemon import Pokemon, Type
+from .pokemon import Pokemon, Type, TypeEffectiveness, Ability, Cry, PokemonSource, Species
+from .dataset import DatasetVersion
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, DateTime, Integer
+from app.database import Base
+
+
+class DatasetVersion(Base):
+    """A single row counting writes to the Pokémon dataset. Writers bump it
+    in the same transaction as their changes; HTTP caching keys on it."""
+    __tablename__ = "dataset_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
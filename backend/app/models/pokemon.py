@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey, JSON
+from sqlalchemy import Boolean, Column, Float, Integer, String, Table, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -8,6 +8,20 @@ pokemon_type = Table(
     Base.metadata,
     Column("pokemon_id", Integer, ForeignKey("pokemons.id"), primary_key=True),
     Column("type_id", Integer, ForeignKey("type.id"), primary_key=True),
+    # The primary key serves pokemon -> types; this serves type -> pokemons
+    Index("ix_pokemon_type_type_id_pokemon_id", "type_id", "pokemon_id"),
+)
+
+# A Pokémon's abilities, in PokeAPI's slot order
+pokemon_ability = Table(
+    "pokemon_ability",
+    Base.metadata,
+    Column("pokemon_id", Integer, ForeignKey("pokemons.id"), primary_key=True),
+    Column("ability_id", Integer, ForeignKey("ability.id"), primary_key=True),
+    Column("slot", Integer, nullable=False),
+    Column("is_hidden", Boolean, nullable=False, default=False),
+    # Serves ability -> pokemons, as for types
+    Index("ix_pokemon_ability_ability_id_pokemon_id", "ability_id", "pokemon_id"),
 )
 
 class Type(Base):
@@ -16,15 +30,85 @@ class Type(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, index=True)
 
+class TypeEffectiveness(Base):
+    """Damage multiplier of an attacking type against a defending one. Only
+    multipliers other than 1 are stored."""
+    __tablename__ = "type_effectiveness"
+
+    attacker_id = Column(Integer, ForeignKey("type.id"), primary_key=True)
+    defender_id = Column(Integer, ForeignKey("type.id"), primary_key=True)
+    multiplier = Column(Float, nullable=False)
+
 class Pokemon(Base):
     __tablename__ = "pokemons"
     
     id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
-    height = Column(Integer)
-    weight = Column(Integer)
+    height = Column(Integer, index=True)
+    weight = Column(Integer, index=True)
     image_url = Column(String)
-    abilities = Column(JSON)
-    cries = Column(String)
-    
+
     types = relationship("Type", secondary=pokemon_type, backref="pokemon")
+    abilities = relationship("Ability", secondary=pokemon_ability, backref="pokemon")
+
+
+class Ability(Base):
+    __tablename__ = "ability"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, index=True)
+
+
+class Cry(Base):
+    """A Pokémon's cry recordings; ``legacy`` is only set for older Pokémon."""
+    __tablename__ = "cry"
+
+    pokemon_id = Column(Integer, ForeignKey("pokemons.id"), primary_key=True)
+    latest = Column(String, nullable=True)
+    legacy = Column(String, nullable=True)
+
+
+# Every pair of species where the first evolves into the second, directly or
+# through others, with how many evolutions apart they are
+evolution_closure = Table(
+    "evolution_closure",
+    Base.metadata,
+    Column("ancestor_id", Integer, ForeignKey("species.id"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("species.id"), primary_key=True),
+    Column("distance", Integer, nullable=False),
+    # The primary key serves species -> later stages; this serves earlier ones
+    Index("ix_evolution_closure_descendant_id_ancestor_id", "descendant_id", "ancestor_id"),
+)
+
+
+class Species(Base):
+    """A species in its evolution chain. ``position`` orders a chain depth
+    first and ``stage`` counts evolutions from its base species. The trigger,
+    level and item say how the species is reached from ``evolves_from_id``.
+    A species shares its id with its default Pokémon."""
+    __tablename__ = "species"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, index=True)
+    chain_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    stage = Column(Integer, nullable=False)
+    evolves_from_id = Column(Integer, ForeignKey("species.id"), nullable=True)
+    trigger = Column(String, nullable=True)
+    min_level = Column(Integer, nullable=True)
+    item = Column(String, nullable=True)
+
+    # A whole chain, in order, is one range of this index
+    __table_args__ = (Index("ix_species_chain_id_position", "chain_id", "position"),)
+
+
+class PokemonSource(Base):
+    """Upstream bookkeeping for a stored Pokémon, written in the same
+    transaction as its row so it doubles as the populator's checkpoint."""
+    __tablename__ = "pokemon_source"
+
+    pokemon_id = Column(Integer, ForeignKey("pokemons.id"), primary_key=True)
+    url = Column(String)
+    etag = Column(String, nullable=True)
+    content_hash = Column(String)
+    fetched_at = Column(DateTime)
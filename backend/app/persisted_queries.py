@@ -0,0 +1,113 @@
+"""
+Automatic persisted queries (APQ), as spoken by Apollo Client's persisted
+query link.
+
+Clients send ``extensions.persistedQuery.sha256Hash`` instead of the query
+text. An unknown hash is answered with ``PersistedQueryNotFound``; the client
+then retries once with both hash and text, and the server remembers the pair
+so later requests only carry the hash. Combined with the schema's parser and
+validation caches, a repeated operation costs neither upload nor parse.
+
+Setting ``GRAPHQL_PERSISTED_QUERIES_ONLY`` turns the manifest at
+``GRAPHQL_PERSISTED_QUERIES_PATH`` into an allow-list: only its operations
+are executed, whether sent by hash or as text.
+"""
+import hashlib
+import json
+import os
+import typing
+
+from .cache import MISSING, LRUCache
+
+PERSISTED_QUERY_CACHE_SIZE = int(os.getenv("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", "1024"))
+PERSISTED_QUERIES_PATH = os.getenv("GRAPHQL_PERSISTED_QUERIES_PATH")
+PERSISTED_QUERIES_ONLY = os.getenv("GRAPHQL_PERSISTED_QUERIES_ONLY", "").lower() in ("1", "true", "yes")
+
+
+class PersistedQueryError(Exception):
+    """A persisted query request that can't be served; ``code`` is reported
+    in the error's extensions, where APQ clients look for it."""
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def load_manifest(path: str) -> typing.Dict[str, str]:
+    """Read an allow-list: either an Apollo persisted query manifest
+    (``{"operations": [{"body": ...}, ...]}``) or a ``{hash: query}`` map."""
+    with open(path) as file:
+        data = json.load(file)
+
+    if isinstance(data, dict) and "operations" in data:
+        queries = [operation["body"] for operation in data["operations"]]
+        return {query_hash(query): query for query in queries}
+
+    manifest = {}
+    for sha, query in data.items():
+        if query_hash(query) != sha:
+            raise ValueError(f"Persisted query manifest {path}: hash {sha} does not match its query")
+        manifest[sha] = query
+    return manifest
+
+
+class PersistedQueryStore:
+    def __init__(
+        self,
+        allowed: typing.Optional[typing.Mapping[str, str]] = None,
+        allow_list_only: bool = False,
+        maxsize: int = PERSISTED_QUERY_CACHE_SIZE,
+    ):
+        self.allowed = dict(allowed or {})
+        self.allow_list_only = allow_list_only
+        # Queries registered by clients; they don't depend on the dataset
+        self.registered = LRUCache("persisted_queries", maxsize=maxsize, invalidate=False)
+
+    @classmethod
+    def from_env(cls) -> "PersistedQueryStore":
+        allowed = load_manifest(PERSISTED_QUERIES_PATH) if PERSISTED_QUERIES_PATH else None
+        return cls(allowed, allow_list_only=PERSISTED_QUERIES_ONLY)
+
+    def lookup(self, sha: str) -> typing.Optional[str]:
+        if sha in self.allowed:
+            return self.allowed[sha]
+        if self.allow_list_only:
+            return None
+        query = self.registered.get(sha)
+        return None if query is MISSING else query
+
+    def resolve(
+        self, query: typing.Optional[str], extensions: typing.Optional[typing.Mapping[str, typing.Any]]
+    ) -> typing.Optional[str]:
+        """The query text to execute for a request's ``query`` and
+        ``extensions``; raises ``PersistedQueryError`` when there is none."""
+        persisted = (extensions or {}).get("persistedQuery")
+        if not persisted:
+            if query and self.allow_list_only and query_hash(query) not in self.allowed:
+                raise PersistedQueryError("Operation is not in the allow-list", "OPERATION_NOT_ALLOWED")
+            return query
+
+        if not isinstance(persisted, dict) or persisted.get("version") != 1:
+            raise PersistedQueryError("PersistedQueryNotSupported", "PERSISTED_QUERY_NOT_SUPPORTED")
+        sha = persisted.get("sha256Hash")
+        if not isinstance(sha, str):
+            raise PersistedQueryError("Missing sha256Hash", "BAD_USER_INPUT")
+
+        if not query:
+            known = self.lookup(sha)
+            if known is None:
+                raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+            return known
+
+        if query_hash(query) != sha:
+            raise PersistedQueryError("provided sha does not match query", "INVALID_PERSISTED_QUERY")
+        if sha not in self.allowed:
+            if self.allow_list_only:
+                raise PersistedQueryError("Operation is not in the allow-list", "OPERATION_NOT_ALLOWED")
+            self.registered.set(sha, query)
+        return query
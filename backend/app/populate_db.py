@@ -1,78 +1,126 @@
-import requests
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+"""
+Single entry point for populating the database with PokeAPI data.
+
+Run this from the backend directory with:
+
+    python -m app.populate_db [--limit 500] [--refresh] [--no-snapshot] [--prewarm-images thumb,small]
+
+An empty database is first seeded from a snapshot (see ``app.snapshot``)
+when one has been provided; none is committed to the repository. Population
+is incremental: Pokémon already stored are skipped and an interrupted run
+resumes from its last committed batch. ``--refresh`` revalidates stored
+Pokémon and rewrites only the ones that changed upstream.
+``--prewarm-images`` then fills the image cache (see ``app.images``) at the
+given sizes.
+"""
+import argparse
+import asyncio
 import os
-from dotenv import load_dotenv
-
-# Use absolute imports
-from app.models.pokemon import Pokemon, Type
-from app.database import Base
-
-load_dotenv()
-
-DATABASE_URL = "sqlite:///./pokemon.db"
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-
-# PokeAPI URL
-POKE_API_URL = "https://pokeapi.co/api/v2/"
-
-def init_db():
-    Base.metadata.drop_all(engine)
-    Base.metadata.create_all(engine)
-
-def get_or_create_type(session, type_name: str) -> Type:
-    type_obj = session.query(Type).filter(Type.name == type_name).first()
-    
-    if not type_obj:
-        type_obj = Type(name=type_name)
-        session.add(type_obj)
-        session.commit()
-        
-    return type_obj
-
-def populate_pokemon(limit: int = 50):
-    init_db()
-    
-    # Fetch Pokemon list
-    response = requests.get(f"{POKE_API_URL}pokemon?limit={limit}")
-    pokemon_list = response.json()["results"]
-    
-    session = Session()
-    try:
-        for pokemon_entry in pokemon_list:
-            pokemon_url = pokemon_entry["url"]
-            pokemon_data = requests.get(pokemon_url).json()
-            
-            # Extract abilities
-            abilities = [ability["ability"]["name"] for ability in pokemon_data["abilities"]]
-            
-            # Get cry URL
-            cry_url = f"https://play.pokemonshowdown.com/audio/cries/{pokemon_data['name'].lower()}.ogg"
-            
-            # Extract Pokemon details
-            pokemon = Pokemon(
-                id=pokemon_data["id"],
-                name=pokemon_data["name"],
-                height=pokemon_data["height"],
-                weight=pokemon_data["weight"],
-                image_url=pokemon_data["sprites"]["other"]["official-artwork"]["front_default"],
-                abilities=abilities,
-                cries=cry_url
-            )
-            
-            session.add(pokemon)
-            
-            # Add types
-            for type_data in pokemon_data["types"]:
-                type_name = type_data["type"]["name"]
-                type_obj = get_or_create_type(session, type_name)
-                pokemon.types.append(type_obj)
-            
-            session.commit()
-            print(f"Added Pokemon: {pokemon.name} with abilities: {abilities}")
-    finally:
-        session.close()
+import typing
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from . import images
+from .database import create_schema, get_engine
+from .ingest import POKE_API_URL, IngestStats, PokemonIngester
+from .snapshot import DEFAULT_SNAPSHOT_PATH, seed_from_snapshot
+from .workers import population_lock
+
+# 0 turns fetching from PokeAPI off, e.g. for a database seeded by other means
+DEFAULT_LIMIT = int(os.getenv("POKEMON_LIMIT", "500"))
+# Fetch from PokeAPI what a seeded snapshot lacks (the type chart or evolution
+# chains of an older one). Off, seeding never touches the network.
+COMPLETE_SNAPSHOT = os.getenv("POKEMON_SNAPSHOT_COMPLETE", "").lower() in ("1", "true", "yes")
+
+
+async def init_db(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+
+async def populate_pokemon(
+    limit: int = DEFAULT_LIMIT,
+    refresh: bool = False,
+    engine: typing.Optional[AsyncEngine] = None,
+    base_url: str = POKE_API_URL,
+    **ingester_options: typing.Any,
+) -> IngestStats:
+    engine = engine or get_engine()
+    await init_db(engine)
+    if limit <= 0:
+        return IngestStats()
+
+    ingester_options.setdefault("concurrency", int(os.getenv("POKEMON_INGEST_CONCURRENCY", "16")))
+    ingester_options.setdefault("batch_size", int(os.getenv("POKEMON_INGEST_BATCH_SIZE", "50")))
+    ingester = PokemonIngester(engine, base_url=base_url, **ingester_options)
+    stats = await ingester.run(limit=limit, refresh=refresh)
+    print(f"Finished populating database: {stats}")
+    return stats
+
+
+async def ensure_populated(
+    limit: int = DEFAULT_LIMIT,
+    engine: typing.Optional[AsyncEngine] = None,
+    base_url: str = POKE_API_URL,
+    snapshot_path: str = DEFAULT_SNAPSHOT_PATH,
+    complete_snapshot: bool = COMPLETE_SNAPSHOT,
+) -> typing.Optional[IngestStats]:
+    """Seed an empty database from the snapshot, if provided, or fetch from
+    PokeAPI, then prewarm the image cache in the background if configured.
+
+    Seeding is offline. With ``complete_snapshot``, a snapshot older than the
+    dataset it seeds (e.g. one without the type chart or evolution chains) is
+    then completed from PokeAPI; its Pokémon aren't fetched again.
+
+    Runs under the population lock. With several workers, the first one
+    populates and the rest wait, then find nothing left to do.
+    """
+    async with population_lock():
+        engine = engine or get_engine()
+        if await seed_from_snapshot(snapshot_path, engine):
+            if complete_snapshot:
+                await PokemonIngester(engine, base_url=base_url).complete()
+            stats = None
+        else:
+            stats = await populate_pokemon(limit=limit, engine=engine, base_url=base_url)
+    images.start_prewarm()
+    return stats
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Populate the Pokemon database from PokeAPI.")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="number of Pokemon to store")
+    parser.add_argument(
+        "--refresh", action="store_true", help="revalidate stored Pokemon and rewrite the ones that changed"
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true", help="don't seed an empty database from the snapshot first"
+    )
+    parser.add_argument(
+        "--prewarm-images",
+        metavar="SIZES",
+        type=images.parse_sizes,
+        default=[],
+        help="comma separated image sizes (or 'all') to fetch and cache afterwards",
+    )
+    args = parser.parse_args(argv)
+
+    async def run() -> None:
+        # Never alongside a running server's own population
+        async with population_lock():
+            # Seeding first leaves only the Pokémon the snapshot lacks to fetch
+            if not args.no_snapshot:
+                await seed_from_snapshot()
+            await populate_pokemon(limit=args.limit, refresh=args.refresh)
+        if args.prewarm_images:
+            try:
+                await images.prewarm(args.prewarm_images)
+            finally:
+                await images.store.close()
+
+    print("Starting to populate the database with Pokemon data...")
+    asyncio.run(run())
+
 
 if __name__ == "__main__":
-    populate_pokemon() 
\ No newline at end of file
+    main()
@@ -0,0 +1,59 @@
+"""
+Column projection driven by the GraphQL selection set.
+
+List resolvers look at which ``PokemonType`` fields the operation actually
+selects and read only those columns, so a grid asking for ``id``, ``name``
+and ``imageUrl`` never loads ``height`` or ``weight``.
+"""
+import typing
+
+from strawberry.types import Info
+from strawberry.types.nodes import FragmentSpread, InlineFragment, SelectedField
+
+from .models.pokemon import Pokemon
+
+# GraphQL field name -> column, labelled with the attribute PokemonRecord uses
+FIELD_COLUMNS = {
+    "id": Pokemon.id,
+    "name": Pokemon.name,
+    "height": Pokemon.height,
+    "weight": Pokemon.weight,
+    "imageUrl": Pokemon.image_url.label("imageUrl"),
+}
+
+
+def _fields(selections: typing.Iterable[typing.Any]) -> typing.Iterator[SelectedField]:
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        elif isinstance(selection, (FragmentSpread, InlineFragment)):
+            yield from _fields(selection.selections)
+
+
+def selected_field_names(info: Info, *path: str) -> typing.Set[str]:
+    """Names of the fields selected below ``path`` of the current field.
+
+    ``selected_field_names(info, "items")`` on ``pokemonsPage`` returns what
+    was asked for on each item, with fragments flattened.
+    """
+    selections: typing.List[typing.Any] = [
+        selection for field in _fields(info.selected_fields) for selection in field.selections
+    ]
+    for name in path:
+        selections = [
+            selection
+            for field in _fields(selections)
+            if field.name == name
+            for selection in field.selections
+        ]
+    return {field.name for field in _fields(selections)}
+
+
+def pokemon_columns(field_names: typing.Iterable[str]) -> typing.List[typing.Any]:
+    """Columns needed to resolve ``field_names``; ``id`` is always included
+    because cursors and the ``types`` resolver key on it."""
+    columns = [FIELD_COLUMNS["id"]]
+    columns.extend(
+        column for name, column in FIELD_COLUMNS.items() if name != "id" and name in field_names
+    )
+    return columns
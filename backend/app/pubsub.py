@@ -0,0 +1,114 @@
+"""
+In-process publish/subscribe for GraphQL subscriptions.
+
+Publishing never waits: each subscriber has its own bounded buffer, and when
+a slow subscriber's buffer is full its oldest event is dropped (and counted)
+to make room. An idle subscriber is a deque and, while it waits, one future;
+there is no task per subscriber, so thousands of them cost little more than
+their WebSocket connections.
+
+Events only reach subscribers in this process. With several workers, each
+publishes what its own populator does.
+"""
+import asyncio
+import collections
+import typing
+
+# Events a subscriber may fall behind by before the oldest are dropped
+DEFAULT_BUFFER_SIZE = 100
+
+
+class Subscription:
+    """An async iterator over the events published to a topic after it was
+    opened. Close it, or leave its ``async with`` block, to unsubscribe."""
+
+    __slots__ = ("topic", "events", "waiter", "closed")
+
+    def __init__(self, topic: "Topic", maxsize: int):
+        self.topic = topic
+        self.events: typing.Deque[typing.Any] = collections.deque(maxlen=max(1, maxsize))
+        self.waiter: typing.Optional[asyncio.Future] = None
+        self.closed = False
+
+    def deliver(self, event: typing.Any) -> None:
+        if len(self.events) == self.events.maxlen:
+            # The deque drops the oldest event itself
+            self.topic.dropped += 1
+        self.events.append(event)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> typing.Any:
+        while not self.events:
+            if self.closed:
+                raise StopAsyncIteration
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        return self.events.popleft()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.topic.subscribers.discard(self)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc: typing.Any) -> None:
+        self.close()
+
+
+class Topic:
+    def __init__(self, name: str):
+        self.name = name
+        self.subscribers: typing.Set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, maxsize: int = DEFAULT_BUFFER_SIZE) -> Subscription:
+        subscription = Subscription(self, maxsize)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def publish(self, event: typing.Any) -> None:
+        self.published += 1
+        for subscription in self.subscribers:
+            subscription.deliver(event)
+
+
+_topics: typing.Dict[str, Topic] = {}
+
+
+def topic(name: str) -> Topic:
+    if name not in _topics:
+        _topics[name] = Topic(name)
+    return _topics[name]
+
+
+def topic_stats() -> typing.List[typing.Dict[str, typing.Any]]:
+    return [
+        {
+            "name": t.name,
+            "subscribers": len(t.subscribers),
+            "published": t.published,
+            "dropped": t.dropped,
+        }
+        for t in _topics.values()
+    ]
+
+
+# The populator's progress: the IngestStats of the running ingestion
+population_progress = topic("population_progress")
+# Ids of Pokémon the populator has just inserted
+pokemon_added = topic("pokemon_added")
+# The dataset version after each write
+dataset_version_changed = topic("dataset_version_changed")
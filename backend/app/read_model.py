@@ -0,0 +1,201 @@
+"""
+An optional, fully materialized in-memory copy of the dataset.
+
+With ``POKEMON_READ_MODEL`` set, the ``pokemons``, ``type`` and
+``pokemon_type`` tables are loaded into an immutable ``ReadModel`` at startup,
+and list, lookup, type and search resolvers answer from it without touching
+the database. Abilities and cries are still read through the loaders' caches.
+
+Any write (``invalidate_caches()``) retires the current model at once, so
+resolvers fall back to SQL, and rebuilds it in the background. The new model
+replaces the old one with a single assignment, so readers see either a
+complete model or none; one built while another write landed is discarded
+and rebuilt.
+"""
+import asyncio
+import bisect
+import os
+import time
+import typing
+from array import array
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .cache import on_invalidate
+from .database import get_read_engine
+from .models.dataset import DatasetVersion
+from .models.pokemon import Pokemon, Type, pokemon_type
+from .records import PokemonRecord, TypeRecord
+
+if typing.TYPE_CHECKING:
+    # search.py imports this module
+    from .search import TrigramIndex
+
+READ_MODEL_ENABLED = os.getenv("POKEMON_READ_MODEL", "").lower() in ("1", "true", "yes")
+
+# Attempts at a load that no write raced with
+MAX_LOAD_ATTEMPTS = 3
+
+
+def _bitset(positions: typing.Iterable[int], size: int) -> int:
+    # Setting bits on an int one by one copies it each time; set them in a
+    # buffer and convert once
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class ReadModel:
+    """Every Pokémon and type, with the indexes the resolvers need.
+
+    ``records`` and ``ids`` are ordered by id, and a Pokémon's position in
+    them is its bit in ``type_bits``: the Pokémon of a type are an int
+    bitset, so "any of these types" is an OR and "all of them" an AND.
+    """
+
+    __slots__ = ("version", "records", "ids", "by_id", "by_name", "types_of", "type_bits", "name_index")
+
+    def __init__(
+        self,
+        version: int,
+        records: typing.Sequence[PokemonRecord],
+        types: typing.Iterable[TypeRecord],
+        links: typing.Iterable[typing.Tuple[int, int]],
+    ):
+        self.version = version
+        self.records = tuple(sorted(records, key=lambda record: record.id))
+        self.ids = array("i", (record.id for record in self.records))
+        self.by_id = {record.id: record for record in self.records}
+        self.by_name = {record.name: record for record in self.records}
+
+        types_by_id = {type_record.id: type_record for type_record in types}
+        position = {pokemon_id: index for index, pokemon_id in enumerate(self.ids)}
+        types_of: typing.Dict[int, typing.List[TypeRecord]] = {}
+        positions_of: typing.Dict[str, typing.List[int]] = {}
+        for pokemon_id, type_id in sorted(links):
+            if pokemon_id not in position or type_id not in types_by_id:
+                continue
+            type_record = types_by_id[type_id]
+            types_of.setdefault(pokemon_id, []).append(type_record)
+            positions_of.setdefault(type_record.name, []).append(position[pokemon_id])
+        self.types_of = {pokemon_id: tuple(found) for pokemon_id, found in types_of.items()}
+        self.type_bits = {name: _bitset(found, len(self.ids)) for name, found in positions_of.items()}
+        # Built by the first fuzzy search (see search.py); derived, not state
+        self.name_index: typing.Optional["TrigramIndex"] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def after(self, after_id: typing.Optional[int], limit: int, inclusive: bool = False) -> typing.List[PokemonRecord]:
+        """Up to ``limit`` Pokémon following ``after_id``, like a keyset page."""
+        if limit <= 0:
+            return []
+        if after_id is None:
+            start = 0
+        elif inclusive:
+            start = bisect.bisect_left(self.ids, after_id)
+        else:
+            start = bisect.bisect_right(self.ids, after_id)
+        return list(self.records[start:start + limit])
+
+    def positions(self, bitset: int) -> typing.List[int]:
+        # bin() is linear in the bitset's size; shifting bit by bit is quadratic
+        return [index for index, bit in enumerate(reversed(bin(bitset)[2:])) if bit == "1"]
+
+
+_model: typing.Optional[ReadModel] = None
+# Bumped by every write, so a load that raced with one isn't installed
+_generation = 0
+_reload_task: typing.Optional[asyncio.Task] = None
+
+
+def current_read_model() -> typing.Optional[ReadModel]:
+    """The model to answer from, or None to query the database."""
+    return _model if READ_MODEL_ENABLED else None
+
+
+async def build_read_model(engine: typing.Optional[AsyncEngine] = None) -> ReadModel:
+    """Load the dataset into a new ``ReadModel``.
+
+    SELECTs on one SQLite connection don't share a snapshot, so the load is
+    repeated if the dataset version moved while it ran.
+    """
+    engine = engine or get_read_engine()
+    for _ in range(MAX_LOAD_ATTEMPTS):
+        async with engine.connect() as conn:
+            version_query = select(DatasetVersion.version)
+            version = (await conn.execute(version_query)).scalar() or 0
+            records = [
+                PokemonRecord(*row)
+                for row in await conn.execute(
+                    select(
+                        Pokemon.id,
+                        Pokemon.name,
+                        Pokemon.height,
+                        Pokemon.weight,
+                        Pokemon.image_url,
+                    )
+                )
+            ]
+            types = [TypeRecord(*row) for row in await conn.execute(select(Type.id, Type.name))]
+            links = [tuple(row) for row in await conn.execute(select(pokemon_type))]
+            if ((await conn.execute(version_query)).scalar() or 0) == version:
+                break
+    return ReadModel(version, records, types, links)
+
+
+async def refresh_read_model() -> ReadModel:
+    """Build a model and install it, unless a write happened meanwhile, in
+    which case build again."""
+    global _model
+    while True:
+        generation = _generation
+        started = time.perf_counter()
+        model = await build_read_model()
+        if generation == _generation:
+            _model = model
+            print(
+                f"Read model: {len(model)} Pokemon loaded in "
+                f"{(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            return model
+
+
+async def _reload() -> None:
+    try:
+        await refresh_read_model()
+    except SQLAlchemyError as e:
+        # Resolvers keep using SQL; the next write tries again
+        print(f"Read model reload failed: {e}")
+
+
+async def close_read_model() -> None:
+    global _model, _reload_task
+    if _reload_task is not None and not _reload_task.done():
+        _reload_task.cancel()
+        try:
+            await _reload_task
+        except asyncio.CancelledError:
+            pass
+    _reload_task = None
+    _model = None
+
+
+@on_invalidate
+def _retire_read_model() -> None:
+    global _model, _generation, _reload_task
+    _generation += 1
+    _model = None
+    if not READ_MODEL_ENABLED:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No loop (a sync script); the next startup loads a fresh model
+        return
+    # A reload that's already running notices the new generation and retries
+    if _reload_task is None or _reload_task.done():
+        _reload_task = loop.create_task(_reload())
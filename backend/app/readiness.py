@@ -0,0 +1,162 @@
+"""
+Startup population and readiness.
+
+The lifespan starts population (snapshot seed or PokeAPI fetch) as a
+``Population`` task and doesn't wait for it, so the server answers
+``/healthz`` at once. ``/readyz`` says whether the instance should take
+traffic, according to ``POKEMON_STARTUP_POLICY``:
+
+``serve-stale`` (default)
+    Ready as soon as the database holds any Pokémon, e.g. from a previous
+    run or the snapshot, even while population tops it up.
+``wait``
+    Ready only once population has finished. Until then GraphQL requests
+    are answered with ``503`` and a ``Retry-After`` header.
+
+A population task that fails is logged with its traceback and reported by
+``/readyz``; under ``serve-stale`` the instance stays ready if it has data.
+"""
+import asyncio
+import os
+import time
+import traceback
+import typing
+
+from . import ingest
+from .dataset import get_dataset_version, get_pokemon_count
+from .pubsub import population_progress
+from .startup import startup_timer
+
+SERVE_STALE = "serve-stale"
+WAIT = "wait"
+STARTUP_POLICY = os.getenv("POKEMON_STARTUP_POLICY", SERVE_STALE)
+if STARTUP_POLICY not in (SERVE_STALE, WAIT):
+    raise ValueError(f"POKEMON_STARTUP_POLICY must be {SERVE_STALE!r} or {WAIT!r}, not {STARTUP_POLICY!r}")
+
+# Seconds a client is told to wait while the instance warms up
+RETRY_AFTER = int(os.getenv("POKEMON_RETRY_AFTER", "5"))
+
+
+class Population:
+    """Runs the startup population task and tracks how it went."""
+
+    def __init__(self, policy: str = STARTUP_POLICY):
+        self.policy = policy
+        self.state = "idle"
+        self.error: typing.Optional[str] = None
+        self.task: typing.Optional[asyncio.Task] = None
+        self.started_at: typing.Optional[float] = None
+        self.finished_at: typing.Optional[float] = None
+        # Seconds from start() until the instance first reported ready
+        self.ready_after: typing.Optional[float] = None
+
+    def start(self, populate: typing.Callable[[], typing.Coroutine[typing.Any, typing.Any, typing.Any]]) -> asyncio.Task:
+        self.state = "running"
+        self.error = None
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.ready_after = None
+        self.task = asyncio.create_task(populate())
+        self.task.add_done_callback(self._finished)
+        return self.task
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self.finished_at = time.perf_counter()
+        try:
+            self._record_outcome(task)
+        finally:
+            population_progress.publish(ingest.latest_stats)
+
+    def _record_outcome(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self.state = "cancelled"
+            return
+        error = task.exception()
+        if error is not None:
+            self.state = "failed"
+            self.error = f"{type(error).__name__}: {error}"
+            print("Population failed:")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            return
+        self.state = "done"
+        if self.started_at is not None and self.finished_at is not None:
+            print(f"Population finished in {self.finished_at - self.started_at:.2f}s")
+        self._mark_ready()
+
+    async def stop(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+    @property
+    def serving(self) -> bool:
+        """Whether GraphQL requests should be answered yet."""
+        return self.policy == SERVE_STALE or self.state == "done"
+
+    def _mark_ready(self) -> None:
+        if self.ready_after is None and self.started_at is not None:
+            self.ready_after = time.perf_counter() - self.started_at
+            print(f"Ready to serve after {self.ready_after:.2f}s")
+
+    async def ready(self) -> bool:
+        if self.policy == WAIT:
+            return self.state == "done"
+        if self.state == "done":
+            return True
+        if await get_pokemon_count() > 0:
+            self._mark_ready()
+            return True
+        return False
+
+    def progress(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Counts, rate and estimated time left of the latest ingestion."""
+        stats = ingest.latest_stats
+        if stats is None:
+            return None
+        rate = stats.processed / stats.elapsed if stats.elapsed > 0 else 0.0
+        remaining = max(stats.total - stats.processed, 0)
+        if not remaining:
+            eta = 0.0
+        elif rate > 0:
+            eta = round(remaining / rate, 1)
+        else:
+            eta = None
+        return {
+            "total": stats.total,
+            "processed": stats.processed,
+            "fetched": stats.fetched,
+            "written": stats.written,
+            "unchanged": stats.unchanged,
+            "failed": stats.failed,
+            "records_per_second": round(stats.records_per_second, 1),
+            "eta_seconds": eta,
+        }
+
+    async def report(self) -> typing.Dict[str, typing.Any]:
+        """The body of ``/readyz``."""
+        ready = await self.ready()
+        now = self.finished_at or time.perf_counter()
+        population: typing.Dict[str, typing.Any] = {
+            "state": self.state,
+            "elapsed": round(now - self.started_at, 3) if self.started_at is not None else None,
+            "error": self.error,
+        }
+        progress = self.progress()
+        if progress is not None:
+            population["progress"] = progress
+        return {
+            "ready": ready,
+            "policy": self.policy,
+            "ready_after": round(self.ready_after, 3) if self.ready_after is not None else None,
+            "dataset_version": await get_dataset_version(),
+            "pokemon": await get_pokemon_count(),
+            "population": population,
+            "startup": startup_timer.report(),
+        }
+
+
+population = Population()
@@ -0,0 +1,110 @@
+"""
+Lightweight result objects returned by the GraphQL resolvers.
+
+Strawberry resolves fields with ``getattr``, so resolvers can hand back these
+``__slots__`` records instead of ORM entities or Strawberry dataclasses. They
+are immutable by convention and safe to share across requests through the
+in-process caches.
+"""
+import typing
+
+
+class TypeRecord:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"<TypeRecord(id={self.id}, name='{self.name}')>"
+
+
+class PokemonRecord:
+    """A Pokémon row. List resolvers only read the selected columns, so any
+    field but ``id`` may be left unset when it wasn't asked for."""
+
+    __slots__ = ("id", "name", "height", "weight", "imageUrl")
+
+    def __init__(
+        self,
+        id: int,
+        name: typing.Optional[str] = None,
+        height: typing.Optional[int] = None,
+        weight: typing.Optional[int] = None,
+        imageUrl: typing.Optional[str] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.height = height
+        self.weight = weight
+        self.imageUrl = imageUrl
+
+    def __repr__(self) -> str:
+        return f"<PokemonRecord(id={self.id}, name='{self.name}')>"
+
+
+class AbilityRecord:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"<AbilityRecord(id={self.id}, name='{self.name}')>"
+
+
+class PokemonAbilityRecord:
+    """One of a Pokémon's abilities, with its slot and whether it's hidden."""
+
+    __slots__ = ("ability", "slot", "isHidden")
+
+    def __init__(self, ability: AbilityRecord, slot: int, isHidden: bool):
+        self.ability = ability
+        self.slot = slot
+        self.isHidden = isHidden
+
+
+class CryRecord:
+    __slots__ = ("latest", "legacy")
+
+    def __init__(self, latest: typing.Optional[str] = None, legacy: typing.Optional[str] = None):
+        self.latest = latest
+        self.legacy = legacy
+
+
+class EvolutionStageRecord:
+    """A species in an evolution chain, and how it is reached from the
+    species before it."""
+
+    __slots__ = ("id", "name", "stage", "evolvesFromId", "trigger", "minLevel", "item")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        stage: int,
+        evolvesFromId: typing.Optional[int] = None,
+        trigger: typing.Optional[str] = None,
+        minLevel: typing.Optional[int] = None,
+        item: typing.Optional[str] = None,
+    ):
+        self.id = id
+        self.name = name
+        self.stage = stage
+        self.evolvesFromId = evolvesFromId
+        self.trigger = trigger
+        self.minLevel = minLevel
+        self.item = item
+
+    def __repr__(self) -> str:
+        return f"<EvolutionStageRecord(id={self.id}, name='{self.name}')>"
+
+
+class EvolutionChainRecord:
+    __slots__ = ("id", "stages")
+
+    def __init__(self, id: int, stages: typing.Sequence[EvolutionStageRecord]):
+        self.id = id
+        self.stages = stages
@@ -0,0 +1,207 @@
+"""
+The ``/graphql`` HTTP endpoint.
+
+Queries sent as GET requests are cacheable: a successful response carries a
+``Cache-Control`` max-age and an ETag derived from the request and the
+dataset version, which changes whenever the populator writes. A request whose
+``If-None-Match`` still matches is answered with 304 before the query runs,
+and browsers or a CDN in front of the API can serve repeats without reaching
+Python at all. POST requests and mutations are never cached.
+
+Requests may also name their query by hash (see ``persisted_queries``).
+Under the ``wait`` startup policy, queries get a 503 until population is
+done (see ``readiness``), and clients over their rate limit get a 429 (see
+``limits``).
+"""
+import functools
+import hashlib
+import json
+import os
+import typing
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from graphql import FieldNode, GraphQLError, OperationType, get_operation_ast, parse
+from strawberry import UNSET
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLHTTPResponse, GraphQLRequestData
+from strawberry.types import ExecutionResult
+
+from .dataset import get_dataset_version
+from .limits import RateLimiter, client_key, retry_after
+from .persisted_queries import PersistedQueryError, PersistedQueryStore
+from .readiness import RETRY_AFTER, population
+
+# Seconds a GET response may be reused, unless a root field says otherwise
+CACHE_MAX_AGE = int(os.getenv("GRAPHQL_CACHE_MAX_AGE", "60"))
+
+
+def _field_max_age_from_env() -> typing.Dict[str, int]:
+    # GRAPHQL_FIELD_MAX_AGE="pokemonById=3600,searchPokemons=30"
+    overrides = {}
+    for item in os.getenv("GRAPHQL_FIELD_MAX_AGE", "").split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            overrides[name.strip()] = int(seconds)
+    return overrides
+
+
+# Per root field max-age; an operation gets the smallest of its fields'
+FIELD_MAX_AGE = {
+    "pokemonById": 300,
+    "pokemonByName": 300,
+    "pokemonsByIds": 300,
+    "pokemonsByNames": 300,
+    "abilityByName": 300,
+    "typeMatchup": 3600,
+    "pokemonStats": 300,
+    "evolutionChain": 300,
+    "preEvolutions": 300,
+    "evolvesTo": 300,
+    **_field_max_age_from_env(),
+}
+
+
+@functools.lru_cache(maxsize=256)
+def root_field_names(query: str, operation_name: typing.Optional[str]) -> typing.Optional[typing.Tuple[str, ...]]:
+    """Root fields of the query operation in ``query``, or None when it isn't
+    a single, parseable query (mutations, syntax errors, root fragments)."""
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+    names = []
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return None
+        names.append(selection.name.value)
+    return tuple(names)
+
+
+def make_etag(version: int, params: typing.Mapping[str, str]) -> str:
+    key = "\0".join(
+        [str(version)]
+        + [params.get(name, "") for name in ("query", "variables", "operationName", "extensions")]
+    )
+    return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: typing.Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    # Weak comparison, as RFC 9110 asks for If-None-Match
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class PokemonGraphQLRouter(GraphQLRouter):
+    def __init__(
+        self,
+        *args: typing.Any,
+        max_age: int = CACHE_MAX_AGE,
+        field_max_age: typing.Optional[typing.Mapping[str, int]] = None,
+        persisted_queries: typing.Optional[PersistedQueryStore] = None,
+        rate_limiter: typing.Optional[RateLimiter] = None,
+        **kwargs: typing.Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_age = max_age
+        self.field_max_age = FIELD_MAX_AGE if field_max_age is None else field_max_age
+        self.persisted_queries = persisted_queries or PersistedQueryStore.from_env()
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    async def request_payload(self, request: Request) -> typing.Tuple[typing.Optional[str], typing.Any]:
+        """The raw ``query`` and ``extensions`` of a GET or JSON POST request.
+        Anything malformed is left for Strawberry to reject."""
+        if request.method == "GET":
+            query = request.query_params.get("query")
+            try:
+                extensions = json.loads(request.query_params.get("extensions") or "null")
+            except ValueError:
+                extensions = None
+        elif "application/json" in request.headers.get("content-type", ""):
+            try:
+                data = json.loads(await request.body())
+            except ValueError:
+                return None, None
+            if not isinstance(data, dict):
+                return None, None
+            query, extensions = data.get("query"), data.get("extensions")
+        else:
+            return None, None
+        if not isinstance(query, str):
+            query = None
+        return query, extensions if isinstance(extensions, dict) else None
+
+    def cache_max_age(self, request: Request, query: typing.Optional[str]) -> typing.Optional[int]:
+        """Max-age for a GET query request, or None if it mustn't be cached."""
+        if request.method != "GET" or self.max_age <= 0 or not query:
+            return None
+        fields = root_field_names(query, request.query_params.get("operationName"))
+        if not fields:
+            return None
+        return min(self.field_max_age.get(name, self.max_age) for name in fields)
+
+    async def run(
+        self,
+        request: Request,
+        context: typing.Any = UNSET,
+        root_value: typing.Any = UNSET,
+    ) -> Response:
+        query, extensions = await self.request_payload(request)
+        wait = self.rate_limiter.acquire(client_key(request)) if query or extensions else 0
+        if wait:
+            return JSONResponse(
+                {"errors": [{"message": "Too many requests", "extensions": {"code": "RATE_LIMITED"}}]},
+                status_code=429,
+                headers={"Retry-After": retry_after(wait)},
+            )
+        if not population.serving and (query or extensions):
+            return JSONResponse(
+                {"errors": [{"message": "Service is starting up", "extensions": {"code": "SERVICE_UNAVAILABLE"}}]},
+                status_code=503,
+                headers={"Retry-After": str(RETRY_AFTER)},
+            )
+        try:
+            query = self.persisted_queries.resolve(query, extensions)
+        except PersistedQueryError as error:
+            return JSONResponse(
+                {"errors": [{"message": error.message, "extensions": {"code": error.code}}]}
+            )
+        # Picked up again by parse_http_body
+        request.state.query = query
+
+        max_age = self.cache_max_age(request, query)
+        if max_age is None:
+            return await super().run(request, context=context, root_value=root_value)
+
+        etag = make_etag(await get_dataset_version(), request.query_params)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        response = await super().run(request, context=context, root_value=root_value)
+        # Errors may be transient, so only clean results are cacheable
+        if response.status_code == 200 and not getattr(request.state, "graphql_errors", True):
+            response.headers.update(headers)
+        return response
+
+    def should_render_graphiql(self, request: typing.Any) -> bool:
+        # A GET carrying only a persisted query hash is an operation too
+        if getattr(request.request.state, "query", None) is not None:
+            return False
+        return super().should_render_graphiql(request)
+
+    async def parse_http_body(self, request: typing.Any) -> GraphQLRequestData:
+        request_data = await super().parse_http_body(request)
+        query = getattr(request.request.state, "query", None)
+        if query is not None:
+            request_data.query = query
+        return request_data
+
+    async def process_result(self, request: Request, result: ExecutionResult) -> GraphQLHTTPResponse:
+        request.state.graphql_errors = bool(result.errors)
+        return await super().process_result(request, result)
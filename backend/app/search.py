@@ -0,0 +1,250 @@
+"""
+Search and filtering over the Pokémon table.
+
+Exact filters are pushed down to SQLite and served by indexes: name
+prefixes by the B-tree on ``pokemons.name`` (as a range, so no ``LIKE``
+scan), types by ``ix_pokemon_type_type_id_pokemon_id`` and height/weight
+ranges and sorts by their own B-trees. Typo-tolerant name matching uses an
+in-memory trigram index, rebuilt lazily after each write to the dataset.
+"""
+import functools
+import operator
+import typing
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+
+from .cache import MISSING, dataset_cache
+from .database import ReadSessionLocal
+from .models.pokemon import Pokemon, Type, pokemon_type
+from .read_model import ReadModel, current_read_model
+from .records import PokemonRecord
+
+# Jaccard similarity a fuzzy match needs, and how many matches to rank.
+# Ranked ids are bound one parameter each, so the limit stays well under
+# SQLite's 999 variables per statement on older builds.
+FUZZY_THRESHOLD = 0.3
+FUZZY_LIMIT = 900
+
+SORT_COLUMNS: typing.Dict[str, typing.Any] = {
+    "id": Pokemon.id,
+    "name": Pokemon.name,
+    "height": Pokemon.height,
+    "weight": Pokemon.weight,
+}
+
+
+def trigrams(text: str) -> typing.Set[str]:
+    # Padded like pg_trgm so short names and word starts get trigrams too
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Trigram -> Pokémon ids postings, for similarity search on names."""
+
+    def __init__(self, names: typing.Iterable[typing.Tuple[int, str]]):
+        postings: typing.Dict[str, typing.List[int]] = {}
+        self.sizes: typing.Dict[int, int] = {}
+        for pokemon_id, name in names:
+            grams = trigrams(name)
+            self.sizes[pokemon_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(pokemon_id)
+        # Compact int arrays instead of lists of Python ints
+        self.postings = {gram: array("i", ids) for gram, ids in postings.items()}
+
+    def search(
+        self, text: str, threshold: float = FUZZY_THRESHOLD, limit: int = FUZZY_LIMIT
+    ) -> typing.List[typing.Tuple[int, float]]:
+        """Ids whose names are similar to ``text``, best match first."""
+        grams = trigrams(text)
+        shared: typing.Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scored = []
+        for pokemon_id, overlap in shared.items():
+            similarity = overlap / (len(grams) + self.sizes[pokemon_id] - overlap)
+            if similarity >= threshold:
+                scored.append((pokemon_id, similarity))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+async def get_name_index() -> TrigramIndex:
+    cached = dataset_cache.get("name_trigrams")
+    if cached is not MISSING:
+        return typing.cast(TrigramIndex, cached)
+
+    generation = dataset_cache.generation
+    async with ReadSessionLocal() as session:
+        result = await session.execute(select(Pokemon.id, Pokemon.name))
+        index = TrigramIndex((pokemon_id, name) for pokemon_id, name in result if name)
+    dataset_cache.set("name_trigrams", index, generation)
+    return index
+
+
+@dataclass
+class SearchFilters:
+    name: typing.Optional[str] = None
+    fuzzy: bool = False
+    types: typing.Optional[typing.List[str]] = None
+    match_all_types: bool = False
+    min_height: typing.Optional[int] = None
+    max_height: typing.Optional[int] = None
+    min_weight: typing.Optional[int] = None
+    max_weight: typing.Optional[int] = None
+
+
+def _conditions(filters: SearchFilters) -> typing.List[typing.Any]:
+    conditions = []
+    if filters.name and not filters.fuzzy:
+        prefix = filters.name.lower()
+        # A half-open range instead of LIKE 'x%' so the name B-tree is used
+        conditions.append(Pokemon.name >= prefix)
+        conditions.append(Pokemon.name < prefix + "\U0010ffff")
+    if filters.types:
+        names = {name.lower() for name in filters.types}
+        with_types = (
+            select(pokemon_type.c.pokemon_id)
+            .join(Type, Type.id == pokemon_type.c.type_id)
+            .where(Type.name.in_(names))
+        )
+        if filters.match_all_types:
+            with_types = with_types.group_by(pokemon_type.c.pokemon_id).having(
+                func.count() == len(names)
+            )
+        conditions.append(Pokemon.id.in_(with_types))
+    if filters.min_height is not None:
+        conditions.append(Pokemon.height >= filters.min_height)
+    if filters.max_height is not None:
+        conditions.append(Pokemon.height <= filters.max_height)
+    if filters.min_weight is not None:
+        conditions.append(Pokemon.weight >= filters.min_weight)
+    if filters.max_weight is not None:
+        conditions.append(Pokemon.weight <= filters.max_weight)
+    return conditions
+
+
+async def search_pokemon(
+    filters: SearchFilters,
+    columns: typing.Sequence[typing.Any],
+    sort_by: typing.Optional[str],
+    descending: bool,
+    offset: int,
+    limit: int,
+) -> typing.Tuple[int, typing.List[PokemonRecord]]:
+    """Return the total number of matches and the requested slice of them.
+
+    Without an explicit ``sort_by``, fuzzy searches are ordered by
+    similarity and everything else by id.
+    """
+    model = current_read_model()
+    if model is not None:
+        return search_read_model(model, filters, sort_by, descending, offset, limit)
+
+    conditions = _conditions(filters)
+
+    ranked: typing.Optional[typing.List[int]] = None
+    if filters.name and filters.fuzzy:
+        ranked = [pokemon_id for pokemon_id, _ in (await get_name_index()).search(filters.name)]
+        if not ranked:
+            return 0, []
+        conditions.append(Pokemon.id.in_(ranked))
+
+    async with ReadSessionLocal() as session:
+        if ranked is not None and sort_by is None:
+            # Relevance order lives in Python; let SQL apply the other filters
+            matching = set(
+                (await session.execute(select(Pokemon.id).where(*conditions))).scalars()
+            )
+            ids = [pokemon_id for pokemon_id in ranked if pokemon_id in matching]
+            if descending:
+                ids.reverse()
+            page_ids = ids[offset:offset + limit] if limit > 0 and offset >= 0 else []
+            if not page_ids:
+                return len(ids), []
+            result = await session.execute(select(*columns).where(Pokemon.id.in_(page_ids)))
+            by_id = {row.id: PokemonRecord(**row._mapping) for row in result}
+            return len(ids), [by_id[pokemon_id] for pokemon_id in page_ids]
+
+        total = (
+            await session.execute(select(func.count()).select_from(Pokemon).where(*conditions))
+        ).scalar_one()
+        if limit <= 0 or offset < 0 or offset >= total:
+            return total, []
+
+        column = SORT_COLUMNS[sort_by or "id"]
+        order = [column.desc(), Pokemon.id.desc()] if descending else [column, Pokemon.id]
+        query = select(*columns).where(*conditions).order_by(*order).offset(offset).limit(limit)
+        result = await session.execute(query)
+        return total, [PokemonRecord(**row._mapping) for row in result]
+
+
+def _matches(record: PokemonRecord, filters: SearchFilters) -> bool:
+    if filters.name and not filters.fuzzy and not (record.name or "").startswith(filters.name.lower()):
+        return False
+    for value, low, high in (
+        (record.height, filters.min_height, filters.max_height),
+        (record.weight, filters.min_weight, filters.max_weight),
+    ):
+        if low is None and high is None:
+            continue
+        # Like SQL, a missing value never satisfies a range
+        if value is None or (low is not None and value < low) or (high is not None and value > high):
+            return False
+    return True
+
+
+def _sort_key(sort_by: str) -> typing.Callable[[PokemonRecord], typing.Any]:
+    def key(record: PokemonRecord) -> typing.Any:
+        value = getattr(record, sort_by)
+        # SQLite puts NULLs first in ascending order
+        return (value is not None, value if value is not None else 0, record.id)
+
+    return key
+
+
+def search_read_model(
+    model: ReadModel,
+    filters: SearchFilters,
+    sort_by: typing.Optional[str],
+    descending: bool,
+    offset: int,
+    limit: int,
+) -> typing.Tuple[int, typing.List[PokemonRecord]]:
+    """``search_pokemon`` answered from the in-memory read model."""
+    if filters.types:
+        bitsets = [model.type_bits.get(name, 0) for name in {name.lower() for name in filters.types}]
+        combine = operator.and_ if filters.match_all_types else operator.or_
+        candidates: typing.Sequence[PokemonRecord] = [
+            model.records[i] for i in model.positions(functools.reduce(combine, bitsets))
+        ]
+    else:
+        candidates = model.records
+
+    if filters.name and filters.fuzzy:
+        if model.name_index is None:
+            model.name_index = TrigramIndex((r.id, r.name) for r in model.records if r.name)
+        allowed = {record.id for record in candidates}
+        # In relevance order
+        matches = [
+            model.by_id[pokemon_id]
+            for pokemon_id, _ in model.name_index.search(filters.name)
+            if pokemon_id in allowed and _matches(model.by_id[pokemon_id], filters)
+        ]
+    else:
+        matches = [record for record in candidates if _matches(record, filters)]
+
+    if filters.name and filters.fuzzy and sort_by is None:
+        if descending:
+            matches.reverse()
+    else:
+        matches.sort(key=_sort_key(sort_by or "id"), reverse=descending)
+
+    if limit <= 0 or offset < 0:
+        return len(matches), []
+    return len(matches), matches[offset:offset + limit]
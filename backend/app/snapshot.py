@@ -0,0 +1,224 @@
+"""
+Offline snapshots of the Pokémon dataset.
+
+A snapshot is gzip compressed JSON holding every dataset table as a column
+list plus row arrays, so it can be bulk loaded with ``executemany`` inserts
+in a single transaction instead of one PokeAPI request per Pokémon.
+
+    python -m app.snapshot export data/pokemon_snapshot.json.gz
+    python -m app.snapshot import data/pokemon_snapshot.json.gz [--replace]
+"""
+import argparse
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import time
+import typing
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .cache import invalidate_caches
+from .dataset import bump_dataset_version
+from .database import create_schema, get_engine
+from .models.pokemon import (
+    Ability,
+    Cry,
+    Pokemon,
+    Species,
+    Type,
+    TypeEffectiveness,
+    evolution_closure,
+    pokemon_ability,
+    pokemon_type,
+)
+
+SNAPSHOT_FORMAT = "pokemon-snapshot"
+# 2: abilities and cries moved out of ``pokemons`` into their own tables
+# 3: type_effectiveness
+# 4: species and evolution_closure
+SNAPSHOT_VERSION = 4
+
+# Snapshot used, when present, to seed an empty database without network
+# access. None is committed; export one to use it.
+DEFAULT_SNAPSHOT_PATH = os.getenv(
+    "POKEMON_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "pokemon_snapshot.json.gz"),
+)
+
+# Dataset tables in foreign key order
+SNAPSHOT_TABLES = [
+    Type.__table__,
+    TypeEffectiveness.__table__,
+    Ability.__table__,
+    Pokemon.__table__,
+    pokemon_type,
+    pokemon_ability,
+    Cry.__table__,
+    Species.__table__,
+    evolution_closure,
+]
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot can't be read or doesn't match the schema."""
+
+
+async def export_snapshot(path: str, engine: typing.Optional[AsyncEngine] = None) -> int:
+    """Write the dataset to ``path``; returns the number of Pokémon exported."""
+    engine = engine or get_engine()
+    tables = {}
+    async with engine.connect() as conn:
+        for table in SNAPSHOT_TABLES:
+            columns = [column.name for column in table.columns]
+            result = await conn.execute(select(table).order_by(*table.primary_key.columns))
+            tables[table.name] = {"columns": columns, "rows": [list(row) for row in result]}
+
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "tables": tables,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write next to the target and rename so readers never see a partial file
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return len(tables[Pokemon.__tablename__]["rows"])
+
+
+def read_snapshot(path: str) -> dict:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot: dict = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unable to read snapshot {path}: {e}") from e
+
+    if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"{path} is not a Pokemon snapshot")
+    if not isinstance(snapshot.get("version"), int) or snapshot["version"] > SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"Unsupported snapshot version {snapshot.get('version')} (expected <= {SNAPSHOT_VERSION})"
+        )
+    if snapshot["version"] == 1:
+        _upgrade_v1(snapshot["tables"])
+    return snapshot
+
+
+def _upgrade_v1(tables: dict) -> None:
+    """Move a version 1 snapshot's ``abilities`` JSON and ``cries`` columns
+    into the ability, pokemon_ability and cry tables. Version 1 didn't record
+    hidden abilities, so none are marked hidden."""
+    pokemons = tables.get(Pokemon.__tablename__)
+    if not pokemons:
+        return
+    columns = pokemons["columns"]
+    id_at = columns.index("id")
+    abilities_at = columns.index("abilities") if "abilities" in columns else None
+    cries_at = columns.index("cries") if "cries" in columns else None
+
+    ability_ids: typing.Dict[str, int] = {}
+    links = []
+    cries = []
+    for row in pokemons["rows"]:
+        names = row[abilities_at] if abilities_at is not None else None
+        for slot, name in enumerate(names or [], start=1):
+            links.append([row[id_at], ability_ids.setdefault(name, len(ability_ids) + 1), slot, False])
+        if cries_at is not None and row[cries_at]:
+            cries.append([row[id_at], row[cries_at], None])
+
+    keep = [index for index, column in enumerate(columns) if column not in ("abilities", "cries")]
+    pokemons["columns"] = [columns[index] for index in keep]
+    pokemons["rows"] = [[row[index] for index in keep] for row in pokemons["rows"]]
+    tables[Ability.__tablename__] = {"columns": ["id", "name"], "rows": [[i, name] for name, i in ability_ids.items()]}
+    tables[pokemon_ability.name] = {"columns": ["pokemon_id", "ability_id", "slot", "is_hidden"], "rows": links}
+    tables[Cry.__tablename__] = {"columns": ["pokemon_id", "latest", "legacy"], "rows": cries}
+
+
+async def import_snapshot(
+    path: str,
+    engine: typing.Optional[AsyncEngine] = None,
+    replace: bool = False,
+) -> int:
+    """Bulk load ``path`` in one transaction; returns the number of Pokémon loaded.
+
+    Refuses to load into a database that already has Pokémon unless
+    ``replace`` is set, in which case existing rows are deleted first.
+    """
+    engine = engine or get_engine()
+    snapshot = read_snapshot(path)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+        existing = (await conn.execute(select(func.count(Pokemon.id)))).scalar_one()
+        if existing and not replace:
+            raise SnapshotError(f"Database already has {existing} Pokemon; pass replace=True to overwrite")
+
+        if replace:
+            for table in reversed(SNAPSHOT_TABLES):
+                await conn.execute(delete(table))
+
+        for table in SNAPSHOT_TABLES:
+            data = snapshot["tables"].get(table.name)
+            if not data or not data["rows"]:
+                continue
+            unknown = set(data["columns"]) - set(table.columns.keys())
+            if unknown:
+                raise SnapshotError(f"Snapshot table {table.name} has unknown columns: {sorted(unknown)}")
+            columns = data["columns"]
+            await conn.execute(insert(table), [dict(zip(columns, row)) for row in data["rows"]])
+        await bump_dataset_version(conn)
+    invalidate_caches()
+
+    return len(snapshot["tables"][Pokemon.__tablename__]["rows"])
+
+
+async def seed_from_snapshot(
+    path: str = DEFAULT_SNAPSHOT_PATH,
+    engine: typing.Optional[AsyncEngine] = None,
+) -> bool:
+    """Load the snapshot, if present, into an empty database. Returns whether
+    it did."""
+    engine = engine or get_engine()
+    if not os.path.exists(path):
+        return False
+
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+        if (await conn.execute(select(func.count(Pokemon.id)))).scalar_one():
+            return False
+
+    started = time.perf_counter()
+    count = await import_snapshot(path, engine)
+    print(f"Seeded {count} Pokemon from snapshot {path} in {time.perf_counter() - started:.2f}s")
+    return True
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export or import a Pokemon dataset snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="write the database to a snapshot file")
+    export_parser.add_argument("path", nargs="?", default=DEFAULT_SNAPSHOT_PATH)
+    import_parser = subparsers.add_parser("import", help="bulk load a snapshot file")
+    import_parser.add_argument("path", nargs="?", default=DEFAULT_SNAPSHOT_PATH)
+    import_parser.add_argument("--replace", action="store_true", help="delete existing data first")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "export":
+        count = asyncio.run(export_snapshot(args.path))
+        print(f"Exported {count} Pokemon to {args.path} in {time.perf_counter() - started:.2f}s")
+    else:
+        count = asyncio.run(import_snapshot(args.path, replace=args.replace))
+        print(f"Imported {count} Pokemon from {args.path} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
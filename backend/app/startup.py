@@ -0,0 +1,53 @@
+"""
+Startup timing.
+
+Instances are started on demand, so how long one takes to come up matters.
+Each phase of startup is timed:
+
+``import``
+    Importing ``app.main``, schema included, timed from the import of the
+    ``app`` package, which imports this module before anything else.
+``schema``
+    Building the Strawberry schema.
+``database``
+    Opening the pools, which creates the engines and switches SQLite to WAL.
+``read_model``
+    Loading the in-memory read model, when it is enabled.
+
+The lifespan logs the phases once they have all run. ``/readyz`` reports
+them and ``/metrics`` exports them as ``startup_phase_seconds``.
+"""
+import contextlib
+import time
+import typing
+
+
+class StartupTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        # Phase -> seconds, in the order the phases finished
+        self.phases: typing.Dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = seconds
+
+    def record_since_start(self, phase: str) -> None:
+        """Record ``phase`` as running from the timer's creation until now."""
+        self.record(phase, time.perf_counter() - self.started)
+
+    @contextlib.contextmanager
+    def phase(self, phase: str) -> typing.Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def report(self) -> typing.Dict[str, float]:
+        return {phase: round(seconds, 3) for phase, seconds in self.phases.items()}
+
+    def summary(self) -> str:
+        return ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phases.items())
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,198 @@
+"""
+Aggregate statistics over the stored Pokémon, for dashboards.
+
+Counts, minimums, maximums and means come from ``GROUP BY`` queries over
+``pokemons`` and ``pokemon_type``. Percentiles and histograms need the
+values themselves, so one more scan reads each height and weight, and they
+are kept sorted. Everything is loaded once per dataset version, so repeated
+dashboard loads don't touch the database. A histogram is cut from the sorted
+values on request with a binary search per bucket.
+"""
+import bisect
+import typing
+from array import array
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from .cache import MISSING, dataset_cache
+from .database import ReadSessionLocal
+from .models.pokemon import Pokemon, Type, pokemon_type
+
+PERCENTILES = (25, 50, 75, 90, 95, 99)
+MAX_HISTOGRAM_BUCKETS = 50
+
+
+class Distribution:
+    """Summary of one column over a set of Pokémon, with its values sorted."""
+
+    __slots__ = ("count", "min", "max", "mean", "values")
+
+    def __init__(
+        self,
+        count: int,
+        min: typing.Optional[float],
+        max: typing.Optional[float],
+        mean: typing.Optional[float],
+        values: typing.Iterable[float],
+    ):
+        self.count = count
+        self.min = min
+        self.max = max
+        self.mean = mean
+        self.values = array("d", sorted(values))
+
+    def percentile(self, percent: float) -> typing.Optional[float]:
+        """Linearly interpolated between the closest ranks."""
+        if not self.values:
+            return None
+        rank = (len(self.values) - 1) * percent / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(self.values) - 1)
+        return self.values[lower] + (self.values[upper] - self.values[lower]) * (rank - lower)
+
+    def histogram(self, buckets: int) -> typing.List[typing.Tuple[float, float, int]]:
+        """``(lower, upper, count)`` for ``buckets`` equal-width buckets from
+        the smallest value to the largest. Each bucket holds values from its
+        lower bound up to its upper bound, and the last one also its upper
+        bound."""
+        if not self.values:
+            return []
+        low, high = self.values[0], self.values[-1]
+        if low == high:
+            return [(low, high, len(self.values))]
+        width = (high - low) / buckets
+        result = []
+        start = 0
+        for index in range(buckets):
+            lower = low + width * index
+            upper = high if index == buckets - 1 else low + width * (index + 1)
+            end = len(self.values) if index == buckets - 1 else bisect.bisect_left(self.values, upper)
+            result.append((lower, upper, end - start))
+            start = end
+        return result
+
+
+class TypeStats:
+    __slots__ = ("type", "count", "height", "weight")
+
+    def __init__(self, type: str, count: int, height: Distribution, weight: Distribution):
+        self.type = type
+        self.count = count
+        self.height = height
+        self.weight = weight
+
+
+class TypeCombination:
+    __slots__ = ("types", "count")
+
+    def __init__(self, types: typing.List[str], count: int):
+        self.types = types
+        self.count = count
+
+
+class DatasetStats:
+    __slots__ = ("total", "height", "weight", "byType", "typeCombinations")
+
+    def __init__(
+        self,
+        total: int,
+        height: Distribution,
+        weight: Distribution,
+        byType: typing.List[TypeStats],
+        typeCombinations: typing.List[TypeCombination],
+    ):
+        self.total = total
+        self.height = height
+        self.weight = weight
+        self.byType = byType
+        self.typeCombinations = typeCombinations
+
+
+def _summary_columns() -> typing.List[typing.Any]:
+    return [
+        func.count(Pokemon.id),
+        func.min(Pokemon.height),
+        func.max(Pokemon.height),
+        func.avg(Pokemon.height),
+        func.min(Pokemon.weight),
+        func.max(Pokemon.weight),
+        func.avg(Pokemon.weight),
+    ]
+
+
+def _present(values: typing.Iterable[typing.Optional[float]]) -> typing.List[float]:
+    return [value for value in values if value is not None]
+
+
+async def load_dataset_stats() -> DatasetStats:
+    first, second = pokemon_type.alias("first"), pokemon_type.alias("second")
+    first_type, second_type = aliased(Type), aliased(Type)
+
+    async with ReadSessionLocal() as session:
+        overall = (await session.execute(select(*_summary_columns()))).one()
+        per_type = (
+            await session.execute(
+                select(Type.id, Type.name, *_summary_columns())
+                .join(pokemon_type, pokemon_type.c.type_id == Type.id)
+                .join(Pokemon, Pokemon.id == pokemon_type.c.pokemon_id)
+                .group_by(Type.id, Type.name)
+                .order_by(Type.id)
+            )
+        ).all()
+        combinations = (
+            await session.execute(
+                select(first_type.name, second_type.name, func.count())
+                .select_from(first)
+                .join(second, (second.c.pokemon_id == first.c.pokemon_id) & (second.c.type_id > first.c.type_id))
+                .join(first_type, first_type.id == first.c.type_id)
+                .join(second_type, second_type.id == second.c.type_id)
+                .group_by(first.c.type_id, second.c.type_id, first_type.name, second_type.name)
+                .order_by(func.count().desc(), first.c.type_id, second.c.type_id)
+            )
+        ).all()
+        values = (await session.execute(select(Pokemon.height, Pokemon.weight))).all()
+        typed_values = (
+            await session.execute(
+                select(pokemon_type.c.type_id, Pokemon.height, Pokemon.weight).join(
+                    Pokemon, Pokemon.id == pokemon_type.c.pokemon_id
+                )
+            )
+        ).all()
+
+    by_type_id: typing.Dict[int, typing.List[typing.Sequence[typing.Any]]] = {}
+    for type_id, height, weight in typed_values:
+        by_type_id.setdefault(type_id, []).append((height, weight))
+
+    def distributions(
+        row: typing.Sequence[typing.Any], pairs: typing.Sequence[typing.Sequence[typing.Any]]
+    ) -> typing.Tuple[Distribution, Distribution]:
+        count, min_height, max_height, mean_height, min_weight, max_weight, mean_weight = row
+        return (
+            Distribution(count, min_height, max_height, mean_height, _present(h for h, _ in pairs)),
+            Distribution(count, min_weight, max_weight, mean_weight, _present(w for _, w in pairs)),
+        )
+
+    height, weight = distributions(overall, values)
+    by_type = []
+    for type_id, name, *summary in per_type:
+        type_height, type_weight = distributions(summary, by_type_id.get(type_id, []))
+        by_type.append(TypeStats(name, summary[0], type_height, type_weight))
+    return DatasetStats(
+        total=overall[0],
+        height=height,
+        weight=weight,
+        byType=by_type,
+        typeCombinations=[TypeCombination([a, b], count) for a, b, count in combinations],
+    )
+
+
+async def get_dataset_stats() -> DatasetStats:
+    cached = dataset_cache.get("stats")
+    if cached is not MISSING:
+        return typing.cast(DatasetStats, cached)
+
+    generation = dataset_cache.generation
+    stats = await load_dataset_stats()
+    dataset_cache.set("stats", stats, generation)
+    return stats
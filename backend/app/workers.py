@@ -0,0 +1,151 @@
+"""
+Running several worker processes against one database.
+
+Each worker started by ``uvicorn --workers N`` (or gunicorn) runs its own
+lifespan. Two things keep them from stepping on each other:
+
+Population lock
+    Workers take an exclusive ``fcntl`` lock on a file next to the database
+    before populating. The first one populates. The others wait for it and
+    then find the database already full, so PokeAPI is fetched from and
+    written to once. ``app.populate_db`` takes the same lock. If the worker
+    holding the lock dies, the kernel releases it and the next worker takes
+    over.
+Version polling
+    Every write bumps the dataset version in the database. Each worker reads
+    that one row every ``POKEMON_VERSION_POLL_INTERVAL`` seconds. When it has
+    moved, the worker drops its in-process caches (``invalidate_caches()``),
+    as the writing process did. A poll is a single primary key lookup.
+
+Per-process state is otherwise not shared: rate limits, subscription events
+and document caches are per worker.
+"""
+import asyncio
+import contextlib
+import hashlib
+import os
+import tempfile
+import typing
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from .cache import invalidate_caches
+from .database import ASYNC_DATABASE_URL, IS_MEMORY, ReadSessionLocal
+from .dataset import VERSION_ROW_ID
+from .models.dataset import DatasetVersion
+
+try:
+    import fcntl
+except ImportError:  # Windows: one worker, nothing to coordinate with
+    fcntl = None  # type: ignore[assignment]
+
+# Seconds between dataset version checks; 0 turns polling off
+VERSION_POLL_INTERVAL = float(os.getenv("POKEMON_VERSION_POLL_INTERVAL", "0" if IS_MEMORY else "1"))
+
+# Seconds between attempts to take the population lock
+LOCK_POLL_INTERVAL = 0.2
+
+
+def default_lock_path() -> str:
+    database = make_url(ASYNC_DATABASE_URL).database
+    if database and not IS_MEMORY:
+        return f"{os.path.abspath(database)}.populate.lock"
+    key = hashlib.sha256(ASYNC_DATABASE_URL.encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"pokemon-{key}.populate.lock")
+
+
+POPULATION_LOCK_PATH = os.getenv("POKEMON_POPULATION_LOCK", default_lock_path())
+
+
+@contextlib.asynccontextmanager
+async def population_lock(path: str = POPULATION_LOCK_PATH) -> typing.AsyncIterator[None]:
+    """Hold the exclusive population lock, waiting while another process
+    has it. Waiting polls a non-blocking ``flock``, so it can be cancelled."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as file:
+        announced = False
+        while True:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if not announced:
+                    print("Another process is populating the database; waiting for it")
+                    announced = True
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+async def read_dataset_version() -> int:
+    """The version as stored, bypassing the cache; 0 before the schema
+    exists, as for ``get_dataset_version``."""
+    async with ReadSessionLocal() as session:
+        try:
+            version = (
+                await session.execute(select(DatasetVersion.version).where(DatasetVersion.id == VERSION_ROW_ID))
+            ).scalar_one_or_none()
+        except OperationalError:
+            version = None
+    return version or 0
+
+
+class VersionPoller:
+    """Drops this process's caches when the stored dataset version moves.
+
+    The process that made a write has already invalidated its own caches;
+    it clears them once more on the next poll, which is cheap next to the
+    write.
+    """
+
+    def __init__(self, interval: float = VERSION_POLL_INTERVAL):
+        self.interval = interval
+        self.task: typing.Optional[asyncio.Task] = None
+        self.version: typing.Optional[int] = None
+        self.invalidations = 0
+
+    async def check(self) -> bool:
+        """Invalidate if the stored version changed since the last check.
+        Returns whether it did."""
+        stored = await read_dataset_version()
+        if stored == self.version:
+            return False
+        first = self.version is None
+        self.version = stored
+        if first:
+            return False
+        invalidate_caches()
+        self.invalidations += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except SQLAlchemyError as e:
+                print(f"Dataset version check failed: {e}")
+
+    async def start(self) -> None:
+        if self.interval > 0 and (self.task is None or self.task.done()):
+            # Caches filled from here on are checked against this version
+            self.version = await read_dataset_version()
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+
+version_poller = VersionPoller()
@@ -0,0 +1,83 @@
+"""
+Latency of ``pokemonsPage`` across pages 1..N, against the old OFFSET query.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_pagination [--count 100000] [--per-page 15]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+REPEAT = 20
+
+
+async def run(count: int, per_page: int) -> None:
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+
+    from app.database import AsyncSessionLocal, dispose_engines, get_engine
+    from app.graphql_schema import schema
+    from app.models.pokemon import Pokemon
+
+    from .synthetic import seed_database
+
+    await seed_database(get_engine(), count)
+
+    query = """
+    query Page($page: Int!, $perPage: Int!) {
+        pokemonsPage(page: $page, perPage: $perPage) {
+            items { id name imageUrl types { name } }
+            pageInfo { total lastPage }
+        }
+    }
+    """
+
+    async def keyset(page: int) -> None:
+        result = await schema.execute(query, variable_values={"page": page, "perPage": per_page})
+        assert not result.errors, result.errors
+
+    async def offset(page: int) -> None:
+        # The previous implementation: materialize every row to count, then OFFSET
+        async with AsyncSessionLocal() as session:
+            len((await session.execute(select(Pokemon))).scalars().all())
+            await session.execute(
+                select(Pokemon).options(selectinload(Pokemon.types)).offset((page - 1) * per_page).limit(per_page)
+            )
+
+    async def timed(fn, page: int) -> float:
+        samples = []
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            await fn(page)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    last_page = (count + per_page - 1) // per_page
+    pages = sorted({1, last_page // 4, last_page // 2, last_page * 3 // 4, last_page} - {0})
+
+    await keyset(1)  # warm the id cache
+    print(f"\n{count} Pokemon, {per_page} per page, median of {REPEAT} runs (ms)")
+    print(f"{'page':>8} {'keyset':>10} {'offset':>10}")
+    for page in pages:
+        print(f"{page:>8} {await timed(keyset, page):>10.2f} {await timed(offset, page):>10.2f}")
+
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--per-page", type=int, default=15)
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.per_page))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Request latency of the frontend's operations sent as raw query text to an
+uncached schema, as text to the cached schema, and as persisted query hashes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_persisted_queries [--count 500] [--requests 500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+
+QUERIES_JS = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "src", "utils", "queries.js")
+
+VARIABLES = {"page": 3, "perPage": 20, "pokemonId": 25, "id": 25, "pokemonName": "pikachu"}
+
+
+def frontend_operations() -> dict:
+    with open(QUERIES_JS) as file:
+        source = file.read()
+    operations = {}
+    for body in re.findall(r"gql`(.*?)`", source, re.S):
+        name = re.search(r"query\s+(\w+)", body).group(1)
+        variables = {var: VARIABLES[var] for var in re.findall(r"\$(\w+):", body)}
+        operations[name] = (body.strip(), variables)
+    return operations
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(count: int, requests: int) -> None:
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["GRAPHQL_RATE_LIMIT"] = "0"
+
+    import strawberry
+    from fastapi import FastAPI
+    from httpx import AsyncClient
+    from strawberry.fastapi import GraphQLRouter
+
+    from app.database import dispose_engines, get_engine
+    from app.graphql_schema import Query, get_context
+    from app.main import app
+    from app.persisted_queries import query_hash
+
+    from .synthetic import seed_database
+
+    await seed_database(get_engine(), count)
+
+    # What every request paid before: no document caches, no hashes
+    baseline = FastAPI()
+    baseline.include_router(
+        GraphQLRouter(strawberry.Schema(Query), context_getter=get_context), prefix="/graphql"
+    )
+
+    operations = frontend_operations()
+    async with AsyncClient(app=baseline, base_url="http://bench") as raw_client, \
+            AsyncClient(app=app, base_url="http://bench") as client:
+        modes = {
+            "raw text": (raw_client, lambda query, variables: {"query": query, "variables": variables}),
+            "cached text": (client, lambda query, variables: {"query": query, "variables": variables}),
+            "persisted hash": (client, lambda query, variables: {
+                "variables": variables,
+                "extensions": {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}},
+            }),
+        }
+
+        print(f"\n{count} Pokemon, {requests} requests per operation and mode")
+        print(f"{'operation':<28} {'mode':<16} {'bytes':>6} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, (query, variables) in operations.items():
+            # Registers the hash, and weeds out operations the schema rejects
+            warmup = await client.post("/graphql", json={
+                "query": query,
+                "variables": variables,
+                "extensions": {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}},
+            })
+            if "errors" in warmup.json():
+                print(f"{name:<28} skipped: {warmup.json()['errors'][0]['message']}")
+                continue
+
+            for mode, (mode_client, payload) in modes.items():
+                body = json.dumps(payload(query, variables))
+                samples = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = await mode_client.post(
+                        "/graphql", content=body, headers={"content-type": "application/json"}
+                    )
+                    samples.append((time.perf_counter() - started) * 1000)
+                    assert "errors" not in response.json(), response.text
+                print(
+                    f"{name:<28} {mode:<16} {len(body):>6} "
+                    f"{statistics.median(samples):>8.2f} {percentile(samples, 0.99):>8.2f}"
+                )
+
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.count, args.requests))
+
+
+if __name__ == "__main__":
+    main()
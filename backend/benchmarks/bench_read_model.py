@@ -0,0 +1,101 @@
+"""
+Memory footprint of the in-memory read model, and resolver latency with and
+without it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_read_model [--count 10000]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+REPEAT = 50
+
+QUERIES = {
+    "page of 20": "{ pokemonsPage(page: 40, perPage: 20) { items { id name imageUrl types { name } } } }",
+    "cursor page": "{ pokemonsConnection(first: 20) { edges { node { id name } } totalCount } }",
+    "detail by id": "{ pokemonById(pokemonId: 25) { name height weight abilities types { name } } }",
+    "10 ids (aliased)": "{ %s }" % " ".join(f"p{i}: pokemonById(pokemonId: {i}) {{ name }}" for i in range(1, 11)),
+    "search, one type": '{ searchPokemons(types: ["fire"]) { items { id name } pageInfo { total } } }',
+    "search, prefix+range": '{ searchPokemons(name: "pi", minWeight: 100) { items { id } pageInfo { total } } }',
+}
+
+
+async def run(count: int) -> None:
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from app import read_model
+    from app.cache import invalidate_caches
+    from app.database import dispose_engines, get_engine
+    from app.graphql_schema import schema
+
+    from .synthetic import seed_database
+
+    await seed_database(get_engine(), count)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    model = await read_model.build_read_model()
+    load_ms = (time.perf_counter() - started) * 1000
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(
+        f"\n{count} Pokemon: read model built in {load_ms:.0f} ms, "
+        f"{size / 2**20:.1f} MiB ({size / 2**20 * 10000 / count:.1f} MiB per 10k)"
+    )
+    del model
+
+    async def timed(query: str) -> float:
+        samples = []
+        for _ in range(REPEAT):
+            # Measure the data path, not the LRU caches in front of SQL
+            invalidate_caches()
+            started = time.perf_counter()
+            result = await schema.execute(query)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert not result.errors, result.errors
+        return statistics.median(samples)
+
+    read_model.READ_MODEL_ENABLED = False
+    sql = {label: await timed(query) for label, query in QUERIES.items()}
+
+    read_model.READ_MODEL_ENABLED = True
+    await read_model.refresh_read_model()
+    # invalidate_caches() retires the model, so time it without invalidating
+    memory = {}
+    for label, query in QUERIES.items():
+        samples = []
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            result = await schema.execute(query)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert not result.errors, result.errors
+        memory[label] = statistics.median(samples)
+
+    print(f"{'query':<24} {'sql ms':>8} {'model ms':>9}")
+    for label in QUERIES:
+        print(f"{label:<24} {sql[label]:>8.2f} {memory[label]:>9.2f}")
+
+    await read_model.close_read_model()
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(run(args.count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Latency of ``searchPokemons`` on a large synthetic dataset.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_search [--count 100000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+REPEAT = 20
+
+CASES = {
+    "name prefix": 'name: "pika"',
+    "fuzzy name": 'name: "pikachuu", fuzzy: true',
+    "one type": 'types: ["fire"]',
+    "both types": 'types: ["fire", "flying"], matchAllTypes: true',
+    "weight range": "minWeight: 500, maxWeight: 600, sortBy: WEIGHT",
+    "height sort, deep page": "sortBy: HEIGHT, descending: true, page: 500",
+    "everything": 'name: "char", types: ["fire", "dragon"], minHeight: 20, maxHeight: 150, sortBy: NAME',
+}
+
+
+async def run(count: int) -> None:
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from app.database import dispose_engines, get_engine
+    from app.graphql_schema import schema
+    from app.search import get_name_index
+
+    from .synthetic import seed_database
+
+    await seed_database(get_engine(), count)
+
+    started = time.perf_counter()
+    await get_name_index()
+    print(f"\n{count} Pokemon; trigram index built in {(time.perf_counter() - started) * 1000:.0f} ms")
+    print(f"{'case':<24} {'matches':>8} {'median ms':>10} {'p95 ms':>8}")
+
+    for label, arguments in CASES.items():
+        query = "{ searchPokemons(%s) { items { id name imageUrl } pageInfo { total } } }" % arguments
+        samples = []
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            result = await schema.execute(query)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert not result.errors, result.errors
+        total = result.data["searchPokemons"]["pageInfo"]["total"]
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        print(f"{label:<24} {total:>8} {statistics.median(samples):>10.2f} {p95:>8.2f}")
+
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(run(args.count))
+
+
+if __name__ == "__main__":
+    main()
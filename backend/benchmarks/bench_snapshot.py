@@ -0,0 +1,60 @@
+"""
+Compare seeding a database from a snapshot against populating it over HTTP.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_snapshot [--count 500]
+
+The HTTP path talks to a local stand-in for PokeAPI, so its numbers are a
+lower bound: real population also pays internet round trips.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.populate_db import populate_pokemon
+from app.snapshot import export_snapshot, import_snapshot
+from tests.pokeapi_stub import PokeAPIStub
+
+from .synthetic import synthetic_pokemon
+
+
+async def run(count: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp, PokeAPIStub(synthetic_pokemon(count)) as stub:
+        http_engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'http.db')}")
+        started = time.perf_counter()
+        await populate_pokemon(limit=count, engine=http_engine, base_url=stub.base_url)
+        http_elapsed = time.perf_counter() - started
+
+        path = os.path.join(tmp, "snapshot.json.gz")
+        await export_snapshot(path, http_engine)
+        await http_engine.dispose()
+
+        snapshot_engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'snapshot.db')}")
+        started = time.perf_counter()
+        await import_snapshot(path, snapshot_engine)
+        snapshot_elapsed = time.perf_counter() - started
+        await snapshot_engine.dispose()
+
+        size = os.path.getsize(path)
+
+    print(f"\n{count} Pokemon, snapshot size {size / 1024:.1f} KiB")
+    print(f"{'path':<10} {'seconds':>10} {'records/sec':>14}")
+    for name, elapsed in (("http", http_elapsed), ("snapshot", snapshot_elapsed)):
+        print(f"{name:<10} {elapsed:>10.3f} {count / elapsed:>14.1f}")
+    print(f"snapshot is {http_elapsed / snapshot_elapsed:.1f}x faster")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.count))
+
+
+if __name__ == "__main__":
+    main()
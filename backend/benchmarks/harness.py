@@ -0,0 +1,419 @@
+"""
+Load-test harness for the GraphQL API, with stored baselines and a
+regression gate.
+
+Seeds synthetic datasets of each size, then drives the API with concurrent
+clients, in-process through ASGI and over HTTP against a uvicorn server, and
+records throughput and p50/p95/p99 latency per operation. Each operation is
+measured against a freshly started app: warmed up with ``--warmup``
+unmeasured requests, then measured in ``--repeat`` rounds; each figure is the
+median of the rounds.
+
+Run from the backend directory:
+
+    python -m benchmarks.harness [--sizes 500,10000,100000] [--modes inprocess,uvicorn]
+    python -m benchmarks.harness --save     # write the results as the new baseline
+    python -m benchmarks.harness --check    # exit 1 if anything regressed past --threshold
+    python -m benchmarks.harness --modes uvicorn --workers 4   # scaling across processes
+
+Baselines are only comparable on the machine that recorded them, with the
+same --concurrency, --requests, --warmup and --repeat: on a small dataset the
+app's caches fill up as a run goes on, so longer runs report more throughput.
+--check refuses a baseline recorded elsewhere or with other settings; record
+one on the machine that gates with --save first.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+import httpx
+
+from .synthetic import TYPE_NAMES, synthetic_pokemon
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+PER_PAGE = 20
+
+OPERATIONS: typing.Dict[str, str] = {
+    "pokemonsPage": """
+        query Page($page: Int!, $perPage: Int!) {
+            pokemonsPage(page: $page, perPage: $perPage) {
+                items { id name imageUrl types { name } }
+                pageInfo { total lastPage }
+            }
+        }""",
+    "pokemonById": """
+        query ById($pokemonId: Int!) {
+            pokemonById(pokemonId: $pokemonId) { id name height weight imageUrl abilities cries types { name } }
+        }""",
+    "pokemonByName": """
+        query ByName($pokemonName: String!) {
+            pokemonByName(pokemonName: $pokemonName) { id name height weight imageUrl abilities cries types { name } }
+        }""",
+    "searchPokemons": """
+        query Search($types: [String!], $page: Int!) {
+            searchPokemons(types: $types, page: $page, perPage: 20) { items { id name } pageInfo { total } }
+        }""",
+}
+
+Stats = typing.Dict[str, float]
+Send = typing.Callable[[dict], typing.Awaitable[httpx.Response]]
+
+
+def make_variables(
+    operation: str, rng: random.Random, size: int, names: typing.Sequence[str]
+) -> typing.Dict[str, typing.Any]:
+    if operation == "pokemonsPage":
+        return {"page": rng.randint(1, max(1, size // PER_PAGE)), "perPage": PER_PAGE}
+    if operation == "pokemonById":
+        return {"pokemonId": rng.randint(1, size)}
+    if operation == "pokemonByName":
+        return {"pokemonName": rng.choice(names)}
+    return {"types": [rng.choice(TYPE_NAMES)], "page": rng.randint(1, 5)}
+
+
+def percentile(ordered: typing.Sequence[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_clients(
+    send: Send, operation: str, payloads: typing.Iterable[dict], concurrency: int
+) -> typing.List[float]:
+    """Send ``payloads`` from ``concurrency`` clients at once; returns each
+    request's latency in ms."""
+    latencies: typing.List[float] = []
+    pending = iter(payloads)
+
+    async def client() -> None:
+        for payload in pending:
+            started = time.perf_counter()
+            response = await send(payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            body = response.json()
+            if response.status_code != 200 or "errors" in body:
+                raise RuntimeError(f"{operation} failed: {response.status_code} {body}")
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+async def drive(send: Send, operation: str, payloads: typing.Sequence[dict], concurrency: int) -> Stats:
+    """Send ``payloads`` of ``operation`` from ``concurrency`` clients at
+    once; returns throughput and latency percentiles in ms."""
+    started = time.perf_counter()
+    latencies = await run_clients(send, operation, payloads, concurrency)
+    wall = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "rps": round(len(ordered) / wall, 1),
+        "p50": round(percentile(ordered, 0.50), 3),
+        "p95": round(percentile(ordered, 0.95), 3),
+        "p99": round(percentile(ordered, 0.99), 3),
+    }
+
+
+def median(runs: typing.Sequence[Stats]) -> Stats:
+    """Each metric's median across ``runs``."""
+    return {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+
+
+async def seed(path: str, size: int) -> None:
+    """Seed ``path`` with ``size`` synthetic Pokémon, unless it already is."""
+    from sqlalchemy import func, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.models.pokemon import Pokemon
+
+    from .synthetic import seed_database
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with engine.connect() as conn:
+            if (await conn.execute(select(func.count(Pokemon.id)))).scalar_one() == size:
+                return
+    except OperationalError:
+        pass
+    try:
+        started = time.perf_counter()
+        await seed_database(engine, size)
+        print(f"Seeded {size} Pokemon in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        await engine.dispose()
+
+
+def server_env(path: str) -> typing.Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite:///{path}",
+        # Serve the seeded data as is: no PokeAPI, no snapshot
+        POKEMON_LIMIT="0",
+        POKEMON_SNAPSHOT_PATH=os.path.join(os.path.dirname(path), "no-snapshot.json.gz"),
+        # Every simulated client shares one address
+        GRAPHQL_RATE_LIMIT="0",
+    )
+    return env
+
+
+async def measure(
+    send: Send,
+    operation: str,
+    size: int,
+    names: typing.Sequence[str],
+    concurrency: int,
+    requests: int,
+    warmup: int,
+    repeat: int,
+    seed: int = 0,
+) -> Stats:
+    """Warm ``operation`` up with ``warmup`` unmeasured requests, then
+    measure ``repeat`` rounds of ``requests`` and report the median of each
+    metric.
+
+    Every batch draws fresh variables from the same seeded stream, so the
+    warm-up opens connections and fills SQLAlchemy's statement cache without
+    answering the measured requests from the app's caches in advance.
+    """
+    rng = random.Random(seed)
+
+    def payloads(count: int) -> typing.List[dict]:
+        return [
+            {"query": OPERATIONS[operation], "variables": make_variables(operation, rng, size, names)}
+            for _ in range(count)
+        ]
+
+    await run_clients(send, operation, payloads(max(warmup, concurrency)), concurrency)
+    runs = [await drive(send, operation, payloads(requests), concurrency) for _ in range(max(1, repeat))]
+    return median(runs)
+
+
+async def run_inprocess_worker(
+    size: int, operation: str, concurrency: int, requests: int, warmup: int, repeat: int
+) -> None:
+    """Body of the subprocess that imports the app against its own database
+    (``DATABASE_URL`` is read at import time) and drives it through ASGI,
+    inside its lifespan as uvicorn would."""
+    from app.main import app
+
+    names = [p["name"] for p in synthetic_pokemon(size)]
+    async with app.router.lifespan_context(app), httpx.AsyncClient(app=app, base_url="http://harness") as client:
+        stats = await measure(
+            lambda payload: client.post("/graphql", json=payload),
+            operation, size, names, concurrency, requests, warmup, repeat,
+        )
+    print(json.dumps(stats))
+
+
+def run_inprocess(
+    path: str, size: int, operation: str, concurrency: int, requests: int, warmup: int, repeat: int
+) -> Stats:
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.harness", "--worker", "--operation", operation,
+            "--sizes", str(size), "--concurrency", str(concurrency), "--requests", str(requests),
+            "--warmup", str(warmup), "--repeat", str(repeat),
+        ],
+        cwd=BACKEND_DIR,
+        env=server_env(path),
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(
+    path: str,
+    size: int,
+    operation: str,
+    concurrency: int,
+    requests: int,
+    warmup: int,
+    repeat: int,
+    workers: int = 1,
+) -> Stats:
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log",
+            "--workers", str(workers),
+        ],
+        cwd=BACKEND_DIR,
+        env=server_env(path),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            for _ in range(300):
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            names = [p["name"] for p in synthetic_pokemon(size)]
+            return await measure(
+                lambda payload: client.post("/graphql", json=payload),
+                operation, size, names, concurrency, requests, warmup, repeat,
+            )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(
+    results: typing.Dict[str, Stats],
+    baseline: typing.Dict[str, Stats],
+    threshold: float,
+    min_delta_ms: float,
+) -> typing.List[str]:
+    """Regressions of ``results`` against ``baseline``: p95 latency up, or
+    throughput down, by more than ``threshold`` (a fraction). Latency changes
+    under ``min_delta_ms`` are ignored as noise."""
+    regressions = []
+    for key, stats in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if stats["p95"] > base["p95"] * (1 + threshold) and stats["p95"] - base["p95"] > min_delta_ms:
+            regressions.append(f"{key}: p95 {base['p95']:.2f} -> {stats['p95']:.2f} ms")
+        if stats["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{key}: throughput {base['rps']:.0f} -> {stats['rps']:.0f} req/s")
+    return regressions
+
+
+def print_results(results: typing.Dict[str, Stats], baseline: typing.Dict[str, Stats]) -> None:
+    print(f"{'mode/size/operation':<38} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'p95 vs base':>12}")
+    for key, stats in sorted(results.items()):
+        base = baseline.get(key)
+        change = f"{(stats['p95'] / base['p95'] - 1) * 100:+.0f}%" if base else "-"
+        print(
+            f"{key:<38} {stats['rps']:>8.0f} {stats['p50']:>8.2f} "
+            f"{stats['p95']:>8.2f} {stats['p99']:>8.2f} {change:>12}"
+        )
+
+
+def run_meta(args: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    """What a baseline was recorded on and with."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+    }
+
+
+def mismatched_meta(meta: typing.Dict[str, typing.Any], baseline_meta: typing.Dict[str, typing.Any]) -> typing.List[str]:
+    """Keys of ``meta`` the baseline was recorded with other values of."""
+    return [key for key, value in meta.items() if baseline_meta.get(key) != value]
+
+
+async def run(args: argparse.Namespace) -> int:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    modes = args.modes.split(",")
+    data_dir = args.data_dir or tempfile.mkdtemp()
+    os.makedirs(data_dir, exist_ok=True)
+
+    results: typing.Dict[str, Stats] = {}
+    for size in sizes:
+        path = os.path.join(data_dir, f"pokemon_{size}.db")
+        await seed(path, size)
+        for mode in modes:
+            print(f"Running {mode} against {size} Pokemon...", file=sys.stderr)
+            if mode not in ("inprocess", "uvicorn"):
+                raise SystemExit(f"Unknown mode: {mode}")
+            label = f"uvicorn-{args.workers}w" if mode == "uvicorn" and args.workers > 1 else mode
+            # A fresh app per operation: lookups by id fill the caches lookups
+            # by name read from, so sharing one would flatter whichever ran later
+            for operation in OPERATIONS:
+                settings = (args.concurrency, args.requests, args.warmup, args.repeat)
+                if mode == "inprocess":
+                    stats = run_inprocess(path, size, operation, *settings)
+                else:
+                    stats = await run_uvicorn(path, size, operation, *settings, workers=args.workers)
+                results[f"{label}/{size}/{operation}"] = stats
+
+    baseline: typing.Dict[str, Stats] = {}
+    baseline_meta: typing.Dict[str, typing.Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            stored = json.load(file)
+        baseline, baseline_meta = stored["results"], stored.get("meta", {})
+    print_results(results, baseline)
+
+    meta = run_meta(args)
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump({"meta": meta, "results": {**baseline, **results}}, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+
+    if args.check:
+        mismatched = mismatched_meta(meta, baseline_meta)
+        if mismatched:
+            print(f"Baseline not comparable, recorded with different {', '.join(mismatched)}; re-record it with --save")
+            return 2
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="500,10000,100000")
+    parser.add_argument("--modes", default="inprocess,uvicorn")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="per operation")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests per operation first")
+    parser.add_argument("--repeat", type=int, default=3, help="measured rounds; the median is reported")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--data-dir", help="keep seeded databases here and reuse them")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p95 changes below this")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--operation", choices=OPERATIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(
+            run_inprocess_worker(
+                int(args.sizes), args.operation, args.concurrency, args.requests, args.warmup, args.repeat
+            )
+        )
+        return
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
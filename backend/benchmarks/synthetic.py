@@ -0,0 +1,63 @@
+"""Synthetic PokeAPI-shaped datasets for benchmarks."""
+import random
+import typing
+
+from tests.pokeapi_stub import make_pokemon
+
+TYPE_NAMES = [
+    "normal", "fire", "water", "electric", "grass", "ice", "fighting", "poison", "ground",
+    "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy",
+]
+
+SYLLABLES = [
+    "pi", "ka", "chu", "bul", "ba", "saur", "char", "man", "der", "squir", "tle", "ee", "vee",
+    "mew", "two", "gen", "gar", "on", "ix", "dra", "go", "nite", "lu", "gia", "ho", "oh", "zap",
+    "dos", "mol", "tres", "snor", "lax", "jig", "gly", "puff", "mag", "ma", "rill", "to", "ge",
+]
+
+ABILITY_NAMES = ["overgrow", "blaze", "torrent", "static", "levitate", "intimidate", "swift-swim", "sturdy"]
+
+
+def synthetic_name(rng: random.Random, taken: typing.Set[str]) -> str:
+    # Pronounceable names, so name search behaves like it does on real data
+    while True:
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if name not in taken:
+            taken.add(name)
+            return name
+
+
+def synthetic_pokemon(count: int, seed: int = 0) -> typing.List[dict]:
+    rng = random.Random(seed)
+    taken: typing.Set[str] = set()
+    pokemon = []
+    for pokemon_id in range(1, count + 1):
+        types = rng.sample(TYPE_NAMES, rng.choice((1, 2)))
+        abilities = rng.sample(ABILITY_NAMES, rng.choice((1, 2, 3)))
+        pokemon_data = make_pokemon(pokemon_id, synthetic_name(rng, taken), types, abilities)
+        pokemon_data["height"] = rng.randint(1, 200)
+        pokemon_data["weight"] = rng.randint(1, 10000)
+        pokemon.append(pokemon_data)
+    return pokemon
+
+
+async def seed_database(engine, count: int, seed: int = 0) -> None:
+    """Bulk insert ``count`` synthetic Pokémon straight into ``engine``."""
+    from sqlalchemy import insert
+
+    from app.database import Base
+    from app.ingest import parse_pokemon, table_rows
+    from app.models.pokemon import Ability, Type
+
+    records = [parse_pokemon(p) for p in synthetic_pokemon(count, seed)]
+    type_ids = {name: i for i, name in enumerate(TYPE_NAMES, start=1)}
+    ability_ids = {name: i for i, name in enumerate(ABILITY_NAMES, start=1)}
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Type), [{"id": i, "name": name} for name, i in type_ids.items()])
+        await conn.execute(insert(Ability), [{"id": i, "name": name} for name, i in ability_ids.items()])
+        for start in range(0, len(records), 5000):
+            for table, rows in table_rows(records[start:start + 5000], type_ids, ability_ids):
+                if rows:
+                    await conn.execute(insert(table), rows)
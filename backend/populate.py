@@ -1,5 +1,4 @@
-from app.populate_db import populate_pokemon
-import asyncio
+from app.populate_db import main
 
 if __name__ == "__main__":
-    asyncio.run(populate_pokemon()) 
\ No newline at end of file
+    main()
@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+# Point the application at the test database before ``app`` is imported.
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_pokemon.db")
+# Tests fire requests far faster than any client should
+os.environ.setdefault("GRAPHQL_RATE_LIMIT", "0")
+
+from httpx import AsyncClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.cache import invalidate_caches  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models.pokemon import Pokemon, Type, pokemon_type  # noqa: E402
+from pokeapi_stub import CANNED_POKEMON, PokeAPIStub  # noqa: E402
+
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite+aiosqlite:///./test_pokemon.db"
+engine = create_async_engine(TEST_DATABASE_URL)
+async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+POKEMON = [
+    # id, name, height, weight, types
+    (1, "bulbasaur", 7, 69, ["grass", "poison"]),
+    (2, "ivysaur", 10, 130, ["grass", "poison"]),
+    (4, "charmander", 6, 85, ["fire"]),
+    (5, "charmeleon", 11, 190, ["fire"]),
+    (6, "charizard", 17, 905, ["fire", "flying"]),
+    (16, "pidgey", 3, 18, ["normal", "flying"]),
+    (25, "pikachu", 4, 60, ["electric"]),
+]
+
+
+@pytest.fixture
+async def setup_database():
+    # Create tables
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Add test data
+    async with async_session() as session:
+        # Create a type
+        fire_type = Type(id=1, name="fire")
+        session.add(fire_type)
+        
+        # Create a Pokemon
+        charmander = Pokemon(
+            id=4,
+            name="charmander",
+            height=6,
+            weight=85,
+            image_url="https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/4.png"
+        )
+        charmander.types.append(fire_type)
+        session.add(charmander)
+        
+        await session.commit()
+    
+    yield
+    
+    # Clean up
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+@pytest.fixture
+def db_engine():
+    """The engine of the app's test database."""
+    return engine
+
+
+@pytest.fixture
+async def seed_database():
+    """Recreate the test database with the given rows.
+
+    Call the returned function with ``(table, rows)`` pairs in foreign key
+    order; with none, it leaves the schema empty. Everything is dropped
+    afterwards.
+    """
+    async def seed(*tables):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            for table, rows in tables:
+                if rows:
+                    await conn.execute(insert(table), rows)
+        invalidate_caches()
+
+    yield seed
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+@pytest.fixture
+async def pokedex(seed_database):
+    """The ``POKEMON`` rows, for search and listing tests."""
+    type_ids = {}
+    for _, _, _, _, types in POKEMON:
+        for name in types:
+            type_ids.setdefault(name, len(type_ids) + 1)
+    await seed_database(
+        (Type, [{"id": i, "name": name} for name, i in type_ids.items()]),
+        (
+            Pokemon,
+            [
+                {"id": i, "name": name, "height": h, "weight": w, "image_url": f"{i}.png"}
+                for i, name, h, w, _ in POKEMON
+            ],
+        ),
+        (pokemon_type, [{"pokemon_id": i, "type_id": type_ids[t]} for i, _, _, _, types in POKEMON for t in types]),
+    )
+
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Tests write to the database directly, bypassing the populator
+    invalidate_caches()
+    yield
+    invalidate_caches()
+
+
+@pytest.fixture
+def pokeapi_server():
+    with PokeAPIStub(CANNED_POKEMON) as stub:
+        yield stub
@@ -0,0 +1,19 @@
+"""Helpers shared by test modules. Fixtures live in conftest.py."""
+import re
+
+
+async def search(client, arguments):
+    query = "{ searchPokemons(%s) { items { name } pageInfo { total lastPage } } }" % arguments
+    response = await client.post("/graphql", json={"query": query})
+    body = response.json()
+    assert "errors" not in body, body
+    result = body["data"]["searchPokemons"]
+    return [item["name"] for item in result["items"]], result["pageInfo"]["total"]
+
+
+def sample(text, name, **labels):
+    """The value of one series in a Prometheus text exposition, or None."""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = "^" + re.escape(name) + (r"\{" + re.escape(wanted) + r"\}" if labels else "") + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
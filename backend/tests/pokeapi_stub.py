@@ -0,0 +1,223 @@
+"""A local stand-in for pokeapi.co, shared by the tests and benchmarks."""
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_pokemon(pokemon_id, name, types, abilities=("overgrow",), hidden=()):
+    """Build a trimmed down PokeAPI ``pokemon`` resource; ``hidden``
+    abilities take the slots after ``abilities``."""
+    return {
+        "id": pokemon_id,
+        "name": name,
+        "height": pokemon_id * 2,
+        "weight": pokemon_id * 10,
+        "sprites": {
+            "other": {
+                "official-artwork": {
+                    "front_default": f"https://img.example/{pokemon_id}.png"
+                }
+            }
+        },
+        "abilities": [
+            {"ability": {"name": a}, "slot": i + 1, "is_hidden": a in hidden}
+            for i, a in enumerate(list(abilities) + list(hidden))
+        ],
+        "cries": {
+            "latest": f"https://cries.example/{pokemon_id}.ogg",
+            "legacy": f"https://cries.example/legacy/{pokemon_id}.ogg" if pokemon_id < 151 else None,
+        },
+        "types": [{"slot": i + 1, "type": {"name": t}} for i, t in enumerate(types)],
+    }
+
+
+CANNED_POKEMON = [
+    make_pokemon(1, "bulbasaur", ["grass", "poison"]),
+    make_pokemon(4, "charmander", ["fire"], ["blaze"]),
+    make_pokemon(7, "squirtle", ["water"], ["torrent"]),
+    make_pokemon(25, "pikachu", ["electric"], ["static"]),
+    make_pokemon(133, "eevee", ["normal"], ["run-away", "adaptability"], hidden=["anticipation"]),
+]
+
+
+# Attacking type -> (double damage to, half damage to, no damage to)
+TYPE_CHART = {
+    "normal": ((), ("rock", "steel"), ("ghost",)),
+    "fighting": (("normal", "ice", "rock", "dark", "steel"), ("poison", "flying", "psychic", "bug", "fairy"), ("ghost",)),
+    "flying": (("grass", "fighting", "bug"), ("electric", "rock", "steel"), ()),
+    "poison": (("grass", "fairy"), ("poison", "ground", "rock", "ghost"), ("steel",)),
+    "ground": (("fire", "electric", "poison", "rock", "steel"), ("grass", "bug"), ("flying",)),
+    "rock": (("fire", "ice", "flying", "bug"), ("fighting", "ground", "steel"), ()),
+    "bug": (("grass", "psychic", "dark"), ("fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"), ()),
+    "ghost": (("psychic", "ghost"), ("dark",), ("normal",)),
+    "steel": (("ice", "rock", "fairy"), ("fire", "water", "electric", "steel"), ()),
+    "fire": (("grass", "ice", "bug", "steel"), ("fire", "water", "rock", "dragon"), ()),
+    "water": (("fire", "ground", "rock"), ("water", "grass", "dragon"), ()),
+    "grass": (("water", "ground", "rock"), ("fire", "grass", "poison", "flying", "bug", "dragon", "steel"), ()),
+    "electric": (("water", "flying"), ("electric", "grass", "dragon"), ("ground",)),
+    "psychic": (("fighting", "poison"), ("psychic", "steel"), ("dark",)),
+    "ice": (("grass", "ground", "flying", "dragon"), ("fire", "water", "ice", "steel"), ()),
+    "dragon": (("dragon",), ("steel",), ("fairy",)),
+    "dark": (("psychic", "ghost"), ("fighting", "dark", "fairy"), ()),
+    "fairy": (("fighting", "dragon", "dark"), ("fire", "poison", "steel"), ()),
+    # Listed by PokeAPI, but no Pokémon has it and it has no relations
+    "unknown": ((), (), ()),
+}
+
+
+def make_type(type_id, name):
+    """Build a trimmed down PokeAPI ``type`` resource from ``TYPE_CHART``."""
+    double, half, none = TYPE_CHART[name]
+
+    def refs(names):
+        return [{"name": n, "url": f"https://pokeapi.example/type/{n}/"} for n in names]
+
+    return {
+        "id": type_id,
+        "name": name,
+        "damage_relations": {
+            "double_damage_to": refs(double),
+            "half_damage_to": refs(half),
+            "no_damage_to": refs(none),
+            # Only the "_to" side is read; the "_from" side is its transpose
+            "double_damage_from": [],
+            "half_damage_from": [],
+            "no_damage_from": [],
+        },
+    }
+
+
+CANNED_TYPES = [make_type(i, name) for i, name in enumerate(TYPE_CHART, start=1)]
+
+
+# Evolution chain id -> (species id, name, evolves from, trigger, min level,
+# item), depth first
+EVOLUTIONS = {
+    1: [(1, "bulbasaur", None, None, None, None), (2, "ivysaur", 1, "level-up", 16, None), (3, "venusaur", 2, "level-up", 32, None)],
+    2: [(4, "charmander", None, None, None, None), (5, "charmeleon", 4, "level-up", 16, None), (6, "charizard", 5, "level-up", 36, None)],
+    3: [(7, "squirtle", None, None, None, None), (8, "wartortle", 7, "level-up", 16, None), (9, "blastoise", 8, "level-up", 36, None)],
+    10: [(172, "pichu", None, None, None, None), (25, "pikachu", 172, "level-up", None, None), (26, "raichu", 25, "use-item", None, "thunder-stone")],
+    67: [
+        (133, "eevee", None, None, None, None),
+        (134, "vaporeon", 133, "use-item", None, "water-stone"),
+        (135, "jolteon", 133, "use-item", None, "thunder-stone"),
+        (136, "flareon", 133, "use-item", None, "fire-stone"),
+    ],
+}
+
+
+def make_evolution_chain(chain_id, species):
+    """Build a trimmed down PokeAPI ``evolution-chain`` resource from one of
+    ``EVOLUTIONS``."""
+    links = {}
+    for species_id, name, evolves_from, trigger, min_level, item in species:
+        details = []
+        if trigger:
+            details.append({
+                "trigger": {"name": trigger},
+                "min_level": min_level,
+                "item": {"name": item} if item else None,
+            })
+        links[species_id] = {
+            "species": {"name": name, "url": f"https://pokeapi.example/pokemon-species/{species_id}/"},
+            "evolution_details": details,
+            "evolves_to": [],
+        }
+        if evolves_from is not None:
+            links[evolves_from]["evolves_to"].append(links[species_id])
+    return {"id": chain_id, "chain": links[species[0][0]]}
+
+
+class PokeAPIStub:
+    """A local stand-in for pokeapi.co serving canned JSON."""
+
+    def __init__(self, pokemon, types=CANNED_TYPES, evolutions=EVOLUTIONS):
+        self.pokemon = {p["id"]: p for p in pokemon}
+        self.types = {t["name"]: t for t in types}
+        self.chains = {i: make_evolution_chain(i, species) for i, species in evolutions.items()}
+        # Species id -> (name, chain id)
+        self.species = {s[0]: (s[1], i) for i, species in evolutions.items() for s in species}
+        # Number of 503s to answer before serving a path, to exercise retries
+        self.failures = {}
+        self.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/api/v2/"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                remaining = stub.failures.get(self.path, 0)
+                if remaining:
+                    stub.failures[self.path] = remaining - 1
+                    self._send(503, {"detail": "try again"})
+                    return
+                status, body = stub.route(self.path)
+                self._send(status, body, self.headers.get("If-None-Match"))
+
+            def _send(self, status, body, if_none_match=None):
+                payload = json.dumps(body).encode()
+                etag = '"%s"' % hashlib.md5(payload).hexdigest()
+                if status == 200 and if_none_match == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def route(self, path):
+        path, _, query = path.partition("?")
+        parts = [p for p in path.split("/") if p]
+        if parts[-1] == "pokemon":
+            params = dict(p.split("=") for p in query.split("&") if p)
+            limit = int(params.get("limit", 20))
+            ids = sorted(self.pokemon)[:limit]
+            return 200, {
+                "count": len(self.pokemon),
+                "results": [
+                    {"name": self.pokemon[i]["name"], "url": f"{self.base_url}pokemon/{i}/"}
+                    for i in ids
+                ],
+            }
+        if parts[-2] == "pokemon" and int(parts[-1]) in self.pokemon:
+            return 200, self.pokemon[int(parts[-1])]
+        if parts[-1] == "type":
+            return 200, {
+                "count": len(self.types),
+                "results": [{"name": name, "url": f"{self.base_url}type/{name}/"} for name in self.types],
+            }
+        if parts[-2] == "type" and parts[-1] in self.types:
+            return 200, self.types[parts[-1]]
+        if parts[-2] == "pokemon-species" and int(parts[-1]) in self.species:
+            name, chain_id = self.species[int(parts[-1])]
+            return 200, {
+                "id": int(parts[-1]),
+                "name": name,
+                "evolution_chain": {"url": f"{self.base_url}evolution-chain/{chain_id}/"},
+            }
+        if parts[-2] == "evolution-chain" and int(parts[-1]) in self.chains:
+            return 200, self.chains[int(parts[-1])]
+        return 404, {"detail": "Not found."}
+
+    def __enter__(self):
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
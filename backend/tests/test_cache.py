@@ -0,0 +1,55 @@
+import time
+
+from app.cache import MISSING, LRUCache, invalidate_caches, pokemon_detail_cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache("test", maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.hits == 3
+    assert cache.misses == 1
+
+
+def test_ttl_expires_entries():
+    cache = LRUCache("test", maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is MISSING
+
+
+def test_set_ignores_results_loaded_before_invalidation():
+    cache = LRUCache("test")
+    generation = cache.generation
+    invalidate_caches()
+    cache.set("a", 1, generation)
+    assert cache.get("a") is MISSING
+
+
+async def test_detail_lookups_share_cache_entries(client, setup_database):
+    query = """
+    query {
+        pokemonById(pokemonId: 4) { id name types { name } }
+    }
+    """
+    hits, misses = pokemon_detail_cache.hits, pokemon_detail_cache.misses
+    response = await client.post("/graphql", json={"query": query})
+    assert response.json()["data"]["pokemonById"]["name"] == "charmander"
+    assert pokemon_detail_cache.misses == misses + 1
+
+    query = """
+    query {
+        pokemonByName(pokemonName: "charmander") { id types { name } }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+    assert response.json()["data"]["pokemonByName"]["id"] == 4
+    assert pokemon_detail_cache.hits == hits + 1
+    assert pokemon_detail_cache.misses == misses + 1
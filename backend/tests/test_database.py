@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import get_engine, get_read_engine, pool_status, warm_engines
+
+
+async def test_engines_use_wal_and_read_pool_is_read_only(setup_database):
+    await warm_engines()
+
+    async with get_engine().connect() as connection:
+        assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        assert (await connection.execute(text("PRAGMA query_only"))).scalar() == 0
+
+    assert get_read_engine() is not get_engine()
+    async with get_read_engine().connect() as connection:
+        assert (await connection.execute(text("PRAGMA query_only"))).scalar() == 1
+        assert (await connection.execute(text("SELECT COUNT(*) FROM pokemons"))).scalar() == 1
+        with pytest.raises(OperationalError):
+            await connection.execute(text("DELETE FROM pokemons"))
+
+
+def test_pool_status_reports_both_pools():
+    status = pool_status()
+    assert set(status) == {"write", "read"}
+    assert "Pool size" in status["read"]
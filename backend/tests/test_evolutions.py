@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import event
+
+from app.cache import invalidate_caches
+from app.database import get_read_engine
+from app.ingest import PokemonIngester, parse_evolution_chain
+from pokeapi_stub import EVOLUTIONS, PokeAPIStub, make_evolution_chain, make_pokemon
+
+
+def test_chains_are_flattened_with_closure_pairs():
+    species, closure = parse_evolution_chain(make_evolution_chain(10, EVOLUTIONS[10]))
+
+    assert [(s["id"], s["position"], s["stage"], s["evolves_from_id"]) for s in species] == [
+        (172, 0, 0, None),
+        (25, 1, 1, 172),
+        (26, 2, 2, 25),
+    ]
+    assert species[2]["trigger"] == "use-item" and species[2]["item"] == "thunder-stone"
+    assert sorted((c["ancestor_id"], c["descendant_id"], c["distance"]) for c in closure) == [
+        (25, 26, 1),
+        (172, 25, 1),
+        (172, 26, 2),
+    ]
+
+
+@pytest.fixture
+async def evolutions(seed_database, db_engine):
+    """Bulbasaur's line and Eevee, ingested from the stub into the app's database."""
+    pokemon = [
+        make_pokemon(1, "bulbasaur", ["grass", "poison"]),
+        make_pokemon(2, "ivysaur", ["grass", "poison"]),
+        make_pokemon(3, "venusaur", ["grass", "poison"]),
+        make_pokemon(133, "eevee", ["normal"]),
+    ]
+    await seed_database()
+    with PokeAPIStub(pokemon) as stub:
+        await PokemonIngester(db_engine, base_url=stub.base_url, concurrency=1).run(limit=4)
+    invalidate_caches()
+    return stub
+
+
+async def test_species_of_a_fetched_chain_are_not_fetched_again(evolutions, db_engine):
+    species_requests = [path for path in evolutions.requests if "pokemon-species" in path]
+    assert species_requests == ["/api/v2/pokemon-species/1/", "/api/v2/pokemon-species/133/"]
+
+    ingester = PokemonIngester(db_engine, base_url=evolutions.base_url)
+    assert await ingester.species_without_chains() == []
+
+
+async def graphql(client, query):
+    response = await client.post("/graphql", json={"query": query})
+    body = response.json()
+    assert "errors" not in body, body
+    return body["data"]
+
+
+async def test_evolution_chain(client, evolutions):
+    data = await graphql(
+        client, "{ evolutionChain(pokemonId: 134) { id stages { id name stage evolvesFromId item pokemon { name } } } }"
+    )
+
+    chain = data["evolutionChain"]
+    assert chain["id"] == 67
+    assert [stage["name"] for stage in chain["stages"]] == ["eevee", "vaporeon", "jolteon", "flareon"]
+    assert chain["stages"][1] == {
+        "id": 134,
+        "name": "vaporeon",
+        "stage": 1,
+        "evolvesFromId": 133,
+        "item": "water-stone",
+        # Only Eevee itself is stored
+        "pokemon": None,
+    }
+    assert chain["stages"][0]["pokemon"] == {"name": "eevee"}
+    assert (await graphql(client, "{ evolutionChain(pokemonId: 4) { id } }"))["evolutionChain"] is None
+
+
+async def test_pre_evolutions_and_evolutions(client, evolutions):
+    data = await graphql(
+        client,
+        """{
+            before: preEvolutions(pokemonId: 3) { name minLevel }
+            after: evolvesTo(pokemonId: 1) { name stage }
+            last: evolvesTo(pokemonId: 3) { name }
+        }""",
+    )
+
+    assert data["before"] == [{"name": "bulbasaur", "minLevel": None}, {"name": "ivysaur", "minLevel": 16}]
+    assert data["after"] == [{"name": "ivysaur", "stage": 1}, {"name": "venusaur", "stage": 2}]
+    assert data["last"] == []
+
+
+async def test_each_lookup_is_one_query(client, evolutions):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(get_read_engine().sync_engine, "before_cursor_execute", record)
+    try:
+        fields = (
+            "evolutionChain(pokemonId: 2) { stages { name } }",
+            "preEvolutions(pokemonId: 2) { name }",
+            "evolvesTo(pokemonId: 2) { name }",
+        )
+        for field in fields:
+            statements.clear()
+            await graphql(client, f"{{ {field} }}")
+            assert len(statements) == 1, statements
+            # Cached afterwards, until the dataset changes
+            await graphql(client, f"{{ {field} }}")
+            assert len(statements) == 1
+    finally:
+        event.remove(get_read_engine().sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,44 @@
+from benchmarks.harness import compare, median, mismatched_meta
+
+BASELINE = {
+    "inprocess/500/pokemonById": {"rps": 300.0, "p50": 10.0, "p95": 20.0, "p99": 30.0},
+    "inprocess/500/pokemonsPage": {"rps": 100.0, "p50": 0.3, "p95": 0.5, "p99": 0.9},
+}
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    results = {
+        "inprocess/500/pokemonById": {"rps": 200.0, "p50": 10.0, "p95": 26.0, "p99": 30.0},
+        # Doubled, but by less than the noise floor
+        "inprocess/500/pokemonsPage": {"rps": 100.0, "p50": 0.6, "p95": 1.0, "p99": 1.5},
+        "uvicorn/500/pokemonById": {"rps": 1.0, "p50": 900.0, "p95": 900.0, "p99": 900.0},
+    }
+
+    regressions = compare(results, BASELINE, threshold=0.25, min_delta_ms=1.0)
+
+    assert regressions == [
+        "inprocess/500/pokemonById: p95 20.00 -> 26.00 ms",
+        "inprocess/500/pokemonById: throughput 300 -> 200 req/s",
+    ]
+
+
+def test_compare_passes_within_threshold():
+    results = {key: dict(stats, p95=stats["p95"] * 1.2, rps=stats["rps"] * 0.8) for key, stats in BASELINE.items()}
+    assert compare(results, BASELINE, threshold=0.25, min_delta_ms=1.0) == []
+
+
+def test_median_takes_each_metric_across_rounds():
+    runs = [
+        {"rps": 250.0, "p50": 12.0, "p95": 40.0, "p99": 50.0},
+        {"rps": 300.0, "p50": 10.0, "p95": 90.0, "p99": 95.0},
+        {"rps": 100.0, "p50": 11.0, "p95": 60.0, "p99": 70.0},
+    ]
+    assert median(runs) == {"rps": 250.0, "p50": 11.0, "p95": 60.0, "p99": 70.0}
+
+
+def test_baselines_from_elsewhere_are_not_comparable():
+    meta = {"platform": "Linux-x86_64", "cpus": 8, "requests": 400}
+    assert mismatched_meta(meta, dict(meta)) == []
+    assert mismatched_meta(meta, dict(meta, cpus=2, requests=200)) == ["cpus", "requests"]
+    # Baselines recorded before the meta grew a key don't match either
+    assert mismatched_meta(meta, {"platform": "Linux-x86_64", "requests": 400}) == ["cpus"]
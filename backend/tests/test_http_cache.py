@@ -0,0 +1,62 @@
+from app.cache import invalidate_caches
+from app.dataset import bump_dataset_version, get_dataset_version
+
+LIST_QUERY = "{ pokemons { id name } }"
+DETAIL_QUERY = "{ pokemonById(pokemonId: 4) { name } }"
+
+
+async def test_get_query_is_cacheable(client, setup_database):
+    response = await client.get("/graphql", params={"query": LIST_QUERY})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["pokemons"][0]["name"] == "charmander"
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert response.headers["etag"].startswith('"')
+
+    detail = await client.get("/graphql", params={"query": DETAIL_QUERY})
+    assert detail.headers["cache-control"] == "public, max-age=300"
+    assert detail.headers["etag"] != response.headers["etag"]
+
+    # An operation gets the shortest max-age among its root fields
+    both = await client.get("/graphql", params={"query": "{ pokemonById(pokemonId: 4) { name } pokemons { id } }"})
+    assert both.headers["cache-control"] == "public, max-age=60"
+
+
+async def test_matching_if_none_match_returns_304(client, setup_database):
+    first = await client.get("/graphql", params={"query": LIST_QUERY})
+    etag = first.headers["etag"]
+
+    second = await client.get("/graphql", params={"query": LIST_QUERY}, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+    weak = await client.get("/graphql", params={"query": LIST_QUERY}, headers={"If-None-Match": f'"other", W/{etag}'})
+    assert weak.status_code == 304
+
+
+async def test_etag_changes_with_dataset_version(client, setup_database, db_engine):
+    first = await client.get("/graphql", params={"query": LIST_QUERY})
+    version = await get_dataset_version()
+
+    async with db_engine.begin() as conn:
+        await bump_dataset_version(conn)
+    invalidate_caches()
+    assert await get_dataset_version() == version + 1
+
+    second = await client.get(
+        "/graphql", params={"query": LIST_QUERY}, headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+async def test_post_and_failed_queries_are_not_cached(client, setup_database):
+    post = await client.post("/graphql", json={"query": LIST_QUERY})
+    assert post.status_code == 200
+    assert "etag" not in post.headers
+    assert "cache-control" not in post.headers
+
+    failed = await client.get("/graphql", params={"query": "{ pokemons { nope } }"})
+    assert "errors" in failed.json()
+    assert "etag" not in failed.headers
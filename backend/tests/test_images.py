@@ -0,0 +1,167 @@
+import asyncio
+import io
+import os
+
+import httpx
+import pytest
+from PIL import Image
+
+from app import images
+from app.images import ImageError, ImageStore, ZeroCopyFileResponse, prewarm
+
+ARTWORK_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/4.png"
+# Not a decodable PNG; enough for everything but resizing
+PNG = b"\x89PNG\r\n\x1a\nnot really a png"
+
+
+def artwork(width, height):
+    """A real PNG of the given size, with transparency as in the artwork."""
+    output = io.BytesIO()
+    Image.new("RGBA", (width, height), (240, 128, 48, 255)).save(output, "PNG")
+    return output.getvalue()
+
+
+class Upstream:
+    """Serves ``content`` (``PNG`` by default) for every URL unless told
+    otherwise, counting requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.content = PNG
+        self.status = 200
+        self.content_type = "image/png"
+
+    async def __call__(self, request):
+        self.requests.append(str(request.url))
+        # Let concurrent callers pile up behind the first fetch
+        await asyncio.sleep(0.01)
+        return httpx.Response(self.status, content=self.content, headers={"Content-Type": self.content_type})
+
+
+@pytest.fixture
+async def upstream(tmp_path, monkeypatch):
+    handler = Upstream()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    store = ImageStore(str(tmp_path / "images"), client=client)
+    monkeypatch.setattr(images, "store", store)
+    handler.store = store
+    yield handler
+    await store.close()
+
+
+async def test_concurrent_requests_share_one_fetch(upstream):
+    blobs = await asyncio.gather(*(upstream.store.get(ARTWORK_URL) for _ in range(10)))
+
+    assert len(upstream.requests) == 1
+    assert len({blob.digest for blob in blobs}) == 1
+    with open(blobs[0].path, "rb") as file:
+        assert file.read() == PNG
+    # Cached on disk: a fresh store over the same directory doesn't fetch
+    again = await ImageStore(upstream.store.root).get(ARTWORK_URL)
+    assert again == blobs[0]
+
+
+async def test_identical_images_are_stored_once(upstream):
+    first = await upstream.store.get("https://img.example/1.png")
+    second = await upstream.store.get("https://img.example/2.png")
+
+    assert first.path == second.path
+    blobs = [name for _, _, files in os.walk(os.path.join(upstream.store.root, "blobs")) for name in files]
+    assert len(blobs) == 1
+
+
+async def test_variants_are_resized_to_webp(client, setup_database, upstream):
+    upstream.content = artwork(475, 380)
+
+    response = await client.get("/images/4/thumb")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    with Image.open(io.BytesIO(response.content)) as thumb:
+        assert thumb.format == "WEBP"
+        # Scaled to fit, keeping the aspect ratio
+        assert thumb.size == (96, 77)
+
+    small = await upstream.store.get(ARTWORK_URL, "small")
+    with Image.open(small.path) as image:
+        assert image.size == (240, 192)
+    # Both variants were cut from one fetch of the original
+    assert upstream.requests == [ARTWORK_URL]
+
+
+async def test_variants_fall_back_to_the_original_without_pillow(upstream, monkeypatch):
+    monkeypatch.setattr(images, "pillow_image", lambda: None)
+    original = await upstream.store.get(ARTWORK_URL)
+    thumb = await upstream.store.get(ARTWORK_URL, "thumb")
+
+    assert thumb == original
+    assert len(upstream.requests) == 1
+
+
+async def test_rejects_upstream_errors_and_non_images(upstream):
+    upstream.status = 404
+    with pytest.raises(ImageError):
+        await upstream.store.get("https://img.example/missing.png")
+
+    upstream.status = 200
+    upstream.content_type = "text/html"
+    with pytest.raises(ImageError):
+        await upstream.store.get("https://img.example/page.png")
+    assert upstream.store.lookup("https://img.example/page.png", "original") is None
+
+
+async def test_serves_cached_image_with_etag(client, setup_database, upstream):
+    response = await client.get("/images/4/original")
+    assert response.status_code == 200
+    assert response.content == PNG
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"] == f"public, max-age={images.IMAGE_MAX_AGE}"
+    assert upstream.requests == [ARTWORK_URL]
+
+    etag = response.headers["etag"]
+    revalidated = await client.get("/images/4/original", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert len(upstream.requests) == 1
+
+
+async def test_image_errors(client, setup_database, upstream):
+    assert (await client.get("/images/4/huge")).status_code == 404
+    assert (await client.get("/images/9999/thumb")).status_code == 404
+
+    upstream.status = 500
+    assert (await client.get("/images/4/thumb")).status_code == 502
+
+
+async def test_image_url_size_argument(client, setup_database):
+    query = "{ pokemonById(pokemonId: 4) { imageUrl thumb: imageUrl(size: THUMB) } }"
+    response = await client.post("/graphql", json={"query": query})
+
+    data = response.json()["data"]["pokemonById"]
+    assert data["imageUrl"] == ARTWORK_URL
+    assert data["thumb"] == "/images/4/thumb"
+
+
+async def test_zero_copy_send_hands_over_the_file(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(PNG)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    await ZeroCopyFileResponse(str(path), media_type="image/png")(scope, None, send)
+
+    start, body = messages
+    assert (b"content-length", str(len(PNG)).encode()) in start["headers"]
+    assert body["type"] == "http.response.zerocopysend"
+    assert body["count"] == len(PNG)
+    assert body["file"].closed
+
+
+async def test_prewarm_fetches_every_stored_artwork(setup_database, upstream):
+    failed = await prewarm(["original"], upstream.store)
+
+    assert failed == 0
+    assert upstream.requests == [ARTWORK_URL]
+    assert upstream.store.lookup(ARTWORK_URL, "original") is not None
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base
+from app.ingest import IngestError, PokemonIngester
+from app.models.pokemon import Ability, Cry, Pokemon, Type, pokemon_ability, pokemon_type
+
+
+@pytest.fixture
+async def ingest_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ingest.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def test_ingest_populates_tables(pokeapi_server, ingest_engine):
+    ingester = PokemonIngester(
+        ingest_engine, base_url=pokeapi_server.base_url, concurrency=3, batch_size=2
+    )
+    stats = await ingester.run(limit=5)
+
+    assert stats.inserted == 5
+    assert stats.failed == 0
+    assert stats.records_per_second > 0
+
+    async with ingest_engine.connect() as conn:
+        names = (await conn.execute(select(Pokemon.name).order_by(Pokemon.id))).scalars().all()
+        type_names = (
+            await conn.execute(select(Type.name).join(pokemon_type, pokemon_type.c.type_id == Type.id).distinct())
+        ).scalars().all()
+        links = (await conn.execute(select(func.count()).select_from(pokemon_type))).scalar_one()
+        eevee_abilities = (
+            await conn.execute(
+                select(Ability.name, pokemon_ability.c.slot, pokemon_ability.c.is_hidden)
+                .join(Ability, Ability.id == pokemon_ability.c.ability_id)
+                .where(pokemon_ability.c.pokemon_id == 133)
+                .order_by(pokemon_ability.c.slot)
+            )
+        ).all()
+        bulbasaur_cry = (await conn.execute(select(Cry.latest, Cry.legacy).where(Cry.pokemon_id == 1))).one()
+
+    assert names == ["bulbasaur", "charmander", "squirtle", "pikachu", "eevee"]
+    assert sorted(type_names) == ["electric", "fire", "grass", "normal", "poison", "water"]
+    assert links == 6
+    assert [tuple(row) for row in eevee_abilities] == [
+        ("run-away", 1, False),
+        ("adaptability", 2, False),
+        ("anticipation", 3, True),
+    ]
+    assert tuple(bulbasaur_cry) == ("https://cries.example/1.ogg", "https://cries.example/legacy/1.ogg")
+
+
+async def test_ingest_retries_transient_failures(pokeapi_server, ingest_engine):
+    pokeapi_server.failures["/api/v2/pokemon/4/"] = 2
+    ingester = PokemonIngester(
+        ingest_engine, base_url=pokeapi_server.base_url, backoff=0.01
+    )
+    stats = await ingester.run(limit=5)
+
+    assert stats.inserted == 5
+    assert stats.retries == 2
+
+
+async def test_ingest_gives_up_after_max_retries(pokeapi_server, ingest_engine):
+    pokeapi_server.failures["/api/v2/pokemon/7/"] = 10
+    ingester = PokemonIngester(
+        ingest_engine, base_url=pokeapi_server.base_url, max_retries=1, backoff=0.01
+    )
+    stats = await ingester.run(limit=5)
+
+    assert stats.inserted == 4
+    assert stats.failed == 1
+
+    pokeapi_server.failures["/api/v2/pokemon?limit=5"] = 10
+    with pytest.raises(IngestError):
+        await ingester.run(limit=5)
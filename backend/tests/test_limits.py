@@ -0,0 +1,141 @@
+import pytest
+
+from app import limits
+from app.limits import MAX_ALIASES, MAX_PAGE_SIZE, RateLimiter
+from app.main import graphql_app
+
+
+async def graphql(client, query, variables=None):
+    response = await client.post("/graphql", json={"query": query, "variables": variables or {}})
+    return response.json()
+
+
+async def test_page_sizes_are_clamped(client, setup_database):
+    body = await graphql(client, "{ pokemonsPage(perPage: 1000000) { items { id } pageInfo { perPage } } }")
+    assert body["data"]["pokemonsPage"]["pageInfo"]["perPage"] == MAX_PAGE_SIZE
+
+    body = await graphql(client, "{ searchPokemons(perPage: 0) { items { id } pageInfo { perPage lastPage } } }")
+    assert body["data"]["searchPokemons"]["pageInfo"] == {"perPage": 1, "lastPage": 1}
+
+
+async def test_frontend_list_query_is_within_limits(client, setup_database):
+    query = """
+        query GetPokemons($page: Int!, $perPage: Int!) {
+            pokemonsPage(page: $page, perPage: $perPage) {
+                items { id name imageUrl types { name } }
+                pageInfo { total lastPage }
+            }
+        }
+    """
+    body = await graphql(client, query, {"page": 1, "perPage": 20})
+    assert "errors" not in body
+    assert body["data"]["pokemonsPage"]["items"][0]["name"] == "charmander"
+
+
+async def test_rejects_costly_queries(client, setup_database):
+    query = "{ pokemonsPage(perPage: 100) { items { abilitySlots { ability { pokemon { name } } } } } }"
+    body = await graphql(client, query)
+
+    assert body["data"] is None
+    error = body["errors"][0]
+    assert error["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+    assert error["extensions"]["cost"] > error["extensions"]["maxCost"]
+
+
+async def test_cost_follows_ability_page_size(client, setup_database):
+    nested = 'abilityByName(abilityName: "blaze") {{ pokemon(perPage: {0}) {{ abilitySlots {{ ability {{ pokemon(perPage: {0}) {{ name }} }} }} }} }}'
+    assert "errors" not in await graphql(client, f"{{ {nested.format(5)} }}")
+
+    body = await graphql(client, f"{{ {nested.format(100)} }}")
+    assert body["errors"][0]["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+
+
+async def test_cost_counts_fragments(client, setup_database):
+    query = """
+        { pokemonsPage(perPage: 100) { items { ...Slots } } }
+        fragment Slots on PokemonType { abilitySlots { ability { pokemon { name } } } }
+    """
+    body = await graphql(client, query)
+    assert body["errors"][0]["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+
+
+async def test_rejects_deep_queries(client, setup_database):
+    nested = "name"
+    for _ in range(4):
+        nested = f"pokemon {{ abilitySlots {{ ability {{ {nested} }} }} }}"
+    body = await graphql(client, f'{{ abilityByName(abilityName: "blaze") {{ {nested} }} }}')
+
+    assert "exceeds maximum operation depth" in body["errors"][0]["message"]
+
+
+async def test_rejects_too_many_aliases(client, setup_database):
+    fields = " ".join(f"p{i}: pokemonById(pokemonId: 4) {{ name }}" for i in range(MAX_ALIASES + 1))
+    body = await graphql(client, f"{{ {fields} }}")
+
+    assert "aliases found" in body["errors"][0]["message"]
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    limiter = RateLimiter(rate=2, burst=3, clock=lambda: now[0])
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    # Other clients have their own bucket
+    assert limiter.acquire("b") == 0
+
+    now[0] = 0.5
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") > 0
+    assert limiter.limited == 2
+
+
+def test_forgets_least_recently_seen_clients():
+    limiter = RateLimiter(rate=1, burst=1, max_clients=2, clock=lambda: 0.0)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("c")
+
+    assert list(limiter.buckets) == ["b", "c"]
+
+
+@pytest.fixture
+def rate_limiter():
+    previous = graphql_app.rate_limiter
+    graphql_app.rate_limiter = RateLimiter(rate=1, burst=2)
+    yield graphql_app.rate_limiter
+    graphql_app.rate_limiter = previous
+
+
+async def test_clients_over_their_rate_get_429(client, setup_database, rate_limiter):
+    query = "{ pokemonById(pokemonId: 4) { name } }"
+    for _ in range(2):
+        assert (await client.post("/graphql", json={"query": query})).status_code == 200
+
+    response = await client.post("/graphql", json={"query": query})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["errors"][0]["extensions"]["code"] == "RATE_LIMITED"
+
+
+async def test_forwarded_clients_get_their_own_bucket(client, setup_database, rate_limiter, monkeypatch):
+    monkeypatch.setattr(limits, "TRUST_FORWARDED_FOR", True)
+    query = {"query": "{ pokemonById(pokemonId: 4) { name } }"}
+
+    async def send(forwarded_for):
+        headers = {"X-Forwarded-For": forwarded_for}
+        return (await client.post("/graphql", json=query, headers=headers)).status_code
+
+    # Both arrive from the same proxy address
+    assert [await send("203.0.113.1, 10.0.0.1") for _ in range(3)] == [200, 200, 429]
+    assert [await send("203.0.113.2, 10.0.0.1") for _ in range(2)] == [200, 200]
+
+
+async def test_without_trust_forwarded_clients_share_the_proxy_bucket(client, setup_database, rate_limiter):
+    query = {"query": "{ pokemonById(pokemonId: 4) { name } }"}
+    for address in ("203.0.113.1", "203.0.113.2"):
+        response = await client.post("/graphql", json=query, headers={"X-Forwarded-For": address})
+        assert response.status_code == 200
+
+    response = await client.post("/graphql", json=query, headers={"X-Forwarded-For": "203.0.113.3"})
+    assert response.status_code == 429
@@ -0,0 +1,231 @@
+import pytest
+from sqlalchemy import event
+
+from app.database import get_read_engine
+from app.models.pokemon import Ability, Cry, Pokemon, Type, pokemon_ability, pokemon_type
+
+
+@pytest.fixture
+async def pokedex(seed_database):
+    await seed_database(
+        (Type, [{"id": 1, "name": "grass"}, {"id": 2, "name": "poison"}, {"id": 3, "name": "fire"}]),
+        (
+            Pokemon,
+            [
+                {"id": 1, "name": "bulbasaur", "height": 7, "weight": 69, "image_url": "1.png"},
+                {"id": 4, "name": "charmander", "height": 6, "weight": 85, "image_url": "4.png"},
+                {"id": 5, "name": "charmeleon", "height": 11, "weight": 190, "image_url": "5.png"},
+            ],
+        ),
+        (
+            pokemon_type,
+            [{"pokemon_id": 1, "type_id": 1}, {"pokemon_id": 1, "type_id": 2}, {"pokemon_id": 4, "type_id": 3}, {"pokemon_id": 5, "type_id": 3}],
+        ),
+        (Ability, [{"id": 1, "name": "overgrow"}, {"id": 2, "name": "blaze"}, {"id": 3, "name": "solar-power"}]),
+        (
+            pokemon_ability,
+            [
+                {"pokemon_id": 1, "ability_id": 1, "slot": 1, "is_hidden": False},
+                {"pokemon_id": 4, "ability_id": 2, "slot": 1, "is_hidden": False},
+                {"pokemon_id": 4, "ability_id": 3, "slot": 3, "is_hidden": True},
+                {"pokemon_id": 5, "ability_id": 2, "slot": 1, "is_hidden": False},
+                {"pokemon_id": 5, "ability_id": 3, "slot": 3, "is_hidden": True},
+            ],
+        ),
+        (Cry, [{"pokemon_id": 1, "latest": "1.ogg", "legacy": "1-legacy.ogg"}]),
+    )
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(get_read_engine().sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(get_read_engine().sync_engine, "before_cursor_execute", record)
+
+
+async def test_aliased_lookups_share_one_query(client, pokedex, statements):
+    query = """
+    query {
+        a: pokemonById(pokemonId: 1) { name types { name } }
+        b: pokemonById(pokemonId: 4) { name types { name } }
+        c: pokemonById(pokemonId: 5) { id types { name } }
+        missing: pokemonById(pokemonId: 999) { name }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+    data = response.json()["data"]
+
+    assert data["a"] == {"name": "bulbasaur", "types": [{"name": "grass"}, {"name": "poison"}]}
+    assert data["b"] == {"name": "charmander", "types": [{"name": "fire"}]}
+    assert data["c"] == {"id": 5, "types": [{"name": "fire"}]}
+    assert data["missing"] is None
+
+    pokemon_queries = [s for s in statements if "FROM pokemons" in s]
+    type_queries = [s for s in statements if "FROM pokemon_type" in s]
+    # One batch for the lookups and one for every types field
+    assert len(pokemon_queries) == 1
+    assert len(type_queries) == 1
+
+
+async def test_lookups_by_name_are_batched(client, pokedex, statements):
+    query = """
+    query {
+        a: pokemonByName(pokemonName: "bulbasaur") { id }
+        b: pokemonByName(pokemonName: "charmander") { id }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+    assert response.json()["data"] == {"a": {"id": 1}, "b": {"id": 4}}
+    assert len([s for s in statements if "FROM pokemons" in s]) == 1
+
+
+async def test_types_only_load_when_selected(client, pokedex, statements):
+    query = "{ pokemonsPage(page: 1, perPage: 10) { items { id name } } }"
+    response = await client.post("/graphql", json={"query": query})
+    assert [item["id"] for item in response.json()["data"]["pokemonsPage"]["items"]] == [1, 4, 5]
+    assert not [s for s in statements if "pokemon_type" in s]
+
+    query = "{ pokemonsPage(page: 1, perPage: 10) { items { id types { name } } } }"
+    response = await client.post("/graphql", json={"query": query})
+    assert len([s for s in statements if "FROM pokemon_type" in s]) == 1
+
+
+async def test_repeat_lookups_are_served_from_cache(client, pokedex, statements):
+    query = "{ pokemonById(pokemonId: 1) { name abilities types { name } } }"
+    first = (await client.post("/graphql", json={"query": query})).json()
+    statements.clear()
+    second = (await client.post("/graphql", json={"query": query})).json()
+
+    assert first == second
+    assert second["data"]["pokemonById"]["abilities"] == ["overgrow"]
+    assert statements == []
+
+
+async def test_list_pages_read_only_selected_columns(client, pokedex, statements):
+    query = """
+    query {
+        pokemonsPage(page: 1, perPage: 2) {
+            items { ...card }
+        }
+    }
+    fragment card on PokemonType { id imageUrl types { name } }
+    """
+    response = await client.post("/graphql", json={"query": query})
+    items = response.json()["data"]["pokemonsPage"]["items"]
+    assert items[0] == {"id": 1, "imageUrl": "1.png", "types": [{"name": "grass"}, {"name": "poison"}]}
+
+    page_query = next(s for s in statements if "FROM pokemons" in s and "LIMIT" in s)
+    select_list = page_query.split("FROM")[0]
+    assert "image_url" in select_list
+    assert "abilities" not in select_list
+    assert "cries" not in select_list
+    assert "weight" not in select_list
+
+
+async def test_abilities_and_cries_are_batched(client, pokedex, statements):
+    query = """
+    query {
+        pokemonsPage(page: 1, perPage: 10) {
+            items { id abilitySlots { ability { name } slot isHidden } cry { latest legacy } }
+        }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+    data = response.json()["data"]
+
+    items = {item["id"]: item for item in data["pokemonsPage"]["items"]}
+    assert items[4]["abilitySlots"] == [
+        {"ability": {"name": "blaze"}, "slot": 1, "isHidden": False},
+        {"ability": {"name": "solar-power"}, "slot": 3, "isHidden": True},
+    ]
+    assert items[1]["cry"] == {"latest": "1.ogg", "legacy": "1-legacy.ogg"}
+    assert items[4]["cry"] is None
+    assert len([s for s in statements if "FROM pokemon_ability" in s]) == 1
+    assert len([s for s in statements if "FROM cry" in s]) == 1
+
+    query = """
+    query {
+        bulbasaur: pokemonById(pokemonId: 1) { abilities cries }
+        charmeleon: pokemonById(pokemonId: 5) { abilities cries }
+    }
+    """
+    data = (await client.post("/graphql", json={"query": query})).json()["data"]
+    assert data["bulbasaur"] == {"abilities": ["overgrow"], "cries": "1.ogg"}
+    assert data["charmeleon"] == {"abilities": ["blaze", "solar-power"], "cries": ""}
+
+
+async def test_ability_by_name_lists_its_pokemon(client, pokedex, statements):
+    query = """
+    query {
+        blaze: abilityByName(abilityName: "blaze") { name pokemon { name abilitySlots { ability { name } } } }
+        solar: abilityByName(abilityName: "solar-power") { pokemon { id } }
+        missing: abilityByName(abilityName: "levitate") { name }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+    data = response.json()["data"]
+
+    assert data["blaze"]["name"] == "blaze"
+    assert [p["name"] for p in data["blaze"]["pokemon"]] == ["charmander", "charmeleon"]
+    assert data["blaze"]["pokemon"][0]["abilitySlots"] == [{"ability": {"name": "blaze"}}, {"ability": {"name": "solar-power"}}]
+    assert [p["id"] for p in data["solar"]["pokemon"]] == [4, 5]
+    assert data["missing"] is None
+    # One lookup for both names, one for both abilities' Pokémon
+    assert len([s for s in statements if "FROM ability" in s and "JOIN" not in s]) == 1
+    lists = [s for s in statements if "JOIN pokemons" in s]
+    assert len(lists) == 1 and "pokemon_ability.ability_id IN" in lists[0]
+
+
+async def test_ability_pokemon_are_paged(client, pokedex, statements):
+    query = """
+    query {
+        first: abilityByName(abilityName: "blaze") { pokemon(perPage: 1) { name } }
+        second: abilityByName(abilityName: "blaze") { pokemon(page: 2, perPage: 1) { name } }
+        solar: abilityByName(abilityName: "solar-power") { pokemon(page: 2, perPage: 1) { name } }
+        past: abilityByName(abilityName: "solar-power") { pokemon(page: 3, perPage: 1) { name } }
+        clamped: abilityByName(abilityName: "blaze") { pokemon(perPage: 1000000) { name } }
+    }
+    """
+    data = (await client.post("/graphql", json={"query": query})).json()["data"]
+
+    assert data["first"]["pokemon"] == [{"name": "charmander"}]
+    assert data["second"]["pokemon"] == data["solar"]["pokemon"] == [{"name": "charmeleon"}]
+    assert data["past"]["pokemon"] == []
+    assert data["clamped"]["pokemon"] == [{"name": "charmander"}, {"name": "charmeleon"}]
+    # Only the requested rows are read, one statement per page window
+    lists = [s for s in statements if "JOIN pokemons" in s]
+    assert len(lists) == 4 and all("row_number() OVER" in s for s in lists)
+
+
+async def test_batch_lookups_keep_order_and_dedupe(client, pokedex, statements):
+    query = """
+    {
+        pokemonsByIds(ids: [5, 999, 1, 5]) { id types { name } }
+        pokemonsByNames(names: ["charmander", "missingno"]) { id }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+
+    data = response.json()["data"]
+    assert [p and p["id"] for p in data["pokemonsByIds"]] == [5, None, 1, 5]
+    assert data["pokemonsByIds"][2]["types"] == [{"name": "grass"}, {"name": "poison"}]
+    assert data["pokemonsByNames"] == [{"id": 4}, None]
+    # One IN (...) per key kind, with repeated keys sent once, and one for the types
+    pokemon_queries = [s for s in statements if "FROM pokemons" in s]
+    assert len(pokemon_queries) == 2
+    assert any("IN (?, ?, ?)" in s for s in pokemon_queries)
+    assert len([s for s in statements if "pokemon_type.pokemon_id IN" in s]) == 1
+
+
+async def test_batch_lookups_are_capped(client, pokedex):
+    from app.limits import MAX_LOOKUP_KEYS
+
+    ids = ", ".join(str(i) for i in range(MAX_LOOKUP_KEYS + 1))
+    response = await client.post("/graphql", json={"query": f"{{ pokemonsByIds(ids: [{ids}]) {{ id }} }}"})
+
+    assert "at most" in response.json()["errors"][0]["message"]
@@ -0,0 +1,82 @@
+import pytest
+
+from app.matchups import TypeChart, TypeGroups, get_type_chart, rank_counters
+from app.populate_db import populate_pokemon
+
+
+@pytest.fixture
+async def charted(pokeapi_server, seed_database, db_engine):
+    await seed_database()
+    await populate_pokemon(limit=5, engine=db_engine, base_url=pokeapi_server.base_url)
+
+
+async def test_populator_stores_a_dense_chart(charted):
+    chart = await get_type_chart()
+
+    # "unknown" has no damage relations and is left out
+    assert len(chart) == 18
+    assert all(len(row) == 18 for row in chart.rows)
+    fire, grass, water = chart.lookup(["fire", "grass", "water"])
+    assert chart.rows[fire][grass] == 2.0
+    assert chart.rows[fire][water] == 0.5
+    assert chart.rows[grass][grass] == 0.5
+    assert chart.rows[water][grass] == 0.5
+
+
+async def test_type_matchup(client, charted):
+    query = """
+    query {
+        double: typeMatchup(attacker: "electric", defenders: ["water", "flying"]) { multiplier }
+        quarter: typeMatchup(attacker: "fire", defenders: ["water", "rock"]) { multiplier }
+        immune: typeMatchup(attacker: "ground", defenders: ["fire", "flying"]) { attacker defenders multiplier }
+    }
+    """
+    data = (await client.post("/graphql", json={"query": query})).json()["data"]
+
+    assert data["double"]["multiplier"] == 4.0
+    assert data["quarter"]["multiplier"] == 0.25
+    assert data["immune"] == {"attacker": "ground", "defenders": ["fire", "flying"], "multiplier": 0.0}
+
+    response = await client.post("/graphql", json={"query": '{ typeMatchup(attacker: "sound", defenders: ["fire"]) { multiplier } }'})
+    assert response.json()["errors"][0]["message"] == "Unknown type: sound"
+    response = await client.post("/graphql", json={"query": '{ typeMatchup(attacker: "fire", defenders: []) { multiplier } }'})
+    assert "defenders" in response.json()["errors"][0]["message"]
+
+
+async def test_best_counters_for(client, charted):
+    query = "{ bestCountersFor(pokemonId: 4, limit: 3) { pokemon { id name } score offense defense } }"
+    counters = (await client.post("/graphql", json={"query": query})).json()["data"]["bestCountersFor"]
+
+    # Water hits fire twice as hard and resists it; the neutral ones tie and
+    # come in id order; grass/poison bulbasaur is left out by the limit
+    assert counters == [
+        {"pokemon": {"id": 7, "name": "squirtle"}, "score": 4.0, "offense": 2.0, "defense": 0.5},
+        {"pokemon": {"id": 25, "name": "pikachu"}, "score": 1.0, "offense": 1.0, "defense": 1.0},
+        {"pokemon": {"id": 133, "name": "eevee"}, "score": 1.0, "offense": 1.0, "defense": 1.0},
+    ]
+
+    query = "{ bestCountersFor(pokemonId: 999) { score } }"
+    assert (await client.post("/graphql", json={"query": query})).json()["data"]["bestCountersFor"] == []
+
+
+def test_rank_counters_scores_each_type_combination_once():
+    # ids: 1 normal, 2 ghost, 3 fighting
+    chart = TypeChart(
+        [(1, "normal"), (2, "ghost"), (3, "fighting")],
+        [(1, 2, 0.0), (2, 1, 0.0), (3, 1, 2.0), (3, 2, 0.0)],
+    )
+    links = [(pokemon_id, 1) for pokemon_id in range(1, 1001)]
+    links += [(pokemon_id, 2) for pokemon_id in range(1001, 1004)]
+    links += [(pokemon_id, 3) for pokemon_id in range(1004, 1006)]
+    groups = TypeGroups(links)
+    assert len(groups.members) == 3
+
+    ranked = rank_counters(chart, groups, 1, limit=6)
+
+    # Fighting hits normal twice as hard; ghosts and normals can't hurt each
+    # other, so the ghosts score 0 and rank last
+    assert [(c.pokemon_id, c.score) for c in ranked] == [
+        (1004, 2.0), (1005, 2.0), (2, 1.0), (3, 1.0), (4, 1.0), (5, 1.0)
+    ]
+    assert rank_counters(chart, groups, 1, limit=0) == []
+    assert [c.pokemon_id for c in rank_counters(chart, groups, 1, limit=1010)][-3:] == [1001, 1002, 1003]
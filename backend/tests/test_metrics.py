@@ -0,0 +1,78 @@
+from app import ingest, metrics
+from app.database import warm_engines
+from app.ingest import IngestStats
+from helpers import sample
+
+
+async def test_operations_are_counted_and_timed(client, setup_database):
+    before = metrics.operations_total.values.get(("PokemonDetail", "ok"), 0)
+
+    response = await client.post(
+        "/graphql",
+        json={"query": "query PokemonDetail { pokemonById(pokemonId: 4) { name types { name } } }"},
+    )
+    assert response.json()["data"]["pokemonById"]["name"] == "charmander"
+
+    text = (await client.get("/metrics")).text
+    assert sample(text, "graphql_operations_total", operation="PokemonDetail", status="ok") == before + 1
+    for phase in ("parse", "validate", "execute"):
+        assert sample(text, "graphql_phase_duration_seconds_count", phase=phase) >= 1
+    assert sample(text, "graphql_resolver_duration_seconds_count", field="Query.pokemonById") >= 1
+    # The lookup and the types batch both hit SQL
+    assert sample(text, "graphql_sql_queries_count", operation="PokemonDetail") >= 1
+    assert sample(text, "graphql_sql_queries_sum", operation="PokemonDetail") >= 2
+    assert "graphql_sql_rows" not in text
+
+
+async def test_failed_and_anonymous_operations(client, setup_database):
+    await client.post("/graphql", json={"query": "{ pokemonById(pokemonId: 4) { nope } }"})
+    await client.post("/graphql", json={"query": "{ pokemons { id } }"})
+
+    text = (await client.get("/metrics")).text
+    assert sample(text, "graphql_operations_total", operation="anonymous", status="error") >= 1
+    assert sample(text, "graphql_operations_total", operation="anonymous", status="ok") >= 1
+
+
+def test_operation_names_are_capped(monkeypatch):
+    monkeypatch.setattr(metrics, "_operation_names", set())
+    monkeypatch.setattr(metrics, "MAX_OPERATION_NAMES", 2)
+
+    assert metrics.operation_label("First") == "First"
+    assert metrics.operation_label("Second") == "Second"
+    assert metrics.operation_label("Third") == "other"
+    assert metrics.operation_label("First") == "First"
+    assert metrics.operation_label(None) == "anonymous"
+    assert metrics.operation_label('bad"name') == "anonymous"
+
+
+async def test_unsampled_operations_skip_resolver_detail(client, setup_database, monkeypatch):
+    monkeypatch.setattr(metrics, "TRACE_SAMPLE_RATE", 0.0)
+    before = metrics.resolver_seconds.values.get(("Query.pokemonByName",), [0])[-1]
+    queries_before = metrics.sql_queries.values.get(("Unsampled",))
+
+    await client.post("/graphql", json={"query": 'query Unsampled { pokemonByName(pokemonName: "charmander") { id } }'})
+
+    assert metrics.operations_total.values[("Unsampled", "ok")] >= 1
+    assert metrics.resolver_seconds.values.get(("Query.pokemonByName",), [0])[-1] == before
+    assert metrics.sql_queries.values.get(("Unsampled",)) == queries_before
+
+
+async def test_pool_cache_and_populator_gauges(client, setup_database, monkeypatch):
+    stats = IngestStats(fetched=10, inserted=8, unchanged=2, elapsed=2.0)
+    monkeypatch.setattr(ingest, "latest_stats", stats)
+    # Engines are created lazily; a read alone never opens the write pool
+    await warm_engines()
+    await client.post("/graphql", json={"query": "{ pokemons { id } }"})
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    assert "# TYPE db_pool_connections gauge" in text
+    assert sample(text, "db_pool_connections", pool="write", state="checked_out") is not None
+    assert sample(text, "cache_misses_total", cache="dataset") is not None
+    assert sample(text, "cache_entries", cache="dataset") is not None
+    assert sample(text, "populator_pokemon", result="inserted") == 8
+    assert sample(text, "populator_elapsed_seconds") == 2.0
+    assert sample(text, "populator_records_per_second") == stats.records_per_second
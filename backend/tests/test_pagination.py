@@ -0,0 +1,79 @@
+import pytest
+
+from app.models.pokemon import Pokemon
+
+# Non-contiguous ids, as after a partial population
+POKEMON_IDS = [1, 2, 4, 7, 8, 25, 133]
+
+
+@pytest.fixture
+async def many_pokemon(seed_database):
+    await seed_database(
+        (
+            Pokemon,
+            [
+                {"id": i, "name": f"pokemon-{i}", "height": i, "weight": i, "image_url": f"{i}.png"}
+                for i in POKEMON_IDS
+            ],
+        )
+    )
+
+
+async def graphql(client, query, **variables):
+    response = await client.post("/graphql", json={"query": query, "variables": variables})
+    assert response.status_code == 200
+    body = response.json()
+    assert "errors" not in body, body
+    return body["data"]
+
+
+PAGE_QUERY = """
+query Page($page: Int!, $perPage: Int!) {
+    pokemonsPage(page: $page, perPage: $perPage) {
+        items { id }
+        pageInfo { total lastPage hasNextPage hasPreviousPage }
+    }
+}
+"""
+
+
+async def test_pokemons_page_seeks_by_id(client, many_pokemon):
+    pages = []
+    for page in range(1, 5):
+        data = await graphql(client, PAGE_QUERY, page=page, perPage=3)
+        pages.append([item["id"] for item in data["pokemonsPage"]["items"]])
+        if page == 1:
+            assert data["pokemonsPage"]["pageInfo"] == {
+                "total": 7, "lastPage": 3, "hasNextPage": True, "hasPreviousPage": False
+            }
+
+    assert pages == [[1, 2, 4], [7, 8, 25], [133], []]
+
+
+async def test_pokemons_connection_walks_all_rows(client, many_pokemon):
+    query = """
+    query Connection($after: String) {
+        pokemonsConnection(first: 3, after: $after) {
+            edges { cursor node { id } }
+            pageInfo { hasNextPage endCursor }
+            totalCount
+        }
+    }
+    """
+    seen, after = [], None
+    while True:
+        connection = (await graphql(client, query, after=after))["pokemonsConnection"]
+        assert connection["totalCount"] == 7
+        seen.extend(edge["node"]["id"] for edge in connection["edges"])
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+
+    assert seen == POKEMON_IDS
+
+
+async def test_invalid_cursor_is_an_error(client, many_pokemon):
+    response = await client.post(
+        "/graphql", json={"query": '{ pokemonsConnection(after: "nope") { totalCount } }'}
+    )
+    assert response.json()["errors"]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from app.main import graphql_app
+from app.persisted_queries import PersistedQueryStore, load_manifest, query_hash
+
+QUERY = "{ pokemonById(pokemonId: 4) { name } }"
+
+
+def persisted(query: str = QUERY) -> dict:
+    return {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+
+@pytest.fixture
+def store():
+    previous = graphql_app.persisted_queries
+    graphql_app.persisted_queries = PersistedQueryStore()
+    yield graphql_app.persisted_queries
+    graphql_app.persisted_queries = previous
+
+
+async def test_unknown_hash_is_registered_on_retry(client, setup_database, store):
+    first = await client.post("/graphql", json={"extensions": persisted()})
+    assert first.json()["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    second = await client.post("/graphql", json={"query": QUERY, "extensions": persisted()})
+    assert second.json()["data"]["pokemonById"]["name"] == "charmander"
+
+    third = await client.post("/graphql", json={"extensions": persisted()})
+    assert third.json()["data"]["pokemonById"]["name"] == "charmander"
+
+
+async def test_hashed_get_is_cacheable(client, setup_database, store):
+    await client.post("/graphql", json={"query": QUERY, "extensions": persisted()})
+
+    response = await client.get("/graphql", params={"extensions": json.dumps(persisted())})
+    assert response.json()["data"]["pokemonById"]["name"] == "charmander"
+    assert response.headers["cache-control"] == "public, max-age=300"
+
+    repeat = await client.get(
+        "/graphql",
+        params={"extensions": json.dumps(persisted())},
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert repeat.status_code == 304
+
+
+async def test_mismatched_hash_is_rejected(client, setup_database, store):
+    response = await client.post(
+        "/graphql", json={"query": "{ pokemons { id } }", "extensions": persisted()}
+    )
+    assert response.json()["errors"][0]["extensions"]["code"] == "INVALID_PERSISTED_QUERY"
+
+
+async def test_allow_list_only(client, setup_database, store):
+    graphql_app.persisted_queries = PersistedQueryStore({query_hash(QUERY): QUERY}, allow_list_only=True)
+
+    by_hash = await client.post("/graphql", json={"extensions": persisted()})
+    assert by_hash.json()["data"]["pokemonById"]["name"] == "charmander"
+
+    as_text = await client.post("/graphql", json={"query": QUERY})
+    assert as_text.json()["data"]["pokemonById"]["name"] == "charmander"
+
+    other = "{ pokemons { id } }"
+    for payload in ({"query": other}, {"query": other, "extensions": persisted(other)}):
+        response = await client.post("/graphql", json=payload)
+        assert response.json()["errors"][0]["extensions"]["code"] == "OPERATION_NOT_ALLOWED"
+
+
+def test_load_manifest_formats(tmp_path):
+    apollo = tmp_path / "apollo.json"
+    apollo.write_text(json.dumps({
+        "format": "apollo-persisted-query-manifest",
+        "version": 1,
+        "operations": [{"id": query_hash(QUERY), "name": "Q", "type": "query", "body": QUERY}],
+    }))
+    assert load_manifest(str(apollo)) == {query_hash(QUERY): QUERY}
+
+    mapping = tmp_path / "mapping.json"
+    mapping.write_text(json.dumps({"0" * 64: QUERY}))
+    with pytest.raises(ValueError):
+        load_manifest(str(mapping))
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.pokemon import Ability, Cry, Pokemon, PokemonSource, pokemon_ability
+from app.populate_db import populate_pokemon
+
+
+@pytest.fixture
+async def populate_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'populate.db'}")
+    yield engine
+    await engine.dispose()
+
+
+def detail_requests(stub):
+    return [path for path in stub.requests if path.startswith("/api/v2/pokemon/") and "?" not in path]
+
+
+async def test_populate_skips_stored_pokemon(pokeapi_server, populate_engine):
+    stats = await populate_pokemon(limit=3, engine=populate_engine, base_url=pokeapi_server.base_url)
+    assert stats.inserted == 3
+
+    pokeapi_server.requests.clear()
+    stats = await populate_pokemon(limit=5, engine=populate_engine, base_url=pokeapi_server.base_url)
+
+    assert stats.skipped == 3
+    assert stats.inserted == 2
+    assert sorted(detail_requests(pokeapi_server)) == ["/api/v2/pokemon/133/", "/api/v2/pokemon/25/"]
+
+
+async def test_populate_resumes_after_failures(pokeapi_server, populate_engine):
+    pokeapi_server.failures["/api/v2/pokemon/25/"] = 100
+    stats = await populate_pokemon(
+        limit=5, engine=populate_engine, base_url=pokeapi_server.base_url, backoff=0.01
+    )
+    assert stats.inserted == 4
+    assert stats.failed == 1
+
+    pokeapi_server.failures.clear()
+    pokeapi_server.requests.clear()
+    stats = await populate_pokemon(limit=5, engine=populate_engine, base_url=pokeapi_server.base_url)
+
+    assert stats.inserted == 1
+    assert detail_requests(pokeapi_server) == ["/api/v2/pokemon/25/"]
+    async with populate_engine.connect() as conn:
+        checkpoints = (await conn.execute(select(func.count()).select_from(PokemonSource))).scalar_one()
+    assert checkpoints == 5
+
+
+async def test_refresh_rewrites_only_changed_pokemon(pokeapi_server, populate_engine):
+    await populate_pokemon(limit=5, engine=populate_engine, base_url=pokeapi_server.base_url)
+
+    pokeapi_server.pokemon[25]["weight"] = 61
+    stats = await populate_pokemon(
+        limit=5, refresh=True, engine=populate_engine, base_url=pokeapi_server.base_url
+    )
+
+    assert stats.updated == 1
+    assert stats.unchanged == 4
+    async with populate_engine.connect() as conn:
+        weight = (await conn.execute(select(Pokemon.weight).where(Pokemon.id == 25))).scalar_one()
+    assert weight == 61
+
+
+async def test_full_database_skips_the_listing(pokeapi_server, populate_engine):
+    await populate_pokemon(limit=5, engine=populate_engine, base_url=pokeapi_server.base_url)
+
+    pokeapi_server.requests.clear()
+    stats = await populate_pokemon(limit=5, engine=populate_engine, base_url=pokeapi_server.base_url)
+
+    assert stats.skipped == 5
+    assert pokeapi_server.requests == []
+
+
+async def test_schema_upgrade_backfills_legacy_columns(populate_engine):
+    # A pokemons table as created before abilities and cries had their own tables
+    async with populate_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE pokemons (id INTEGER PRIMARY KEY, name VARCHAR, height INTEGER,"
+                " weight INTEGER, image_url VARCHAR, abilities JSON, cries VARCHAR)"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO pokemons VALUES"
+                " (1, 'bulbasaur', 7, 69, NULL, '[\"overgrow\", \"chlorophyll\"]', 'https://cries.example/1.ogg'),"
+                " (4, 'charmander', 6, 85, NULL, '[\"blaze\"]', NULL)"
+            )
+        )
+
+    await populate_pokemon(limit=0, engine=populate_engine)
+    # Running again doesn't copy anything twice
+    await populate_pokemon(limit=0, engine=populate_engine)
+
+    async with populate_engine.connect() as conn:
+        abilities = (
+            await conn.execute(
+                select(pokemon_ability.c.pokemon_id, Ability.name, pokemon_ability.c.slot)
+                .join(Ability, Ability.id == pokemon_ability.c.ability_id)
+                .order_by(pokemon_ability.c.pokemon_id, pokemon_ability.c.slot)
+            )
+        ).all()
+        cries = (await conn.execute(select(Cry.pokemon_id, Cry.latest))).all()
+    assert [tuple(row) for row in abilities] == [(1, "overgrow", 1), (1, "chlorophyll", 2), (4, "blaze", 1)]
+    assert [tuple(row) for row in cries] == [(1, "https://cries.example/1.ogg")]
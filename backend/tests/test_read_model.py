@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import event, update
+
+from app import read_model
+from app.cache import invalidate_caches
+from app.database import get_read_engine
+from app.models.pokemon import Pokemon
+from helpers import search
+
+CASES = [
+    'name: "char"',
+    'name: "charmandr", fuzzy: true',
+    'name: "charmandr", fuzzy: true, descending: true',
+    'name: "pidgy", fuzzy: true, sortBy: WEIGHT',
+    'types: ["fire", "flying"]',
+    'types: ["fire", "flying"], matchAllTypes: true',
+    'types: ["water"]',
+    "minHeight: 5, maxHeight: 11, sortBy: HEIGHT, descending: true",
+    "minWeight: 100, sortBy: NAME",
+    "sortBy: WEIGHT, perPage: 2, page: 2",
+    "descending: true, perPage: 3",
+    'types: ["grass"], name: "ivy"',
+]
+
+LIST_QUERY = """{
+    pokemonsPage(page: 2, perPage: 2) { items { id name types { name } } pageInfo { total } }
+    pokemonsConnection(first: 2, after: "cG9rZW1vbjo0") { edges { node { name } } totalCount }
+    byId: pokemonById(pokemonId: 6) { name abilities types { name } }
+    byName: pokemonByName(pokemonName: "pikachu") { id }
+    missing: pokemonById(pokemonId: 999) { id }
+}"""
+
+
+@pytest.fixture
+async def enabled(monkeypatch):
+    monkeypatch.setattr(read_model, "READ_MODEL_ENABLED", True)
+    yield
+    await read_model.close_read_model()
+
+
+async def answers(client):
+    searches = [await search(client, arguments) for arguments in CASES]
+    response = await client.post("/graphql", json={"query": LIST_QUERY})
+    return searches, response.json()
+
+
+async def test_read_model_answers_like_sql(client, pokedex, enabled):
+    assert read_model.current_read_model() is None
+    from_sql = await answers(client)
+
+    await read_model.refresh_read_model()
+    assert len(read_model.current_read_model()) == 7
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(get_read_engine().sync_engine, "before_cursor_execute", listener)
+    try:
+        from_model = await answers(client)
+    finally:
+        event.remove(get_read_engine().sync_engine, "before_cursor_execute", listener)
+
+    assert from_model == from_sql
+    assert statements == []
+
+
+async def test_writes_retire_and_rebuild_the_model(client, pokedex, enabled, db_engine):
+    await read_model.refresh_read_model()
+    async with db_engine.begin() as conn:
+        await conn.execute(update(Pokemon).where(Pokemon.id == 25).values(name="raichu"))
+
+    invalidate_caches()
+    # Until the rebuild lands, resolvers read through to the database
+    assert read_model.current_read_model() is None
+    assert (await search(client, 'name: "rai"'))[0] == ["raichu"]
+
+    await read_model._reload_task
+    model = read_model.current_read_model()
+    assert model is not None and model.by_id[25].name == "raichu"
+
+
+def test_type_bitsets():
+    records = [read_model.PokemonRecord(i, f"p{i}") for i in (3, 1, 2)]
+    types = [read_model.TypeRecord(1, "fire"), read_model.TypeRecord(2, "water")]
+    model = read_model.ReadModel(1, records, types, [(1, 1), (3, 1), (3, 2), (99, 1)])
+
+    assert list(model.ids) == [1, 2, 3]
+    assert model.positions(model.type_bits["fire"]) == [0, 2]
+    assert model.positions(model.type_bits["fire"] & model.type_bits["water"]) == [2]
+    assert [t.name for t in model.types_of[3]] == ["fire", "water"]
+    assert [r.id for r in model.after(1, 5)] == [2, 3]
+    assert [r.id for r in model.after(2, 1, inclusive=True)] == [2]
+
+
+def test_bitset_spans_bytes():
+    positions = [0, 7, 8, 15, 16, 1000]
+    assert read_model._bitset(positions, 1001) == sum(1 << position for position in positions)
+    assert read_model._bitset([], 0) == 0
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.cache import invalidate_caches
+from app.readiness import SERVE_STALE, WAIT, population
+
+QUERY = {"query": "{ pokemons { id name } }"}
+
+
+@pytest.fixture
+def startup():
+    """The app's population tracker, restored after the test."""
+    saved = vars(population).copy()
+    yield population
+    vars(population).clear()
+    vars(population).update(saved)
+
+
+async def test_healthz(client):
+    response = await client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+async def test_serve_stale_is_ready_with_data(client, setup_database, startup):
+    startup.policy = SERVE_STALE
+    release = asyncio.Event()
+    startup.start(release.wait)
+
+    response = await client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert body["pokemon"] == 1
+    assert body["population"]["state"] == "running"
+    assert body["ready_after"] is not None
+    assert (await client.post("/graphql", json=QUERY)).status_code == 200
+
+    release.set()
+    await startup.task
+    assert startup.state == "done"
+
+
+async def test_serve_stale_without_data_is_not_ready(client, startup):
+    startup.policy = SERVE_STALE
+    invalidate_caches()
+    release = asyncio.Event()
+    startup.start(release.wait)
+
+    response = await client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["pokemon"] == 0
+
+    await startup.stop()
+    assert startup.state == "cancelled"
+
+
+async def test_wait_policy_gates_graphql_until_populated(client, setup_database, startup):
+    startup.policy = WAIT
+    release = asyncio.Event()
+    startup.start(release.wait)
+
+    assert (await client.get("/readyz")).status_code == 503
+    blocked = await client.post("/graphql", json=QUERY)
+    assert blocked.status_code == 503
+    assert blocked.headers["retry-after"]
+    assert blocked.json()["errors"][0]["extensions"]["code"] == "SERVICE_UNAVAILABLE"
+    # GraphiQL still loads
+    assert (await client.get("/graphql", headers={"Accept": "text/html"})).status_code == 200
+
+    release.set()
+    await startup.task
+
+    response = await client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["population"]["state"] == "done"
+    assert startup.ready_after is not None
+    assert (await client.post("/graphql", json=QUERY)).json()["data"]["pokemons"][0]["name"] == "charmander"
+    assert "startup_ready_seconds" in (await client.get("/metrics")).text
+
+
+async def test_failed_population_is_reported(client, setup_database, startup):
+    async def populate():
+        raise RuntimeError("PokeAPI is down")
+
+    startup.policy = WAIT
+    startup.start(populate)
+    with pytest.raises(RuntimeError):
+        await startup.task
+
+    response = await client.get("/readyz")
+    assert response.status_code == 503
+    population_report = response.json()["population"]
+    assert population_report["state"] == "failed"
+    assert population_report["error"] == "RuntimeError: PokeAPI is down"
+
+    # With data already stored, serve-stale keeps serving
+    startup.policy = SERVE_STALE
+    assert (await client.get("/readyz")).status_code == 200
@@ -0,0 +1,49 @@
+from app.search import FUZZY_LIMIT, TrigramIndex
+from helpers import search
+
+
+async def test_name_prefix(client, pokedex):
+    assert await search(client, 'name: "Char"') == (["charmander", "charmeleon", "charizard"], 3)
+
+
+async def test_fuzzy_name_tolerates_typos(client, pokedex):
+    names, _ = await search(client, 'name: "pikachoo", fuzzy: true')
+    assert names[0] == "pikachu"
+    names, _ = await search(client, 'name: "charmandr", fuzzy: true')
+    assert names[0] == "charmander"
+
+
+async def test_type_filters(client, pokedex):
+    assert await search(client, 'types: ["flying"]') == (["charizard", "pidgey"], 2)
+    names, total = await search(client, 'types: ["fire", "flying"]')
+    assert total == 4
+    assert await search(client, 'types: ["fire", "flying"], matchAllTypes: true') == (["charizard"], 1)
+
+
+async def test_ranges_sorting_and_pages(client, pokedex):
+    names, total = await search(
+        client, "minWeight: 60, maxWeight: 200, sortBy: HEIGHT, descending: true, perPage: 2, page: 1"
+    )
+    assert total == 5
+    assert names == ["charmeleon", "ivysaur"]
+    names, _ = await search(
+        client, "minWeight: 60, maxWeight: 200, sortBy: HEIGHT, descending: true, perPage: 2, page: 3"
+    )
+    assert names == ["pikachu"]
+
+
+async def test_filters_combine_with_fuzzy(client, pokedex):
+    assert await search(client, 'name: "charmandr", fuzzy: true') == (["charmander", "charmeleon"], 2)
+    assert await search(client, 'name: "charmandr", fuzzy: true, minHeight: 7') == (["charmeleon"], 1)
+    assert await search(client, 'name: "charmandr", fuzzy: true, types: ["water"]') == ([], 0)
+
+
+def test_trigram_index_ranks_closest_first():
+    index = TrigramIndex([(1, "bulbasaur"), (2, "ivysaur"), (3, "venusaur")])
+    assert [pokemon_id for pokemon_id, _ in index.search("ivysar")][0] == 2
+    assert index.search("zzzz") == []
+
+
+def test_fuzzy_matches_fit_in_one_sqlite_statement():
+    index = TrigramIndex([(i, f"pikachu-{i}") for i in range(1, 2001)])
+    assert len(index.search("pikachu")) == FUZZY_LIMIT < 999
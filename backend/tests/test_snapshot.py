@@ -0,0 +1,168 @@
+import gzip
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.models.pokemon import Cry, Pokemon, Species, TypeEffectiveness, evolution_closure, pokemon_ability
+from app.populate_db import ensure_populated, populate_pokemon
+from app.snapshot import SnapshotError, export_snapshot, import_snapshot, seed_from_snapshot
+
+
+@pytest.fixture
+async def make_engine(tmp_path):
+    engines = []
+
+    def factory(name):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}")
+        engines.append(engine)
+        return engine
+
+    yield factory
+    for engine in engines:
+        await engine.dispose()
+
+
+async def load_all(engine):
+    async with engine.connect() as conn:
+        tables = []
+        for query in (
+            select(Pokemon.id, Pokemon.name).order_by(Pokemon.id),
+            select(pokemon_ability).order_by(*pokemon_ability.primary_key.columns),
+            select(Cry.pokemon_id, Cry.latest, Cry.legacy).order_by(Cry.pokemon_id),
+            select(Species.id, Species.chain_id, Species.position, Species.item).order_by(Species.id),
+            select(evolution_closure).order_by(*evolution_closure.primary_key.columns),
+        ):
+            tables.append([tuple(row) for row in await conn.execute(query)])
+        return tables
+
+
+async def test_snapshot_round_trip(pokeapi_server, make_engine, tmp_path):
+    source = make_engine("source.db")
+    await populate_pokemon(limit=5, engine=source, base_url=pokeapi_server.base_url)
+    path = str(tmp_path / "snapshot.json.gz")
+
+    assert await export_snapshot(path, source) == 5
+
+    target = make_engine("target.db")
+    assert await import_snapshot(path, target) == 5
+    assert await load_all(target) == await load_all(source)
+    assert len((await load_all(target))[3]) == 16
+
+    async with AsyncSession(target) as session:
+        bulbasaur = (
+            await session.execute(select(Pokemon).options(selectinload(Pokemon.types)).where(Pokemon.id == 1))
+        ).scalar_one()
+        assert sorted(t.name for t in bulbasaur.types) == ["grass", "poison"]
+
+
+async def test_import_refuses_populated_database(pokeapi_server, make_engine, tmp_path):
+    engine = make_engine("pokemon.db")
+    await populate_pokemon(limit=2, engine=engine, base_url=pokeapi_server.base_url)
+    path = str(tmp_path / "snapshot.json.gz")
+    await export_snapshot(path, engine)
+
+    with pytest.raises(SnapshotError):
+        await import_snapshot(path, engine)
+    assert await import_snapshot(path, engine, replace=True) == 2
+    assert not await seed_from_snapshot(path, engine)
+
+
+async def test_seed_from_snapshot_needs_no_network(pokeapi_server, make_engine, tmp_path):
+    source = make_engine("source.db")
+    await populate_pokemon(limit=5, engine=source, base_url=pokeapi_server.base_url)
+    path = str(tmp_path / "snapshot.json.gz")
+    await export_snapshot(path, source)
+    pokeapi_server.requests.clear()
+
+    target = make_engine("target.db")
+    assert await seed_from_snapshot(path, target)
+    assert len((await load_all(target))[0]) == 5
+    assert pokeapi_server.requests == []
+    assert not await seed_from_snapshot(str(tmp_path / "missing.json.gz"), make_engine("empty.db"))
+
+
+async def test_rejects_unknown_snapshot_version(tmp_path, make_engine):
+    path = str(tmp_path / "future.json.gz")
+    with gzip.open(path, "wt") as f:
+        json.dump({"format": "pokemon-snapshot", "version": 999, "tables": {}}, f)
+
+    with pytest.raises(SnapshotError):
+        await import_snapshot(path, make_engine("pokemon.db"))
+
+
+async def test_upgrades_version_1_snapshot(tmp_path, make_engine):
+    path = str(tmp_path / "v1.json.gz")
+    pokemons = {
+        "columns": ["id", "name", "height", "weight", "image_url", "abilities", "cries"],
+        "rows": [
+            [1, "bulbasaur", 7, 69, "1.png", ["overgrow", "chlorophyll"], "1.ogg"],
+            [4, "charmander", 6, 85, "4.png", ["blaze"], ""],
+        ],
+    }
+    with gzip.open(path, "wt") as f:
+        json.dump({"format": "pokemon-snapshot", "version": 1, "tables": {"pokemons": pokemons}}, f)
+
+    engine = make_engine("pokemon.db")
+    assert await import_snapshot(path, engine) == 2
+    pokemon, abilities, cries, _, _ = await load_all(engine)
+    assert pokemon == [(1, "bulbasaur"), (4, "charmander")]
+    assert abilities == [(1, 1, 1, False), (1, 2, 2, False), (4, 3, 1, False)]
+    assert cries == [(1, "1.ogg", None)]
+
+
+def rewrite_snapshot(path, version, drop):
+    with gzip.open(path, "rt") as f:
+        snapshot = json.load(f)
+    snapshot["version"] = version
+    for name in drop:
+        del snapshot["tables"][name]
+    with gzip.open(path, "wt") as f:
+        json.dump(snapshot, f)
+
+
+async def test_seeding_an_older_snapshot_fetches_the_type_chart(pokeapi_server, make_engine, tmp_path):
+    source = make_engine("source.db")
+    await populate_pokemon(limit=5, engine=source, base_url=pokeapi_server.base_url)
+    path = str(tmp_path / "snapshot.json.gz")
+    await export_snapshot(path, source)
+    rewrite_snapshot(path, 2, ["type_effectiveness"])
+    pokeapi_server.requests.clear()
+
+    target = make_engine("target.db")
+    assert await ensure_populated(
+        engine=target, base_url=pokeapi_server.base_url, snapshot_path=path, complete_snapshot=True
+    ) is None
+    async with target.connect() as conn:
+        assert (await conn.execute(select(TypeEffectiveness).limit(1))).first() is not None
+    assert pokeapi_server.requests
+    assert not [p for p in pokeapi_server.requests if p.startswith("/api/v2/pokemon/")]
+
+
+async def test_seeding_an_older_snapshot_fetches_evolution_chains(pokeapi_server, make_engine, tmp_path):
+    source = make_engine("source.db")
+    await populate_pokemon(limit=5, engine=source, base_url=pokeapi_server.base_url)
+    path = str(tmp_path / "snapshot.json.gz")
+    await export_snapshot(path, source)
+    rewrite_snapshot(path, 3, ["species", "evolution_closure"])
+
+    target = make_engine("target.db")
+    await ensure_populated(engine=target, base_url=pokeapi_server.base_url, snapshot_path=path, complete_snapshot=True)
+    assert await load_all(target) == await load_all(source)
+
+
+async def test_seeding_stays_offline_by_default(pokeapi_server, make_engine, tmp_path):
+    source = make_engine("source.db")
+    await populate_pokemon(limit=5, engine=source, base_url=pokeapi_server.base_url)
+    path = str(tmp_path / "snapshot.json.gz")
+    await export_snapshot(path, source)
+    rewrite_snapshot(path, 3, ["species", "evolution_closure"])
+    pokeapi_server.requests.clear()
+
+    target = make_engine("target.db")
+    assert await ensure_populated(engine=target, base_url=pokeapi_server.base_url, snapshot_path=path) is None
+    assert pokeapi_server.requests == []
+    pokemon, *_ = await load_all(target)
+    assert len(pokemon) == 5
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+from app import populate_db
+from app.database import engines
+from app.main import app
+from app.readiness import population
+from app.startup import StartupTimer, startup_timer
+from helpers import sample
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing app.main may take this many times as long as importing the
+# frameworks it is built on, each best of IMPORT_RUNS in a fresh interpreter.
+# The ratio is about 1.3: the app adds its modules and a schema build of
+# around 15ms to the frameworks' own import.
+IMPORT_TIME_RATIO = float(os.getenv("IMPORT_TIME_RATIO", "1.5"))
+IMPORT_RUNS = 3
+
+IMPORT_FRAMEWORKS = """
+import json, time
+started = time.perf_counter()
+import fastapi, sqlalchemy, strawberry
+print(json.dumps({"seconds": time.perf_counter() - started}))
+"""
+
+IMPORT_APP = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+from app.database import engines
+print(json.dumps({
+    "seconds": elapsed,
+    "engines": list(engines()),
+    "httpx": "httpx" in sys.modules,
+    "pillow": "PIL" in sys.modules,
+}))
+"""
+
+
+def run_import(script):
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_importing_the_app_is_within_budget_and_lazy():
+    # Alternate the two so both see the same machine load
+    baselines, reports = [], []
+    for _ in range(IMPORT_RUNS):
+        baselines.append(run_import(IMPORT_FRAMEWORKS)["seconds"])
+        reports.append(run_import(IMPORT_APP))
+    baseline = min(baselines)
+    seconds = min(report["seconds"] for report in reports)
+
+    assert seconds < baseline * IMPORT_TIME_RATIO, f"import took {seconds:.2f}s, frameworks alone {baseline:.2f}s"
+    # Engines are created by the lifespan or the first query, httpx by the
+    # first upstream fetch and Pillow by the first resize
+    report = reports[0]
+    assert report["engines"] == []
+    assert report["httpx"] is False
+    assert report["pillow"] is False
+
+
+def test_timer_records_phases_in_order():
+    timer = StartupTimer()
+    timer.record("import", 1.23456)
+    with timer.phase("database"):
+        pass
+
+    assert list(timer.phases) == ["import", "database"]
+    assert timer.report()["import"] == 1.235
+    assert timer.summary().startswith("import 1.235s, database ")
+
+
+async def test_lifespan_reports_startup_phases(client, setup_database, monkeypatch):
+    async def populated():
+        return None
+
+    monkeypatch.setattr(populate_db, "ensure_populated", populated)
+    saved = vars(population).copy()
+    try:
+        async with app.router.lifespan_context(app):
+            assert {"import", "schema", "database"} <= set(startup_timer.phases)
+            assert set(engines()) == {"write", "read"}
+
+            body = (await client.get("/readyz")).json()
+            assert body["startup"]["import"] > 0
+            text = (await client.get("/metrics")).text
+            assert sample(text, "startup_phase_seconds", phase="database") >= 0
+    finally:
+        vars(population).clear()
+        vars(population).update(saved)
+    # Shutdown disposed of the engines
+    assert engines() == {}
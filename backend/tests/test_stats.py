@@ -0,0 +1,85 @@
+import pytest
+
+from app.cache import invalidate_caches
+from app.models.pokemon import Pokemon, Type, pokemon_type
+from app.stats import Distribution, get_dataset_stats
+
+
+@pytest.fixture
+async def pokedex(seed_database):
+    await seed_database(
+        (Type, [{"id": 1, "name": "grass"}, {"id": 2, "name": "poison"}, {"id": 3, "name": "fire"}]),
+        (
+            Pokemon,
+            [
+                {"id": 1, "name": "bulbasaur", "height": 7, "weight": 69},
+                {"id": 2, "name": "ivysaur", "height": 10, "weight": 130},
+                {"id": 4, "name": "charmander", "height": 6, "weight": 85},
+                {"id": 5, "name": "charmeleon", "height": 11, "weight": 190},
+            ],
+        ),
+        (
+            pokemon_type,
+            [
+                {"pokemon_id": 1, "type_id": 2},
+                {"pokemon_id": 1, "type_id": 1},
+                {"pokemon_id": 2, "type_id": 1},
+                {"pokemon_id": 2, "type_id": 2},
+                {"pokemon_id": 4, "type_id": 3},
+                {"pokemon_id": 5, "type_id": 3},
+            ],
+        ),
+    )
+
+
+def test_percentiles_interpolate_between_ranks():
+    distribution = Distribution(4, 6, 11, 8.5, [11, 6, 10, 7])
+
+    assert distribution.percentile(0) == 6
+    assert distribution.percentile(25) == 6.75
+    assert distribution.percentile(50) == 8.5
+    assert distribution.percentile(100) == 11
+    assert Distribution(0, None, None, None, []).percentile(50) is None
+
+
+def test_histogram_buckets_cover_the_range():
+    distribution = Distribution(4, 6, 11, 8.5, [11, 6, 10, 7])
+
+    assert distribution.histogram(5) == [(6, 7, 1), (7, 8, 1), (8, 9, 0), (9, 10, 0), (10, 11, 2)]
+    assert Distribution(2, 3, 3, 3, [3, 3]).histogram(4) == [(3, 3, 2)]
+
+
+async def test_pokemon_stats(client, pokedex):
+    query = """
+    {
+        pokemonStats {
+            total
+            height { min max mean percentiles { percentile value } histogram(buckets: 5) { count } }
+            byType { type count weight { min max mean } }
+            typeCombinations { types count }
+        }
+    }
+    """
+    response = await client.post("/graphql", json={"query": query})
+
+    stats = response.json()["data"]["pokemonStats"]
+    assert stats["total"] == 4
+    height = stats["height"]
+    assert (height["min"], height["max"], height["mean"]) == (6, 11, 8.5)
+    assert {"percentile": 50, "value": 8.5} in height["percentiles"]
+    assert [bucket["count"] for bucket in height["histogram"]] == [1, 1, 0, 0, 2]
+    assert stats["byType"] == [
+        {"type": "grass", "count": 2, "weight": {"min": 69, "max": 130, "mean": 99.5}},
+        {"type": "poison", "count": 2, "weight": {"min": 69, "max": 130, "mean": 99.5}},
+        {"type": "fire", "count": 2, "weight": {"min": 85, "max": 190, "mean": 137.5}},
+    ]
+    # Combinations are named in type id order, whatever the slots
+    assert stats["typeCombinations"] == [{"types": ["grass", "poison"], "count": 2}]
+
+
+async def test_stats_are_cached_per_dataset_version(pokedex):
+    first = await get_dataset_stats()
+    assert await get_dataset_stats() is first
+
+    invalidate_caches()
+    assert await get_dataset_stats() is not first
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from app.graphql_schema import get_context, schema
+from app.populate_db import populate_pokemon
+from app.pubsub import Topic, dataset_version_changed, pokemon_added
+from app.readiness import population
+
+
+async def subscribe(query, context=None):
+    results = await schema.subscribe(query, context_value=context or await get_context())
+    assert not hasattr(results, "errors"), results.errors
+    return results
+
+
+async def until_subscribed(topic, count=1):
+    # Generators only subscribe once their first result is asked for
+    for _ in range(100):
+        if len(topic.subscribers) >= count:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"nobody subscribed to {topic.name}")
+
+
+@pytest.fixture
+async def empty_database(seed_database):
+    await seed_database()
+
+
+async def test_slow_subscribers_drop_their_oldest_events():
+    topic = Topic("test")
+    fast = topic.subscribe(maxsize=10)
+    slow = topic.subscribe(maxsize=2)
+    for event in range(5):
+        topic.publish(event)
+
+    assert list(fast.events) == [0, 1, 2, 3, 4]
+    assert [await slow.__anext__(), await slow.__anext__()] == [3, 4]
+    assert topic.dropped == 3
+
+    waiting = asyncio.ensure_future(slow.__anext__())
+    await asyncio.sleep(0)
+    topic.publish(5)
+    assert await waiting == 5
+
+    slow.close()
+    fast.close()
+    assert not topic.subscribers
+    with pytest.raises(StopAsyncIteration):
+        await slow.__anext__()
+
+
+async def test_idle_subscribers_are_cheap():
+    topic = Topic("test")
+    subscriptions = [topic.subscribe() for _ in range(5000)]
+    waiting = [asyncio.ensure_future(s.__anext__()) for s in subscriptions]
+    await asyncio.sleep(0)
+
+    topic.publish("hello")
+    assert await asyncio.gather(*waiting) == ["hello"] * 5000
+    for subscription in subscriptions:
+        subscription.close()
+    assert not topic.subscribers
+
+
+async def test_pokemon_added_and_dataset_version_changed(pokeapi_server, empty_database, db_engine):
+    # One socket's operations share its context
+    context = await get_context()
+    loaders = context["loaders"]
+    added = await subscribe("subscription { pokemonAdded { id name types { name } } }", context)
+    versions = await subscribe("subscription { datasetVersionChanged }", context)
+    next_added = asyncio.ensure_future(added.__anext__())
+    next_version = asyncio.ensure_future(versions.__anext__())
+    await until_subscribed(pokemon_added)
+    await until_subscribed(dataset_version_changed)
+
+    await populate_pokemon(limit=2, engine=db_engine, base_url=pokeapi_server.base_url, batch_size=1)
+
+    first = await asyncio.wait_for(next_added, 5)
+    second = await asyncio.wait_for(added.__anext__(), 5)
+    names = sorted([first.data["pokemonAdded"]["name"], second.data["pokemonAdded"]["name"]])
+    assert names == ["bulbasaur", "charmander"]
+    assert first.data["pokemonAdded"]["types"]
+    # Each batch was loaded with its own loaders, not the shared ones
+    assert context["loaders"] is loaders
+    assert not loaders.pokemon_by_id.cache_map.cache_map
+    assert not loaders.types_by_pokemon_id.cache_map.cache_map
+
+    version = await asyncio.wait_for(next_version, 5)
+    assert version.data["datasetVersionChanged"] >= 1
+
+    await added.aclose()
+    await versions.aclose()
+    assert not pokemon_added.subscribers
+    assert not dataset_version_changed.subscribers
+
+
+@pytest.fixture
+def startup():
+    saved = vars(population).copy()
+    yield population
+    vars(population).clear()
+    vars(population).update(saved)
+
+
+async def test_population_progress_runs_until_finished(pokeapi_server, empty_database, db_engine, startup):
+    release = asyncio.Event()
+
+    async def populate():
+        await release.wait()
+        await populate_pokemon(limit=5, engine=db_engine, base_url=pokeapi_server.base_url, batch_size=2)
+
+    startup.start(populate)
+    results = await subscribe(
+        "subscription { populationProgress { state total processed written etaSeconds datasetVersion } }"
+    )
+    first = (await results.__anext__()).data["populationProgress"]
+    assert first["state"] == "running"
+
+    release.set()
+    updates = [result.data["populationProgress"] async for result in results]
+
+    assert updates[-1]["state"] == "done"
+    assert updates[-1]["total"] == updates[-1]["processed"] == updates[-1]["written"] == 5
+    assert updates[-1]["etaSeconds"] == 0.0
+    assert updates[-1]["datasetVersion"] > first["datasetVersion"]
+
+
+async def test_population_progress_ends_when_idle(startup):
+    results = await subscribe("subscription { populationProgress { state } }")
+    assert [r.data["populationProgress"]["state"] async for r in results] == ["idle"]
@@ -0,0 +1,51 @@
+import asyncio
+
+from sqlalchemy import update
+
+from app.cache import MISSING, dataset_cache
+from app.dataset import get_pokemon_count
+from app.models.dataset import DatasetVersion
+from app.workers import VersionPoller, population_lock
+
+
+async def test_population_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "populate.lock")
+    events = []
+
+    async def populate(name):
+        async with population_lock(path):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.3)
+            events.append(f"{name} end")
+
+    await asyncio.gather(populate("first"), populate("second"))
+
+    assert events == ["first start", "first end", "second start", "second end"]
+
+
+async def test_waiting_for_the_lock_can_be_cancelled(tmp_path):
+    path = str(tmp_path / "populate.lock")
+    async with population_lock(path):
+        waiter = asyncio.create_task(population_lock(path).__aenter__())
+        await asyncio.sleep(0.3)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert waiter.cancelled()
+
+
+async def test_poller_invalidates_on_writes_from_other_processes(setup_database, db_engine):
+    poller = VersionPoller(interval=0)
+    await poller.check()
+    assert await get_pokemon_count() == 1
+    assert not await poller.check()
+
+    # Another worker's write, made without this process's invalidate_caches()
+    async with db_engine.begin() as conn:
+        await conn.execute(DatasetVersion.__table__.insert().values(id=1, version=1))
+    assert await poller.check()
+    assert dataset_cache.get("count") is MISSING
+
+    async with db_engine.begin() as conn:
+        await conn.execute(update(DatasetVersion).values(version=2))
+    assert await poller.check()
+    assert poller.invalidations == 2
@@ -1,13 +1,25 @@
 import React from 'react'
 import ReactDOM from 'react-dom/client'
-import { ApolloClient, InMemoryCache, ApolloProvider } from '@apollo/client'
+import { ApolloClient, InMemoryCache, ApolloProvider, HttpLink } from '@apollo/client'
+import { createPersistedQueryLink } from '@apollo/client/link/persisted-queries'
 import { BrowserRouter } from 'react-router-dom'
 import App from './App'
 import './index.css'
 
-// Create Apollo Client
+const sha256 = async (query) => {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(query))
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('')
+}
+
+// Create Apollo Client. Queries are sent by hash (automatic persisted queries) and as GET requests,
+// so the browser and CDN can cache them
 const client = new ApolloClient({
-  uri: import.meta.env.VITE_API_URL || 'http://localhost:8000/graphql',
+  link: createPersistedQueryLink({ sha256, useGETForHashedQueries: true }).concat(
+    new HttpLink({
+      uri: import.meta.env.VITE_API_URL || 'http://localhost:8000/graphql',
+      useGETForQueries: true
+    })
+  ),
   cache: new InMemoryCache()
 })
 